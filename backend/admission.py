@@ -0,0 +1,141 @@
+# BloomBuddy admission control
+# Each route class (single predictions, batch scoring, LLM chat) gets its own bounded
+# number of concurrent requests and a short FIFO queue with a maximum wait, so a burst
+# of 60-second chat calls cannot occupy every request thread of a worker and stall
+# millisecond predictions behind them. Requests beyond the queue, or that wait too
+# long, are shed immediately with a Retry-After estimate instead of piling up.
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+
+class AdmissionRejected(Exception):
+    """Raised when a route class is saturated; carries the suggested Retry-After in seconds"""
+
+    def __init__(self, route_class: str, reason: str, retry_after: int):
+        super().__init__(f"{route_class} capacity exhausted ({reason})")
+        self.route_class = route_class
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _percentile(sorted_samples, q: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[min(len(sorted_samples) - 1, int(q * len(sorted_samples)))]
+
+
+class RouteClassLimiter:
+    """
+    At most `max_concurrency` requests of one class run at a time; up to `max_queue`
+    more wait in arrival order for at most `max_wait` seconds each.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, max_wait: float, sample_size: int = 2048):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = deque()
+        self._wait_samples = deque(maxlen=sample_size)
+        self._mean_hold = 0.0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.total_wait_seconds = 0.0
+
+    def acquire(self) -> float:
+        """Block until the request may run; returns the seconds it waited or raises AdmissionRejected"""
+        start = time.perf_counter()
+        with self._cond:
+            if self._in_flight < self.max_concurrency and not self._waiting:
+                self._admit(0.0)
+                return 0.0
+            if len(self._waiting) >= self.max_queue:
+                self.rejected_queue_full += 1
+                raise AdmissionRejected(self.name, 'queue_full', self._retry_after())
+
+            ticket = object()
+            self._waiting.append(ticket)
+            self.queued += 1
+            deadline = start + self.max_wait
+            try:
+                while self._waiting[0] is not ticket or self._in_flight >= self.max_concurrency:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self.rejected_timeout += 1
+                        raise AdmissionRejected(self.name, 'wait_timeout', self._retry_after())
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting.remove(ticket)
+                # The next ticket may now be at the head of the queue
+                self._cond.notify_all()
+            waited = time.perf_counter() - start
+            self._admit(waited)
+            return waited
+
+    def release(self, hold_seconds: float) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            # Exponentially weighted mean time a request holds its slot, for Retry-After
+            self._mean_hold = hold_seconds if self._mean_hold == 0 else 0.9 * self._mean_hold + 0.1 * hold_seconds
+            self._cond.notify_all()
+
+    def _admit(self, waited: float) -> None:
+        self._in_flight += 1
+        self.admitted += 1
+        self.total_wait_seconds += waited
+        self._wait_samples.append(waited)
+
+    def _retry_after(self) -> int:
+        # Time for the requests ahead of this one to drain, at least one second
+        estimate = self._mean_hold * (len(self._waiting) + 1) / self.max_concurrency
+        return int(min(60, max(1, math.ceil(estimate))))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            samples = sorted(self._wait_samples)
+            return {
+                'max_concurrency': self.max_concurrency,
+                'max_queue': self.max_queue,
+                'max_wait_seconds': self.max_wait,
+                'in_flight': self._in_flight,
+                'queue_depth': len(self._waiting),
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'rejected_queue_full': self.rejected_queue_full,
+                'rejected_timeout': self.rejected_timeout,
+                'wait_seconds_total': round(self.total_wait_seconds, 6),
+                'wait_ms': {
+                    'p50': round(_percentile(samples, 0.50) * 1000, 3),
+                    'p95': round(_percentile(samples, 0.95) * 1000, 3),
+                    'p99': round(_percentile(samples, 0.99) * 1000, 3),
+                    'max': round(samples[-1] * 1000, 3) if samples else 0.0
+                },
+                'mean_hold_ms': round(self._mean_hold * 1000, 3)
+            }
+
+
+class AdmissionController:
+    """Per-process set of route class limiters; classes without a limiter are admitted unconditionally"""
+
+    def __init__(self, limiters: Dict[str, RouteClassLimiter], enabled: bool = True):
+        self.limiters = limiters
+        self.enabled = enabled
+
+    def limiter(self, route_class: Optional[str]) -> Optional[RouteClassLimiter]:
+        if not self.enabled or route_class is None:
+            return None
+        return self.limiters.get(route_class)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'classes': {name: limiter.stats() for name, limiter in self.limiters.items()}
+        }
@@ -0,0 +1,130 @@
+"""
+Prediction latency under LLM chat load: chats on the Flask route with and without
+admission control, and chats on the aiohttp chat listener (LLM_CHAT_PORT).
+
+Starts gunicorn.conf.py (one worker, GUNICORN_THREADS threads) against
+mock_llm_upstream.py, keeps --chat-clients concurrent chat calls running (each taking
+--chat-latency seconds upstream) and meanwhile times sequential single predictions.
+Without admission control the chats occupy every request thread and predictions
+queue behind them; with it they are capped per route class and the excess is shed
+with 503 + Retry-After. Chats sent to the chat listener hold no request thread at all.
+
+Usage (from the backend directory):
+    python benchmarks/bench_admission.py --chat-clients 16 --predictions 100
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+
+import requests
+
+from common import BACKEND_DIR, percentile_summary
+from measure_workers import SAMPLE_REQUEST, wait_until_ready
+from mock_llm_upstream import start_mock_upstream
+
+CHAT_REQUEST = {'messages': [{'role': 'user', 'content': 'Explain my hypertension risk'}]}
+
+
+def measure(admission: bool, args, upstream_url: str, chat_listener: bool = False) -> dict:
+    env = dict(os.environ, ADMISSION_CONTROL='true' if admission else 'false', MODEL_LOADING='eager',
+               GUNICORN_THREADS=str(args.threads), ANTHROPIC_BASE_URL=upstream_url,
+               ANTHROPIC_API_KEY='test', PYTHONWARNINGS='ignore',
+               LLM_CHAT_PORT=str(args.chat_port) if chat_listener else '0')
+    command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+               '-b', f'127.0.0.1:{args.port}', '-w', '1', '--log-level', 'warning']
+    base_url = f'http://127.0.0.1:{args.port}'
+    chat_url = f'http://127.0.0.1:{args.chat_port if chat_listener else args.port}/api/llm/chat'
+    master = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    stop = threading.Event()
+    chat_statuses = Counter()
+    clients = []
+
+    def chat_client():
+        with requests.Session() as session:
+            while not stop.is_set():
+                try:
+                    response = session.post(chat_url, json=CHAT_REQUEST, timeout=120)
+                    chat_statuses[response.status_code] += 1
+                    if response.status_code == 503:
+                        time.sleep(min(float(response.headers.get('Retry-After', 1)), 1.0))
+                except requests.RequestException:
+                    chat_statuses['error'] += 1
+
+    try:
+        if not wait_until_ready(base_url, 1, time.time() + 120):
+            raise RuntimeError('Server did not become ready')
+        clients.extend(threading.Thread(target=chat_client, daemon=True) for _ in range(args.chat_clients))
+        for client in clients:
+            client.start()
+        time.sleep(args.chat_latency / 2)
+
+        path, payload = SAMPLE_REQUEST
+        samples, prediction_statuses = [], Counter()
+        with requests.Session() as session:
+            for _ in range(args.predictions):
+                start = time.perf_counter()
+                response = session.post(f'{base_url}{path}', json=payload, timeout=120)
+                samples.append((time.perf_counter() - start) * 1000)
+                prediction_statuses[response.status_code] += 1
+        admission_stats = requests.get(f'{base_url}/api/admission/stats', timeout=5).json()
+    finally:
+        stop.set()
+        # Let the chats in flight finish so they are counted, then shut down quickly
+        deadline = time.time() + 2 * args.chat_latency + 5
+        for client in clients:
+            client.join(max(0.0, deadline - time.time()))
+        master.send_signal(signal.SIGINT)
+        master.wait(timeout=30)
+
+    return {
+        'admission_control': admission,
+        'chat_listener': chat_listener,
+        'prediction_latency': percentile_summary(samples),
+        'prediction_statuses': {str(k): v for k, v in prediction_statuses.items()},
+        'chat_statuses': {str(k): v for k, v in chat_statuses.items()},
+        'admission_stats': admission_stats
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prediction latency under chat load with and without admission control')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--chat-clients', type=int, default=16)
+    parser.add_argument('--chat-latency', type=float, default=2.0, help='Mock upstream seconds per chat call')
+    parser.add_argument('--predictions', type=int, default=100)
+    parser.add_argument('--port', type=int, default=5078)
+    parser.add_argument('--chat-port', type=int, default=5079, help='LLM_CHAT_PORT for the chat listener run')
+    parser.add_argument('--json', dest='json_path', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    upstream = start_mock_upstream(latency=args.chat_latency)
+    upstream_url = f'http://127.0.0.1:{upstream.server_port}'
+    results = [measure(admission, args, upstream_url) for admission in (False, True)]
+    results.append(measure(False, args, upstream_url, chat_listener=True))
+    upstream.shutdown()
+
+    print(f"{args.chat_clients} concurrent chat clients ({args.chat_latency}s upstream), "
+          f"{args.threads} threads, {args.predictions} sequential predictions")
+    for result in results:
+        latency = result['prediction_latency']
+        label = ('chat listener        ' if result['chat_listener']
+                 else f"admission control {'on ' if result['admission_control'] else 'off'}")
+        print(f"  {label}  "
+              f"prediction p50 {latency['p50_ms']:>9.2f} ms  p99 {latency['p99_ms']:>9.2f} ms  "
+              f"chats {result['chat_statuses']}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Micro-benchmark for single-row model inference.
+
+Compares the previous per-request pattern (scaler.transform + predict + predict_proba)
+against the shared score_features() helper, which scores with one predict_proba pass,
+and against the NumPy-only compiled scorers from fast_scoring.py.
+
+Usage (from the backend directory):
+    python benchmarks/bench_inference.py --iterations 500
+"""
+
+import argparse
+import json
+import os
+import time
+
+from common import BACKEND_DIR, load_feature_rows, load_server, percentile_summary
+
+
+def time_calls(fn, rows, iterations):
+    samples = []
+    for i in range(iterations):
+        row = rows[i % len(rows)]
+        start = time.perf_counter()
+        fn(row)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Single-row inference latency per model')
+    parser.add_argument('--iterations', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--models', nargs='+', default=None, help='Subset of models to benchmark')
+    parser.add_argument('--json', dest='json_path', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    os.chdir(BACKEND_DIR)
+    # The comparison needs the original estimators, not memory-mapped compiled artifacts
+    os.environ['USE_COMPILED_ARTIFACTS'] = 'false'
+    server = load_server()
+    server.logger.disabled = True
+    server.load_models()
+
+    results = {}
+    for model_type in args.models or list(server.MODEL_SPECS):
+        model, scaler = server.models[model_type], server.scalers[model_type]
+        if model is None:
+            print(f"{model_type}: model not loaded, skipping")
+            continue
+        rows = load_feature_rows(server, model_type)
+
+        def double_pass(row):
+            processed = row.reshape(1, -1)
+            if scaler is not None:
+                processed = scaler.transform(processed)
+            model.predict(processed)
+            return model.predict_proba(processed)
+
+        live = server.model_registry.bundle(model_type)
+        bundle = dict(live, compiled=None)
+
+        def single_pass(row):
+            return server.score_features(model_type, [row.tolist()], bundle)
+
+        time_calls(double_pass, rows, args.warmup)
+        time_calls(single_pass, rows, args.warmup)
+        before = percentile_summary(time_calls(double_pass, rows, args.iterations))
+        after = percentile_summary(time_calls(single_pass, rows, args.iterations))
+
+        results[model_type] = {
+            'model': type(model).__name__,
+            'predict_plus_predict_proba': before,
+            'score_features': after,
+            'p50_speedup': round(before['p50_ms'] / after['p50_ms'], 2)
+        }
+        line = (f"{model_type:<13} {type(model).__name__:<24} "
+                f"before p50 {before['p50_ms']:.3f} ms  single pass p50 {after['p50_ms']:.3f} ms")
+
+        if live['compiled'] is not None:
+            bundle = live
+            time_calls(single_pass, rows, args.warmup)
+            fast = percentile_summary(time_calls(single_pass, rows, args.iterations))
+            results[model_type]['compiled'] = fast
+            results[model_type]['compiled_p50_speedup'] = round(before['p50_ms'] / fast['p50_ms'], 2)
+            line += f"  compiled p50 {fast['p50_ms']:.3f} ms ({results[model_type]['compiled_p50_speedup']}x)"
+        print(line)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
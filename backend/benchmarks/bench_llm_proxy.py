@@ -0,0 +1,116 @@
+"""
+Benchmark for the upstream LLM connection pool.
+
+Starts mock_llm_upstream.py over TLS (self-signed certificate made with the openssl
+CLI; --no-tls for plain HTTP) and compares the proxy's previous per-call
+`requests.post`, which opens a new connection and TLS handshake for every chat
+message, against the server's pooled keep-alive `llm_session`. A second run with a
+fraction of upstream 429s shows how many calls the session's retries recover.
+
+Usage (from the backend directory):
+    python benchmarks/bench_llm_proxy.py --requests 200
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+import requests
+
+from common import load_server, percentile_summary
+from mock_llm_upstream import start_mock_upstream
+
+PAYLOAD = {
+    'model': 'claude-3-5-sonnet-20241022',
+    'messages': [{'role': 'user', 'content': 'Explain my diabetes risk result'}],
+    'max_tokens': 64,
+    'temperature': 0.7
+}
+
+
+def make_certificate(directory: str):
+    certfile, keyfile = os.path.join(directory, 'cert.pem'), os.path.join(directory, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1', '-subj', '/CN=127.0.0.1',
+         '-addext', 'subjectAltName=IP:127.0.0.1', '-keyout', keyfile, '-out', certfile],
+        check=True, capture_output=True
+    )
+    return certfile, keyfile
+
+
+def time_calls(post, url: str, headers: dict, count: int):
+    samples, failures = [], 0
+    for _ in range(count):
+        start = time.perf_counter()
+        response = post(url, headers=headers, json=PAYLOAD, timeout=60)
+        samples.append((time.perf_counter() - start) * 1000)
+        failures += response.status_code != 200
+    return samples, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-request latency of pooled vs per-call upstream LLM connections')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.0, help='Mock upstream response delay in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.2, help='Fraction of 429s in the retry run')
+    parser.add_argument('--no-tls', action='store_true', help='Use plain HTTP instead of a local TLS upstream')
+    parser.add_argument('--json', dest='json_path', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    server = load_server()
+    server.logger.disabled = True
+    headers = server.anthropic_headers('test-key')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        certfile = keyfile = None
+        if not args.no_tls:
+            certfile, keyfile = make_certificate(tmp)
+            # Both requests.post and the session verify against the self-signed certificate
+            os.environ['REQUESTS_CA_BUNDLE'] = certfile
+        scheme = 'http' if args.no_tls else 'https'
+
+        upstream = start_mock_upstream(latency=args.latency, certfile=certfile, keyfile=keyfile)
+        url = f'{scheme}://127.0.0.1:{upstream.server_port}/v1/messages'
+        time_calls(requests.post, url, headers, 5)
+        time_calls(server.llm_session.post, url, headers, 5)
+        per_call, _ = time_calls(requests.post, url, headers, args.requests)
+        pooled, _ = time_calls(server.llm_session.post, url, headers, args.requests)
+        upstream.shutdown()
+
+        flaky = start_mock_upstream(latency=args.latency, error_rate=args.error_rate, retry_after=0,
+                                    certfile=certfile, keyfile=keyfile)
+        url = f'{scheme}://127.0.0.1:{flaky.server_port}/v1/messages'
+        _, failures_without_retry = time_calls(requests.post, url, headers, args.requests)
+        _, failures_with_retry = time_calls(server.llm_session.post, url, headers, args.requests)
+        flaky.shutdown()
+
+    results = {
+        'transport': scheme,
+        'per_call_requests_post': percentile_summary(per_call),
+        'pooled_session': percentile_summary(pooled),
+        'error_rate': args.error_rate,
+        'failed_without_retry': failures_without_retry,
+        'failed_with_retry': failures_with_retry,
+        'requests': args.requests
+    }
+    saved = results['per_call_requests_post']['p50_ms'] - results['pooled_session']['p50_ms']
+    results['p50_saved_ms'] = round(saved, 3)
+
+    print(f"{scheme} upstream, {args.requests} sequential calls")
+    print(f"  requests.post per call  p50 {results['per_call_requests_post']['p50_ms']:.3f} ms  "
+          f"p95 {results['per_call_requests_post']['p95_ms']:.3f} ms")
+    print(f"  pooled llm_session      p50 {results['pooled_session']['p50_ms']:.3f} ms  "
+          f"p95 {results['pooled_session']['p95_ms']:.3f} ms  (saves {saved:.3f} ms per call)")
+    print(f"  with {args.error_rate:.0%} upstream 429s: {failures_without_retry} failed without retries, "
+          f"{failures_with_retry} with retries")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Shared helpers for the backend benchmark scripts.
+Run the scripts from the backend directory, e.g. `python benchmarks/bench_inference.py`.
+"""
+
+import importlib.util
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def load_server():
+    """Import ml-api-server.py as a module (the hyphenated name rules out a plain import)"""
+    warnings.filterwarnings('ignore')
+    spec = importlib.util.spec_from_file_location('ml_api_server', os.path.join(BACKEND_DIR, 'ml-api-server.py'))
+    server = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(server)
+    return server
+
+
+def load_feature_rows(server, model_type: str) -> np.ndarray:
+    """Feature rows from a model's training CSV, in the model's feature order"""
+    spec = server.MODEL_SPECS[model_type]
+    models_dir = os.getenv('MODELS_DIR', os.path.join(BACKEND_DIR, 'models'))
+    df = pd.read_csv(os.path.join(models_dir, spec['dataset']), encoding='utf-8-sig')
+    df = df.drop(columns=[spec['target']]).dropna()
+    return df.to_numpy(dtype=float)
+
+
+def percentile_summary(samples_ms) -> dict:
+    """p50/p95/p99 and mean of a list of millisecond samples"""
+    samples = np.asarray(samples_ms, dtype=float)
+    return {
+        'mean_ms': round(float(samples.mean()), 4),
+        'p50_ms': round(float(np.percentile(samples, 50)), 4),
+        'p95_ms': round(float(np.percentile(samples, 95)), 4),
+        'p99_ms': round(float(np.percentile(samples, 99)), 4)
+    }
@@ -0,0 +1,265 @@
+"""
+Load test for the ML API: throughput and latency percentiles per endpoint.
+
+Serves the app either in this process (werkzeug's threaded server) or under
+gunicorn.conf.py, then runs --concurrency closed-loop clients for --duration seconds.
+Each client sends a mix of single predictions, /api/assess and batch requests built
+from real rows of diabetes.csv, heart.csv and hypertension.csv. Results (configuration,
+model versions, per-endpoint throughput and p50/p95/p99) go to --json. With --baseline,
+the run is compared against an earlier result file, to spot regressions between model
+versions or server configurations.
+
+Repeated rows are served from the prediction cache; --unique makes every request
+distinct (a tiny offset on one feature) to measure the uncached path.
+
+Usage (from the backend directory):
+    python benchmarks/load_test.py --mode gunicorn --workers 4 --concurrency 16 --duration 30 --json run.json
+    python benchmarks/load_test.py --mode inprocess --env PREDICTION_CACHE_SIZE=0 --baseline run.json
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+import requests
+
+from common import BACKEND_DIR, load_feature_rows, load_server, percentile_summary
+from measure_workers import wait_until_ready
+
+ENDPOINTS = ('diabetes', 'heart', 'hypertension', 'assess', 'batch')
+
+
+def build_requests(server, batch_size: int):
+    """Per endpoint, a list of (path, payload) built from the training CSVs"""
+    rows = {model_type: load_feature_rows(server, model_type).tolist() for model_type in server.MODEL_SPECS}
+    built = {
+        model_type: [(f'/api/predict/{model_type}', {'features': row}) for row in model_rows]
+        for model_type, model_rows in rows.items()
+    }
+
+    patients = []
+    for i in range(max(len(model_rows) for model_rows in rows.values())):
+        patient = {}
+        for model_type, model_rows in rows.items():
+            patient.update(zip(server.MODEL_SPECS[model_type]['features'], model_rows[i % len(model_rows)]))
+        patients.append(('/api/assess', {'patient': patient}))
+    built['assess'] = patients
+
+    built['batch'] = []
+    for model_type, model_rows in rows.items():
+        for start in range(0, len(model_rows), batch_size):
+            chunk = model_rows[start:start + batch_size]
+            if len(chunk) == batch_size:
+                built['batch'].append((f'/api/predict/{model_type}/batch', {'features': chunk}))
+    return built
+
+
+def make_unique(path: str, payload: dict, counter) -> dict:
+    """Copy of the payload with a negligible, request-unique offset on one feature, defeating the cache"""
+    epsilon = next(counter) * 1e-9
+    if 'patient' in payload:
+        patient = dict(payload['patient'])
+        name = next(iter(patient))
+        patient[name] = patient[name] + epsilon
+        return dict(payload, patient=patient)
+    if path.endswith('/batch'):
+        return {'features': [row[:-1] + [row[-1] + epsilon] for row in payload['features']]}
+    row = payload['features']
+    return {'features': row[:-1] + [row[-1] + epsilon]}
+
+
+def run_load(base_url: str, built: dict, mix: dict, concurrency: int, duration: float, warmup: float, unique: bool):
+    """Closed-loop clients; returns per-endpoint latency samples (ms), status counts and the measured seconds"""
+    endpoints = [name for name, weight in mix.items() for _ in range(weight)]
+    samples, statuses = defaultdict(list), defaultdict(Counter)
+    lock = threading.Lock()
+    counter = itertools.count(1)
+    measure_from = time.perf_counter() + warmup
+    stop_at = measure_from + duration
+
+    def client(seed: int):
+        rng = random.Random(seed)
+        local_samples, local_statuses = defaultdict(list), defaultdict(Counter)
+        with requests.Session() as session:
+            while True:
+                start = time.perf_counter()
+                if start >= stop_at:
+                    break
+                endpoint = rng.choice(endpoints)
+                path, payload = rng.choice(built[endpoint])
+                if unique:
+                    payload = make_unique(path, payload, counter)
+                try:
+                    status = session.post(f'{base_url}{path}', json=payload, timeout=60).status_code
+                except requests.RequestException:
+                    status = 'error'
+                if start >= measure_from:
+                    local_samples[endpoint].append((time.perf_counter() - start) * 1000)
+                    local_statuses[endpoint][status] += 1
+        with lock:
+            for endpoint, values in local_samples.items():
+                samples[endpoint].extend(values)
+            for endpoint, counts in local_statuses.items():
+                statuses[endpoint].update(counts)
+
+    clients = [threading.Thread(target=client, args=(seed,), daemon=True) for seed in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    return samples, statuses, duration
+
+
+def summarize(samples: dict, statuses: dict, seconds: float) -> dict:
+    endpoints = {}
+    for endpoint in sorted(samples):
+        counts = statuses[endpoint]
+        ok = counts.get(200, 0)
+        endpoints[endpoint] = dict(
+            percentile_summary(samples[endpoint]),
+            requests=len(samples[endpoint]),
+            errors=len(samples[endpoint]) - ok,
+            status_counts={str(status): count for status, count in counts.items()},
+            throughput_rps=round(len(samples[endpoint]) / seconds, 1)
+        )
+    everything = [value for values in samples.values() for value in values]
+    total = dict(percentile_summary(everything), requests=len(everything),
+                 throughput_rps=round(len(everything) / seconds, 1)) if everything else {}
+    return {'endpoints': endpoints, 'total': total}
+
+
+def start_gunicorn(args, env_overrides: dict):
+    # --env overrides win over the harness defaults
+    env = {**os.environ, 'MODEL_LOADING': 'eager', 'PYTHONWARNINGS': 'ignore', 'GUNICORN_THREADS': str(args.threads),
+           **env_overrides}
+    command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+               '-b', f'127.0.0.1:{args.port}', '-w', str(args.workers), '--log-level', 'warning']
+    master = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{args.port}'
+    # Lazily loading workers have no models until the warmup requests reach them
+    require_models = env['MODEL_LOADING'] == 'eager'
+    if len(wait_until_ready(base_url, args.workers, time.time() + 120, require_models)) < args.workers:
+        master.send_signal(signal.SIGINT)
+        raise RuntimeError('gunicorn workers did not become ready')
+
+    def stop():
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=60)
+    return base_url, stop
+
+
+def start_inprocess(server, port: int):
+    from werkzeug.serving import make_server
+
+    # werkzeug logs every request at INFO, which would dominate the measurement
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server.create_app()
+    httpd = make_server('127.0.0.1', port, server.app, threaded=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    def stop():
+        httpd.shutdown()
+    return f'http://127.0.0.1:{port}', stop
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{name}' (choose from {', '.join(ENDPOINTS)})")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def print_comparison(results: dict, baseline: dict):
+    print(f"\n{'endpoint':<14}{'p50 ms':>18}{'p99 ms':>20}{'req/s':>18}")
+    for endpoint, current in results['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(endpoint)
+        if before is None:
+            continue
+
+        def delta(key):
+            change = (current[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            return f"{before[key]:>7.2f} -> {current[key]:<7.2f}({change:+.0f}%)"
+        print(f"{endpoint:<14}{delta('p50_ms'):>18}  {delta('p99_ms'):>18}  {delta('throughput_rps'):>18}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput and latency percentiles per ML API endpoint')
+    parser.add_argument('--mode', choices=('inprocess', 'gunicorn'), default='inprocess')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads per worker')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent client connections')
+    parser.add_argument('--duration', type=float, default=10.0, help='Measured seconds')
+    parser.add_argument('--warmup', type=float, default=2.0, help='Unmeasured seconds before the measurement')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('diabetes=3,heart=3,hypertension=3,assess=1'),
+                        help='Weighted endpoints, e.g. "diabetes=3,heart=3,hypertension=3,assess=1,batch=1"')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--unique', action='store_true', help='Make every request distinct to bypass the prediction cache')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='Server environment override (repeatable), e.g. --env ADMISSION_CONTROL=false')
+    parser.add_argument('--port', type=int, default=5079)
+    parser.add_argument('--json', dest='json_path', help='Write results to this JSON file')
+    parser.add_argument('--baseline', help='Earlier results JSON to compare against')
+    args = parser.parse_args()
+
+    env_overrides = dict(item.split('=', 1) for item in args.env)
+    os.environ.update(env_overrides)
+    os.environ.setdefault('MODEL_LOADING', 'lazy' if args.mode == 'gunicorn' else 'eager')
+    # Keep the request log quiet unless asked for
+    os.environ.setdefault('REQUEST_LOG_SAMPLE_RATE', '0')
+    server = load_server()
+    server.logger.disabled = True
+    built = build_requests(server, args.batch_size)
+
+    if args.mode == 'gunicorn':
+        base_url, stop = start_gunicorn(args, env_overrides)
+    else:
+        base_url, stop = start_inprocess(server, args.port)
+    started_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    try:
+        model_info = requests.get(f'{base_url}/api/models/info', timeout=10).json()['models']
+        samples, statuses, seconds = run_load(base_url, built, args.mix, args.concurrency,
+                                              args.duration, args.warmup, args.unique)
+    finally:
+        stop()
+
+    results = dict(summarize(samples, statuses, seconds), config={
+        'mode': args.mode,
+        'workers': args.workers if args.mode == 'gunicorn' else 1,
+        'threads': args.threads if args.mode == 'gunicorn' else None,
+        'concurrency': args.concurrency,
+        'duration_seconds': args.duration,
+        'mix': args.mix,
+        'batch_size': args.batch_size,
+        'unique': args.unique,
+        'env': env_overrides
+    }, model_versions={model_type: info['model_version'] for model_type, info in model_info.items()},
+        started_at=started_at)
+
+    print(f"{args.mode}, {args.concurrency} clients, {args.duration:g}s: "
+          f"{results['total'].get('throughput_rps', 0)} req/s")
+    for endpoint, summary in results['endpoints'].items():
+        print(f"  {endpoint:<13} {summary['throughput_rps']:>8.1f} req/s  p50 {summary['p50_ms']:>8.2f} ms  "
+              f"p95 {summary['p95_ms']:>8.2f} ms  p99 {summary['p99_ms']:>8.2f} ms  errors {summary['errors']}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            print_comparison(results, json.load(f))
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
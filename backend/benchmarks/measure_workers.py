@@ -0,0 +1,130 @@
+"""
+Measure gunicorn cold-start time and per-worker memory with and without preloading.
+
+Starts gunicorn.conf.py twice (GUNICORN_PRELOAD=false, then true), waits until every
+worker answers /health with all models loaded, sends some prediction traffic, and
+reads RSS / PSS / USS for each worker from /proc/<pid>/smaps_rollup (Linux only).
+
+Usage (from the backend directory):
+    python benchmarks/measure_workers.py --workers 4 --json worker_memory.json
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from common import BACKEND_DIR
+
+SAMPLE_REQUEST = ('/api/predict/hypertension', {'features': [1, 39, 0, 0, 0, 0, 195, 106, 70, 26.97, 80, 77]})
+
+
+def read_memory_kb(pid: int) -> dict:
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss_kb': fields.get('Rss', 0),
+        'pss_kb': fields.get('Pss', 0),
+        'uss_kb': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    }
+
+
+def worker_pids(master_pid: int) -> list:
+    with open(f'/proc/{master_pid}/task/{master_pid}/children') as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def wait_until_ready(base_url: str, workers: int, deadline: float, require_models: bool = True) -> set:
+    """
+    Poll /health concurrently until `workers` distinct pids report all models loaded
+    (or only answer, without require_models, for servers that load models lazily)
+    """
+    ready = set()
+
+    def probe(_):
+        try:
+            body = requests.get(f'{base_url}/health', timeout=1).json()
+            if not require_models or all(body.get('models_loaded', {}).values()):
+                return body.get('worker_pid')
+        except (requests.RequestException, ValueError):
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers * 2) as pool:
+        while len(ready) < workers and time.time() < deadline:
+            ready.update(pid for pid in pool.map(probe, range(workers * 4)) if pid)
+            time.sleep(0.02)
+    return ready
+
+
+def measure(preload: bool, workers: int, port: int, requests_per_worker: int) -> dict:
+    env = dict(os.environ, GUNICORN_PRELOAD='true' if preload else 'false', MODEL_LOADING='eager', PYTHONWARNINGS='ignore')
+    command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+               '-b', f'127.0.0.1:{port}', '-w', str(workers), '--log-level', 'warning']
+    base_url = f'http://127.0.0.1:{port}'
+
+    start = time.time()
+    master = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        ready = wait_until_ready(base_url, workers, start + 120)
+        cold_start = time.time() - start
+        if len(ready) < workers:
+            raise RuntimeError(f'Only {len(ready)} of {workers} workers became ready')
+
+        path, payload = SAMPLE_REQUEST
+        with requests.Session() as session:
+            for _ in range(requests_per_worker * workers):
+                session.post(f'{base_url}{path}', json=payload, timeout=5)
+
+        memory = {pid: read_memory_kb(pid) for pid in worker_pids(master.pid)}
+        master_memory = read_memory_kb(master.pid)
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=30)
+
+    def mean(key):
+        return round(sum(m[key] for m in memory.values()) / len(memory) / 1024, 1)
+
+    return {
+        'preload': preload,
+        'workers': workers,
+        'cold_start_seconds': round(cold_start, 2),
+        'master_rss_mb': round(master_memory['rss_kb'] / 1024, 1),
+        'mean_worker_rss_mb': mean('rss_kb'),
+        'mean_worker_pss_mb': mean('pss_kb'),
+        'mean_worker_uss_mb': mean('uss_kb'),
+        'total_pss_mb': round((sum(m['pss_kb'] for m in memory.values()) + master_memory['pss_kb']) / 1024, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-worker memory and cold start, with and without preload')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=5077)
+    parser.add_argument('--requests-per-worker', type=int, default=50)
+    parser.add_argument('--json', dest='json_path', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    results = [measure(preload, args.workers, args.port, args.requests_per_worker) for preload in (False, True)]
+    for result in results:
+        print(f"preload={str(result['preload']):<5}  cold start {result['cold_start_seconds']:>6.2f} s  "
+              f"worker RSS {result['mean_worker_rss_mb']:>7.1f} MB  PSS {result['mean_worker_pss_mb']:>7.1f} MB  "
+              f"USS {result['mean_worker_uss_mb']:>7.1f} MB  total PSS {result['total_pss_mb']:>7.1f} MB")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
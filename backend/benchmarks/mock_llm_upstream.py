@@ -0,0 +1,151 @@
+"""
+Local stand-in for the Anthropic Messages API, for testing and benchmarking the
+/api/llm/chat proxy without network access or an API key.
+
+POST /v1/messages answers with a canned reply after --latency seconds; requests with
+"stream": true get it as server-sent events, one word every --token-delay seconds,
+in the same event sequence the real API sends. --error-rate makes that fraction of
+requests fail with --error-status (and a Retry-After header), and --certfile/--keyfile
+serve it over TLS.
+
+Usage (from the backend directory):
+    python benchmarks/mock_llm_upstream.py --port 8787
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8787 ANTHROPIC_API_KEY=test python ml-api-server.py
+"""
+
+import argparse
+import json
+import random
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = ('Your results suggest a moderate risk. Regular exercise, a balanced diet and '
+         'routine check-ups with your doctor are good next steps.')
+
+
+class MockUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without TCP_NODELAY the second one
+    # waits on the client's delayed ACK on a kept-alive connection (~40 ms on Linux)
+    disable_nagle_algorithm = True
+    latency = 0.05
+    token_delay = 0.01
+    error_rate = 0.0
+    error_status = 429
+    retry_after = 1
+    reply_words = REPLY.split(' ')
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if self.path != '/v1/messages':
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        self.server.request_count += 1
+        if self.error_rate and random.random() < self.error_rate:
+            self.server.error_count += 1
+            payload = json.dumps({'type': 'error', 'error': {'type': 'rate_limit_error', 'message': 'Mock upstream error'}}).encode('utf-8')
+            self.send_response(self.error_status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Retry-After', str(self.retry_after))
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        time.sleep(self.latency)
+
+        model = body.get('model', 'mock-model')
+        input_tokens = sum(len(str(m.get('content', '')).split()) for m in body.get('messages', []))
+        words = self.reply_words[:body.get('max_tokens', len(self.reply_words))]
+
+        if not body.get('stream'):
+            payload = json.dumps({
+                'id': 'msg_mock', 'type': 'message', 'role': 'assistant', 'model': model,
+                'content': [{'type': 'text', 'text': ' '.join(words)}],
+                'stop_reason': 'end_turn',
+                'usage': {'input_tokens': input_tokens, 'output_tokens': len(words)}
+            }).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        try:
+            self._event('message_start', {'type': 'message_start', 'message': {
+                'id': 'msg_mock', 'model': model, 'usage': {'input_tokens': input_tokens, 'output_tokens': 0}}})
+            self._event('content_block_start', {'type': 'content_block_start', 'index': 0,
+                                                'content_block': {'type': 'text', 'text': ''}})
+            for i, word in enumerate(words):
+                time.sleep(self.token_delay)
+                self._event('content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                                    'delta': {'type': 'text_delta', 'text': word if i == 0 else ' ' + word}})
+            self._event('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+            self._event('message_delta', {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn'},
+                                          'usage': {'output_tokens': len(words)}})
+            self._event('message_stop', {'type': 'message_stop'})
+        except (BrokenPipeError, ConnectionResetError):
+            # The proxy cancelled the stream
+            self.server.cancelled_count += 1
+
+    def _event(self, event: str, data: dict):
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+
+def start_mock_upstream(port: int = 0, latency: float = 0.05, token_delay: float = 0.01, error_rate: float = 0.0,
+                        error_status: int = 429, retry_after: int = 1, certfile: str = None,
+                        keyfile: str = None) -> ThreadingHTTPServer:
+    """Start the mock upstream in a daemon thread; its URL is http(s)://127.0.0.1:<server.server_port>"""
+    handler = type('ConfiguredMockUpstreamHandler', (MockUpstreamHandler,), {
+        'latency': latency, 'token_delay': token_delay, 'error_rate': error_rate,
+        'error_status': error_status, 'retry_after': retry_after
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    if certfile:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    server.daemon_threads = True
+    server.request_count = 0
+    server.error_count = 0
+    server.cancelled_count = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock Anthropic Messages API for local proxy testing')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds before the first byte of a reply')
+    parser.add_argument('--token-delay', type=float, default=0.01, help='Seconds between streamed words')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with --error-status')
+    parser.add_argument('--error-status', type=int, default=429)
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds sent with errors')
+    parser.add_argument('--certfile', help='Serve over TLS with this certificate')
+    parser.add_argument('--keyfile', help='Private key for --certfile')
+    args = parser.parse_args()
+
+    server = start_mock_upstream(args.port, args.latency, args.token_delay, args.error_rate,
+                                 args.error_status, args.retry_after, args.certfile, args.keyfile)
+    scheme = 'https' if args.certfile else 'http'
+    print(f"Mock LLM upstream on {scheme}://127.0.0.1:{server.server_port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
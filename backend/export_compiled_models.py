@@ -0,0 +1,51 @@
+"""
+Convert the trained model pickles into memory-mappable compiled artifacts.
+
+Loads every model + scaler pair from MODELS_DIR, compiles it with fast_scoring.py
+(verifying it against the original pipeline), and writes uncompressed .npy arrays
+plus a manifest.json to MODELS_DIR/compiled (or COMPILED_MODELS_DIR / --out).
+ml-api-server.py then memory-maps these at startup instead of unpickling.
+
+Usage (from the backend directory):
+    python export_compiled_models.py [--out models/compiled]
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import warnings
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export compiled, memory-mappable model artifacts')
+    parser.add_argument('--out', help='Output directory (default: MODELS_DIR/compiled)')
+    args = parser.parse_args()
+
+    # Always rebuild from the pickles, never from previously exported artifacts
+    os.environ['USE_COMPILED_ARTIFACTS'] = 'false'
+    os.environ['FAST_SCORING'] = 'true'
+    warnings.filterwarnings('ignore')
+
+    spec = importlib.util.spec_from_file_location('ml_api_server', os.path.join(BACKEND_DIR, 'ml-api-server.py'))
+    server = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(server)
+    server.load_models()
+
+    missing = [m for m in server.MODEL_SPECS if server.models[m] is not None and server.compiled_models[m] is None]
+    if missing:
+        print(f"Warning: no verified compiled scorer for {', '.join(missing)}; they will keep loading from pickles")
+
+    out_dir = args.out or server.compiled_artifacts_dir()
+    manifest = server.export_compiled_artifacts(out_dir)
+    for model_type, entry in manifest['models'].items():
+        size = sum(os.path.getsize(os.path.join(out_dir, path)) for path in entry['arrays'].values())
+        print(f"{model_type}: {entry['kind']} ({size / 1024:.1f} KB) -> {os.path.join(out_dir, model_type)}")
+    print(f"Manifest written to {os.path.join(out_dir, 'manifest.json')}")
+    return 0 if manifest['models'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,469 @@
+# BloomBuddy fast scoring engine
+# Compiles the fitted scikit-learn / XGBoost models loaded by ml-api-server.py into
+# flat NumPy arrays so single-row requests skip the estimator call overhead.
+#
+# Only NumPy is imported here. Compilation reads the attributes of already-loaded
+# estimators; scoring never touches scikit-learn or xgboost.
+
+import hashlib
+import json
+import math
+import os
+import shutil
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# Bumped whenever the on-disk layout written by save_compiled_models changes
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+_SIGN_BIT = np.uint64(0x8000000000000000)
+_FLOAT64_MAX = np.finfo(np.float64).max
+
+
+class UnsupportedModelError(ValueError):
+    """Raised when an estimator has no compiled equivalent"""
+
+
+def _sigmoid(margin: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-margin))
+
+
+def _scaler_params(scaler: Any, n_features: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (mean, scale) of a StandardScaler-like transform; identity when no scaler"""
+    if scaler is None:
+        return np.zeros(n_features), np.ones(n_features)
+    if not hasattr(scaler, 'mean_') or not hasattr(scaler, 'scale_'):
+        raise UnsupportedModelError(f"Cannot fold scaler of type {type(scaler).__name__}")
+    mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+    return np.asarray(mean, dtype=np.float64), np.asarray(scale, dtype=np.float64)
+
+
+def _float_to_ordered(values: np.ndarray) -> np.ndarray:
+    """Map float64 values to uint64 keys with the same ordering"""
+    bits = values.view(np.uint64)
+    return np.where(bits & _SIGN_BIT, ~bits, bits | _SIGN_BIT)
+
+
+def _ordered_to_float(keys: np.ndarray) -> np.ndarray:
+    bits = np.where(keys & _SIGN_BIT, keys & ~_SIGN_BIT, ~keys)
+    return bits.view(np.float64)
+
+
+def raw_space_thresholds(thresholds: np.ndarray, mean: np.ndarray, scale: np.ndarray, strict: bool) -> np.ndarray:
+    """
+    Fold a StandardScaler into tree split thresholds.
+
+    Trees compare float32((x - mean) / scale) against their threshold: `<=` for
+    scikit-learn, `<` (strict) for XGBoost. Both sides are monotone in the raw value x,
+    so each split has a raw-space boundary b with  go_left(x) <=> x < b.  The boundary
+    is found by bisection over the float64 bit patterns, which makes every routing
+    decision identical to the original scaler + estimator pipeline.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+
+    def goes_left(x):
+        scaled = ((x - mean) / scale).astype(np.float32).astype(np.float64)
+        return scaled < thresholds if strict else scaled <= thresholds
+
+    # Invariant: goes_left(lo) is True and goes_left(hi) is False
+    lo = _float_to_ordered(np.full(thresholds.shape, -_FLOAT64_MAX))
+    hi = _float_to_ordered(np.full(thresholds.shape, _FLOAT64_MAX))
+    with np.errstate(over='ignore', invalid='ignore'):
+        always_left = goes_left(np.full(thresholds.shape, _FLOAT64_MAX))
+        never_left = ~goes_left(np.full(thresholds.shape, -_FLOAT64_MAX))
+        active = ~(always_left | never_left)
+        while True:
+            open_range = active & (hi - lo > 1)
+            if not open_range.any():
+                break
+            mid = lo + (hi - lo) // np.uint64(2)
+            mid_left = goes_left(_ordered_to_float(mid))
+            lo = np.where(open_range & mid_left, mid, lo)
+            hi = np.where(open_range & ~mid_left, mid, hi)
+
+    boundaries = _ordered_to_float(hi)
+    boundaries = np.where(always_left, np.inf, boundaries)
+    return np.where(never_left, -np.inf, boundaries)
+
+
+class CompiledTreeEnsemble:
+    """
+    Array-backed tree ensemble. Nodes of all trees are concatenated; leaves point
+    to themselves so every row can be advanced a fixed `max_depth` steps at once.
+    """
+
+    kind = 'tree_ensemble'
+    array_fields = ('feature', 'boundary', 'left', 'right', 'default_left', 'leaf_value', 'roots')
+    scalar_fields = ('max_depth', 'n_features', 'aggregation', 'base_margin')
+
+    def __init__(self, feature, boundary, left, right, default_left, leaf_value, roots,
+                 max_depth, n_features, aggregation, base_margin=0.0):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.boundary = np.asarray(boundary, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.leaf_value = np.asarray(leaf_value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = int(max_depth)
+        self.aggregation = aggregation  # 'mean' (random forest) or 'logistic_sum' (boosted trees)
+        self.base_margin = float(base_margin)
+        self.n_features = int(n_features)
+
+    def positive_proba(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        for _ in range(self.max_depth):
+            values = X[rows, self.feature[nodes]]
+            go_left = np.where(np.isnan(values), self.default_left[nodes], values < self.boundary[nodes])
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        leaves = self.leaf_value[nodes]
+        if self.aggregation == 'mean':
+            return leaves.mean(axis=1)
+        # XGBoost accumulates the margin tree by tree in float32, starting from the base margin
+        margin = np.cumsum(
+            np.column_stack([np.full(X.shape[0], self.base_margin, dtype=np.float32), leaves.astype(np.float32)]),
+            axis=1, dtype=np.float32
+        )[:, -1]
+        return (np.float32(1.0) / (np.float32(1.0) + np.exp(-margin))).astype(np.float64)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        positive = self.positive_proba(X)
+        return np.column_stack([1.0 - positive, positive])
+
+
+class CompiledLinear:
+    """Logistic model with the scaler folded into its weights: sigmoid(x . w + b)"""
+
+    kind = 'linear'
+    array_fields = ('weights',)
+    scalar_fields = ('bias',)
+
+    def __init__(self, weights, bias):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.n_features = len(self.weights)
+        # Plain-float copy for single rows, where NumPy call overhead outweighs the math
+        self._weight_list = [float(w) for w in self.weights]
+
+    def positive_proba(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return _sigmoid(X @ self.weights + self.bias)
+
+    def score_row(self, row: List[float]) -> float:
+        """Probability for one feature vector: one dot product plus a sigmoid"""
+        margin = self.bias + math.fsum(w * float(x) for w, x in zip(self._weight_list, row))
+        if margin >= 0:
+            return 1.0 / (1.0 + math.exp(-margin))
+        odds = math.exp(margin)
+        return odds / (1.0 + odds)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        positive = self.positive_proba(X)
+        return np.column_stack([1.0 - positive, positive])
+
+
+def _compile_sklearn_forest(model: Any, scaler: Any) -> CompiledTreeEnsemble:
+    estimators = getattr(model, 'estimators_', None) or [model]
+    if not all(hasattr(tree, 'tree_') for tree in estimators):
+        raise UnsupportedModelError(f"{type(model).__name__} is not a forest of decision trees")
+    if len(model.classes_) != 2:
+        raise UnsupportedModelError("Only binary classifiers can be compiled")
+
+    mean, scale = _scaler_params(scaler, model.n_features_in_)
+    parts = {key: [] for key in ('feature', 'boundary', 'left', 'right', 'default_left', 'leaf_value')}
+    roots, offset, max_depth = [], 0, 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        feature = np.where(is_leaf, 0, tree.feature)
+
+        boundary = raw_space_thresholds(tree.threshold, mean[feature], scale[feature], strict=False)
+        counts = tree.value[:, 0, :]
+        missing_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool))
+
+        parts['feature'].append(feature)
+        parts['boundary'].append(np.where(is_leaf, np.inf, boundary))
+        parts['left'].append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        parts['right'].append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+        parts['default_left'].append(np.asarray(missing_left, dtype=bool))
+        parts['leaf_value'].append(counts[:, 1] / counts.sum(axis=1))
+        roots.append(offset)
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    return CompiledTreeEnsemble(
+        **{key: np.concatenate(values) for key, values in parts.items()},
+        roots=roots, max_depth=max_depth, n_features=model.n_features_in_, aggregation='mean'
+    )
+
+
+def _parse_base_score(raw: str) -> float:
+    # XGBoost >= 3 serialises base_score as a vector, e.g. "[5.495868E-1]"
+    return float(str(raw).strip('[]').split(',')[0])
+
+
+def _compile_xgboost(model: Any, scaler: Any) -> CompiledTreeEnsemble:
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+    if learner['objective']['name'] != 'binary:logistic':
+        raise UnsupportedModelError(f"Unsupported XGBoost objective {learner['objective']['name']}")
+    if learner['gradient_booster']['name'] != 'gbtree':
+        raise UnsupportedModelError(f"Unsupported XGBoost booster {learner['gradient_booster']['name']}")
+
+    trees = learner['gradient_booster']['model']['trees']
+    try:
+        best_iteration = model.best_iteration
+    except AttributeError:
+        best_iteration = None
+    if best_iteration is not None:
+        trees = trees[:(best_iteration + 1) * max(1, int(getattr(model, 'num_parallel_tree', None) or 1))]
+
+    n_features = int(learner['learner_model_param']['num_feature'])
+    mean, scale = _scaler_params(scaler, n_features)
+    base_score = _parse_base_score(learner['learner_model_param']['base_score'])
+
+    parts = {key: [] for key in ('feature', 'boundary', 'left', 'right', 'default_left', 'leaf_value')}
+    roots, offset, max_depth = [], 0, 0
+    for tree in trees:
+        if any(tree['split_type']):
+            raise UnsupportedModelError("Categorical XGBoost splits are not supported")
+        left = np.asarray(tree['left_children'])
+        right = np.asarray(tree['right_children'])
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32).astype(np.float64)
+        node_ids = np.arange(len(left))
+        is_leaf = left == -1
+        feature = np.where(is_leaf, 0, np.asarray(tree['split_indices']))
+
+        boundary = raw_space_thresholds(conditions, mean[feature], scale[feature], strict=True)
+
+        parts['feature'].append(feature)
+        parts['boundary'].append(np.where(is_leaf, np.inf, boundary))
+        parts['left'].append(np.where(is_leaf, node_ids, left) + offset)
+        parts['right'].append(np.where(is_leaf, node_ids, right) + offset)
+        parts['default_left'].append(np.asarray(tree['default_left'], dtype=bool))
+        # Leaf weights are stored in split_conditions for leaf nodes
+        parts['leaf_value'].append(np.where(is_leaf, conditions, 0.0))
+        roots.append(offset)
+        offset += len(left)
+        max_depth = max(max_depth, _tree_depth(left, right))
+
+    return CompiledTreeEnsemble(
+        **{key: np.concatenate(values) for key, values in parts.items()},
+        roots=roots, max_depth=max_depth, n_features=n_features, aggregation='logistic_sum',
+        base_margin=-np.log(np.float32(1.0) / np.float32(base_score) - np.float32(1.0))
+    )
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    depth, frontier = 0, [0]
+    while True:
+        frontier = [child for node in frontier for child in (left[node], right[node]) if child != -1]
+        if not frontier:
+            return depth
+        depth += 1
+
+
+def is_logistic_model(model: Any) -> bool:
+    """True for fitted linear classifiers whose probability is sigmoid(coef . x + intercept)"""
+    if not (hasattr(model, 'coef_') and hasattr(model, 'intercept_') and hasattr(model, 'predict_proba')):
+        return False
+    model_name = type(model).__name__
+    if model_name in ('LogisticRegression', 'LogisticRegressionCV'):
+        return True
+    return model_name == 'SGDClassifier' and getattr(model, 'loss', None) in ('log', 'log_loss')
+
+
+def is_standard_scaler(scaler: Any) -> bool:
+    return scaler is not None and type(scaler).__name__ == 'StandardScaler' and hasattr(scaler, 'scale_')
+
+
+def fuse_linear_scaler(model: Any, scaler: Any = None) -> CompiledLinear:
+    """
+    Merge a StandardScaler into a logistic model's weights.
+
+    coef . ((x - mean) / scale) + intercept  ==  (coef / scale) . x + (intercept - (coef / scale) . mean)
+    """
+    if scaler is not None and not is_standard_scaler(scaler):
+        raise UnsupportedModelError(f"Cannot fuse scaler of type {type(scaler).__name__}")
+    coef = np.asarray(model.coef_, dtype=np.float64)
+    if coef.shape[0] != 1:
+        raise UnsupportedModelError("Only binary logistic models can be fused")
+    mean, scale = _scaler_params(scaler, coef.shape[1])
+    weights = coef[0] / scale
+    bias = float(np.asarray(model.intercept_, dtype=np.float64)[0] - np.dot(weights, mean))
+    return CompiledLinear(weights, bias)
+
+
+def compile_model(model: Any, scaler: Any = None):
+    """Compile a fitted estimator (and its StandardScaler, if any) into a NumPy-only scorer"""
+    model_name = type(model).__name__
+    if hasattr(model, 'get_booster'):
+        return _compile_xgboost(model, scaler)
+    if hasattr(model, 'tree_') or model_name in ('RandomForestClassifier', 'ExtraTreesClassifier'):
+        return _compile_sklearn_forest(model, scaler)
+    if is_logistic_model(model):
+        return fuse_linear_scaler(model, scaler)
+    raise UnsupportedModelError(f"No compiled scorer for {model_name}")
+
+
+COMPILED_TYPES = {cls.kind: cls for cls in (CompiledTreeEnsemble, CompiledLinear)}
+
+
+def file_digest(path: str) -> str:
+    """sha256 of a file, used to tie compiled artifacts to the pickles they came from"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _export_id(compiled: Any) -> str:
+    """Short content hash of a compiled scorer, naming the directory its arrays are written to"""
+    digest = hashlib.sha256(compiled.kind.encode('utf-8'))
+    for field in compiled.array_fields:
+        array = np.ascontiguousarray(getattr(compiled, field))
+        digest.update(f'{field}:{array.dtype.str}:{array.shape}'.encode('utf-8'))
+        digest.update(array.tobytes())
+    scalars = {field: getattr(compiled, field) for field in compiled.scalar_fields}
+    digest.update(json.dumps(scalars, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+def _write_array(path: str, array: np.ndarray):
+    # A new inode renamed into place: processes that memory-mapped the old file keep reading it
+    with open(path + '.tmp', 'wb') as f:
+        np.save(f, array, allow_pickle=False)
+    os.replace(path + '.tmp', path)
+
+
+def _read_manifest(directory: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'models': {}}
+
+
+def _prune_exports(out_dir: str, manifests: List[Dict[str, Any]]):
+    """
+    Delete array files and export directories no longer named by any of `manifests`.
+    Unlinking never invalidates an existing memory map, so live scorers keep working.
+    """
+    keep = set()
+    for manifest in manifests:
+        for entry in manifest['models'].values():
+            for path in entry['arrays'].values():
+                keep.update((os.path.normpath(path), os.path.dirname(os.path.normpath(path))))
+    for model_type in {model_type for manifest in manifests for model_type in manifest['models']}:
+        model_dir = os.path.join(out_dir, model_type)
+        if not os.path.isdir(model_dir):
+            continue
+        for name in os.listdir(model_dir):
+            if os.path.join(model_type, name) in keep:
+                continue
+            path = os.path.join(model_dir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif name.endswith(('.npy', '.tmp')):
+                os.remove(path)
+
+
+def _commit_manifest(out_dir: str, manifest: Dict[str, Any]):
+    """Switch out_dir to `manifest` atomically, keeping the exports of the one it replaces"""
+    previous = _read_manifest(out_dir)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    # The previous export stays on disk for processes that read its manifest but have not mapped it yet
+    _prune_exports(out_dir, [manifest, previous])
+
+
+def save_compiled_models(compiled_models: Dict[str, Any], out_dir: str, sources: Dict[str, Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Write compiled scorers as uncompressed .npy arrays plus a JSON manifest.
+    Each scorer goes to a new <model_type>/<content hash>/ directory and existing
+    array files are never written over, so re-exporting cannot change the weights a
+    running server has memory-mapped. The manifest is written last, so a directory
+    without one is never half-read.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {'format_version': ARTIFACT_FORMAT_VERSION, 'models': {}}
+    for model_type, compiled in compiled_models.items():
+        if compiled is None:
+            continue
+        export_dir = os.path.join(model_type, _export_id(compiled))
+        os.makedirs(os.path.join(out_dir, export_dir), exist_ok=True)
+        arrays = {}
+        for field in compiled.array_fields:
+            path = os.path.join(export_dir, f'{field}.npy')
+            _write_array(os.path.join(out_dir, path), np.ascontiguousarray(getattr(compiled, field)))
+            arrays[field] = path
+        manifest['models'][model_type] = {
+            'kind': compiled.kind,
+            'arrays': arrays,
+            'scalars': {field: getattr(compiled, field) for field in compiled.scalar_fields},
+            'sources': (sources or {}).get(model_type, {})
+        }
+
+    _commit_manifest(out_dir, manifest)
+    return manifest
+
+
+def install_compiled_models(src_dir: str, out_dir: str) -> Dict[str, Any]:
+    """
+    Install compiled artifacts written by save_compiled_models into out_dir: export
+    directories out_dir lacks are copied in under a temporary name and renamed, then
+    the manifest is switched atomically. Servers mapping out_dir are never disturbed.
+    """
+    manifest = _read_manifest(src_dir)
+    if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise UnsupportedModelError(f"No compiled artifacts of format {ARTIFACT_FORMAT_VERSION} in {src_dir}")
+    os.makedirs(out_dir, exist_ok=True)
+    for entry in manifest['models'].values():
+        for export_dir in {os.path.dirname(path) for path in entry['arrays'].values()}:
+            target = os.path.join(out_dir, export_dir)
+            # Export directories are named by content hash, so an existing one already holds these arrays
+            if os.path.isdir(target):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.rmtree(target + '.tmp', ignore_errors=True)
+            shutil.copytree(os.path.join(src_dir, export_dir), target + '.tmp')
+            os.replace(target + '.tmp', target)
+    _commit_manifest(out_dir, manifest)
+    return manifest
+
+
+def load_compiled_models(directory: str, mmap_mode: str = 'r', model_types: List[str] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Open compiled scorers written by save_compiled_models (only `model_types`, if given).
+    Arrays are memory-mapped read-only, so loading is near-instant and every process
+    on the host shares one page-cache copy of the model weights.
+    """
+    with open(os.path.join(directory, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise UnsupportedModelError(f"Unsupported compiled artifact format {manifest.get('format_version')}")
+
+    compiled = {}
+    for model_type, entry in manifest['models'].items():
+        if model_types is not None and model_type not in model_types:
+            continue
+        cls = COMPILED_TYPES[entry['kind']]
+        arrays = {
+            field: np.load(os.path.join(directory, path), mmap_mode=mmap_mode, allow_pickle=False)
+            for field, path in entry['arrays'].items()
+        }
+        compiled[model_type] = cls(**arrays, **entry['scalars'])
+    return compiled, manifest
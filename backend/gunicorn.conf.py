@@ -0,0 +1,52 @@
+# Gunicorn configuration for the BloomBuddy ML API
+# Usage (from the backend directory):  gunicorn -c gunicorn.conf.py
+#
+# Models are loaded once in the master before workers are forked (preload_app), so
+# every worker shares the same physical pages copy-on-write instead of unpickling
+# its own copy.
+
+import gc
+import importlib
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+# Chats sent to the Flask route park a request thread on the LLM proxy's event loop
+# while tokens arrive, so workers run several threads to keep predictions flowing
+# alongside them (with LLM_CHAT_PORT set, chats can bypass the threads entirely)
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+
+wsgi_app = 'ml-api-server:create_app()'
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# With preloading the master must finish loading before it forks (threads do not
+# survive fork); without it each worker warms up in the background instead
+os.environ.setdefault('MODEL_LOADING', 'eager' if preload_app else 'background')
+
+
+def on_starting(server):
+    # Worker metrics snapshots from a previous run would otherwise be summed into /metrics
+    from metrics import clear_multiprocess_dir
+    clear_multiprocess_dir(os.getenv('METRICS_DIR'))
+
+
+def when_ready(server):
+    # Runs in the master after the app has been preloaded and before the first fork.
+    # Moving every object loaded so far into the permanent generation stops the
+    # workers' cyclic GC from writing to their headers, which would otherwise
+    # copy the shared pages into each worker.
+    if preload_app:
+        gc.collect()
+        gc.freeze()
+        server.log.info(f"Froze {gc.get_freeze_count()} preloaded objects before forking workers")
+
+
+def post_fork(server, worker):
+    server.log.info(f"Worker spawned (pid: {worker.pid}, preloaded models: {preload_app})")
+
+
+def post_worker_init(worker):
+    # Each worker serves LLM_CHAT_PORT (if set) from its own LLM proxy event loop; the
+    # app module is already imported here, preloaded or not
+    importlib.import_module('ml-api-server').start_chat_listener()
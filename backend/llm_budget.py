@@ -0,0 +1,242 @@
+# BloomBuddy LLM context budget and usage accounting
+# Estimates prompt size locally, trims (or summarizes) the oldest chat turns so a
+# request fits a token budget, and records prompt/completion tokens per chat session,
+# in memory or in a SQLite file shared by every gunicorn worker.
+
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Conservative characters-per-token ratio for English text (overestimates slightly)
+CHARS_PER_TOKEN = 3.5
+# Role markers and separators added around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_HEADER = 'Summary of earlier conversation turns (trimmed to fit the context budget):'
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def message_text(message: Dict[str, Any]) -> str:
+    """Text of a message whose content is a string or a list of content blocks"""
+    content = message.get('content', '')
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return ' '.join(block.get('text', '') for block in content if isinstance(block, dict))
+    return str(content)
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    return estimate_tokens(message_text(message)) + MESSAGE_OVERHEAD_TOKENS
+
+
+def summarize_turns(messages: List[Dict[str, Any]], max_tokens: int) -> str:
+    """
+    Extractive summary of dropped turns: the opening of each one, newest kept first
+    when the whole list does not fit in max_tokens. No model call is made.
+    """
+    lines = []
+    for message in messages:
+        text = ' '.join(message_text(message).split())
+        if len(text) > 160:
+            text = text[:157].rstrip() + '...'
+        lines.append(f"- {message.get('role', 'user').capitalize()}: {text}")
+
+    budget_chars = int(max_tokens * CHARS_PER_TOKEN) - len(SUMMARY_HEADER)
+    kept = []
+    for line in reversed(lines):
+        if len(line) + 1 > budget_chars:
+            break
+        kept.append(line)
+        budget_chars -= len(line) + 1
+    return '\n'.join([SUMMARY_HEADER] + kept[::-1])
+
+
+def fit_to_budget(system: Optional[str], messages: List[Dict[str, Any]], budget: int,
+                  summarize: bool = True, summary_tokens: int = 300) -> Tuple[Optional[str], List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Drop the oldest turns until the system prompt plus messages fit in `budget`
+    estimated tokens. The latest message is always kept, and the kept history starts
+    with a user turn as the Messages API requires. With `summarize`, the dropped turns
+    are condensed into the system prompt. Returns (system, messages, report).
+    """
+    system_tokens = estimate_tokens(system or '')
+    costs = [message_tokens(message) for message in messages]
+    total = system_tokens + sum(costs)
+    if budget <= 0 or total <= budget or len(messages) <= 1:
+        return system, messages, {'estimatedPromptTokens': total, 'trimmedMessages': 0}
+
+    available = budget - system_tokens - (summary_tokens if summarize else 0)
+    used = costs[-1]
+    keep_from = len(messages) - 1
+    while keep_from > 0 and used + costs[keep_from - 1] <= available:
+        keep_from -= 1
+        used += costs[keep_from]
+    while keep_from < len(messages) - 1 and messages[keep_from].get('role') != 'user':
+        keep_from += 1
+
+    dropped, kept = messages[:keep_from], messages[keep_from:]
+    if summarize and dropped:
+        summary = summarize_turns(dropped, summary_tokens)
+        system = f'{system}\n\n{summary}' if system else summary
+    total = estimate_tokens(system or '') + sum(costs[keep_from:])
+    return system, kept, {'estimatedPromptTokens': total, 'trimmedMessages': len(dropped)}
+
+
+def _empty_usage(session_id: str, now: float) -> Dict[str, Any]:
+    return {
+        'session_id': session_id, 'requests': 0, 'cached_requests': 0,
+        'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0,
+        'trimmed_messages': 0, 'first_seen': now, 'last_seen': now
+    }
+
+
+USAGE_SORT_KEYS = ('total_tokens', 'prompt_tokens', 'completion_tokens', 'requests', 'last_seen')
+
+
+class SessionUsage:
+    """Per-process token usage per chat session, keeping the most recently active max_sessions"""
+
+    def __init__(self, max_sessions: int = 10000):
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, session_id: str, usage: Optional[Dict[str, int]], cached: bool = False, trimmed_messages: int = 0) -> None:
+        """Add one chat request; usage is None when no upstream tokens were spent (cache hit or coalesced)"""
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id) or _empty_usage(session_id, now)
+            entry['requests'] += 1
+            entry['cached_requests'] += int(cached or usage is None)
+            if usage:
+                entry['prompt_tokens'] += usage.get('promptTokens', 0)
+                entry['completion_tokens'] += usage.get('completionTokens', 0)
+                entry['total_tokens'] += usage.get('promptTokens', 0) + usage.get('completionTokens', 0)
+            entry['trimmed_messages'] += trimmed_messages
+            entry['last_seen'] = now
+            self._sessions[session_id] = entry
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            return dict(entry) if entry is not None else None
+
+    def top(self, limit: int = 20, sort: str = 'total_tokens') -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = [dict(entry) for entry in self._sessions.values()]
+        return sorted(entries, key=lambda entry: entry[sort], reverse=True)[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'sessions': len(self._sessions),
+                'total_tokens': sum(entry['total_tokens'] for entry in self._sessions.values()),
+                'pid': os.getpid()
+            }
+
+
+class SharedSessionUsage:
+    """
+    Session usage in a local SQLite file (WAL mode), so every gunicorn worker adds to
+    the same totals and they survive restarts. Rows of the least recently active
+    sessions beyond max_sessions are trimmed every few writes; SQLite errors are
+    logged and never fail a chat request.
+    """
+
+    def __init__(self, path: str, max_sessions: int = 100000):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.trim_interval = max(1, max_sessions // 16)
+        self._local = threading.local()
+        self._counter_lock = threading.Lock()
+        self._records_since_trim = 0
+        self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, re-opened after fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=0.5, isolation_level=None, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS llm_usage ('
+                'session_id TEXT PRIMARY KEY, requests INTEGER NOT NULL, cached_requests INTEGER NOT NULL, '
+                'prompt_tokens INTEGER NOT NULL, completion_tokens INTEGER NOT NULL, total_tokens INTEGER NOT NULL, '
+                'trimmed_messages INTEGER NOT NULL, first_seen REAL NOT NULL, last_seen REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS llm_usage_total_tokens ON llm_usage (total_tokens)')
+            connection.execute('CREATE INDEX IF NOT EXISTS llm_usage_last_seen ON llm_usage (last_seen)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def record(self, session_id: str, usage: Optional[Dict[str, int]], cached: bool = False, trimmed_messages: int = 0) -> None:
+        now = time.time()
+        prompt = usage.get('promptTokens', 0) if usage else 0
+        completion = usage.get('completionTokens', 0) if usage else 0
+        try:
+            connection = self._connection()
+            connection.execute(
+                'INSERT INTO llm_usage VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(session_id) DO UPDATE SET requests = requests + 1, '
+                'cached_requests = cached_requests + excluded.cached_requests, '
+                'prompt_tokens = prompt_tokens + excluded.prompt_tokens, '
+                'completion_tokens = completion_tokens + excluded.completion_tokens, '
+                'total_tokens = total_tokens + excluded.total_tokens, '
+                'trimmed_messages = trimmed_messages + excluded.trimmed_messages, last_seen = excluded.last_seen',
+                (session_id, int(cached or usage is None), prompt, completion, prompt + completion, trimmed_messages, now, now)
+            )
+            with self._counter_lock:
+                self._records_since_trim += 1
+                trim = self._records_since_trim >= self.trim_interval
+                if trim:
+                    self._records_since_trim = 0
+            if trim:
+                connection.execute(
+                    'DELETE FROM llm_usage WHERE session_id IN '
+                    '(SELECT session_id FROM llm_usage ORDER BY last_seen DESC LIMIT -1 OFFSET ?)', (self.max_sessions,)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"LLM usage write failed: {str(e)}")
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            row = self._connection().execute('SELECT * FROM llm_usage WHERE session_id = ?', (session_id,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM usage read failed: {str(e)}")
+            return None
+        return dict(row) if row is not None else None
+
+    def top(self, limit: int = 20, sort: str = 'total_tokens') -> List[Dict[str, Any]]:
+        if sort not in USAGE_SORT_KEYS:
+            raise ValueError(f'Unknown sort key: {sort}')
+        try:
+            rows = self._connection().execute(f'SELECT * FROM llm_usage ORDER BY {sort} DESC LIMIT ?', (limit,)).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM usage read failed: {str(e)}")
+            return []
+        return [dict(row) for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            sessions, total = self._connection().execute(
+                'SELECT COUNT(*), COALESCE(SUM(total_tokens), 0) FROM llm_usage').fetchone()
+        except sqlite3.Error:
+            sessions, total = None, None
+        return {'backend': 'sqlite', 'path': self.path, 'sessions': sessions, 'total_tokens': total, 'pid': os.getpid()}
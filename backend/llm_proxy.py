@@ -0,0 +1,416 @@
+# BloomBuddy LLM proxy transport
+# Pooled keep-alive connections (with retries on 429/5xx) for calls to the Anthropic
+# Messages API, and streaming of its responses to the browser as server-sent events.
+# Streaming upstream I/O runs on a single asyncio event loop in a daemon thread, shared
+# by every chat in the process. Chats served through the WSGI app still park their
+# request thread on a queue for the whole generation; chats served by an aiohttp app
+# on the same loop (StreamingLLMProxy.serve) hold no thread at all.
+
+import asyncio
+import atexit
+import email.utils
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+
+import aiohttp
+import requests
+from aiohttp import web
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import InvalidHeader
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of an upstream stream on the event queue
+_END = object()
+
+# Upstream statuses worth retrying: rate limited, overloaded (529) or a transient server
+# error, all of which Anthropic returns before doing any work on the request
+RETRY_STATUSES = (429, 500, 502, 503, 504, 529)
+
+
+def request_key(payload: Dict[str, Any]) -> str:
+    """Content address of an upstream request: hash of its canonical JSON, ignoring 'stream'"""
+    canonical = json.dumps({k: v for k, v in payload.items() if k != 'stream'}, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller runs the function and
+    every caller that arrives while it is running waits for and shares its result (or
+    exception) instead of repeating the work.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Returns (result, shared), where shared is True if another caller's result was reused"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines that all run on one event loop"""
+
+    def __init__(self):
+        self._calls = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Await fn() or the call already in flight for key; returns (result, shared)"""
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future), True
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Marks the exception retrieved when nobody else was waiting for it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delay in seconds or an HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class UpstreamRetry(Retry):
+    """Retry that honours Retry-After on every retried status, capped at max_retry_after seconds"""
+
+    RETRY_AFTER_STATUS_CODES = frozenset(RETRY_STATUSES)
+
+    def __init__(self, *args, max_retry_after: float = 30, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_retry_after = max_retry_after
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.max_retry_after = self.max_retry_after
+        return retry
+
+    def get_retry_after(self, response):
+        try:
+            retry_after = super().get_retry_after(response)
+        except InvalidHeader:
+            return None
+        return None if retry_after is None else min(retry_after, self.max_retry_after)
+
+
+def create_upstream_session(pool_maxsize: int = 16, max_retries: int = 2, backoff_factor: float = 0.5,
+                            max_retry_after: float = 30) -> requests.Session:
+    """
+    requests.Session that keeps up to `pool_maxsize` connections per upstream host alive
+    (further concurrent calls wait for a free one) and retries rate-limited and
+    transient 5xx responses with exponential backoff. Read errors are not retried,
+    since the upstream may already have generated (and billed) the response.
+    """
+    retry = UpstreamRetry(
+        total=max_retries, connect=max_retries, read=0, status=max_retries,
+        backoff_factor=backoff_factor, status_forcelist=RETRY_STATUSES, allowed_methods=None,
+        respect_retry_after_header=True, raise_on_status=False, max_retry_after=max_retry_after
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, pool_block=True, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def iter_sse(content: aiohttp.StreamReader) -> AsyncIterator[Tuple[str, str]]:
+    """Parse an upstream text/event-stream body into (event, data) pairs"""
+    event, data_lines = None, []
+    async for raw_line in content:
+        line = raw_line.decode('utf-8').rstrip('\r\n')
+        if not line:
+            if data_lines:
+                yield event or 'message', '\n'.join(data_lines)
+            event, data_lines = None, []
+        elif line.startswith(':'):
+            continue
+        elif line.startswith('event:'):
+            event = line[6:].strip()
+        elif line.startswith('data:'):
+            data_lines.append(line[5:].lstrip())
+    if data_lines:
+        yield event or 'message', '\n'.join(data_lines)
+
+
+def _log_completion_failure(completion: asyncio.Future):
+    if not completion.cancelled() and completion.exception() is not None:
+        logger.warning(f"LLM stream completion hook failed: {str(completion.exception())}")
+
+
+def upstream_error_message(status: int, body: str) -> str:
+    try:
+        return json.loads(body).get('error', {}).get('message', 'Unknown error')
+    except (ValueError, AttributeError):
+        return body[:200] or f'HTTP {status}'
+
+
+class StreamingLLMProxy:
+    """
+    Relays streaming Messages API calls through a background event loop.
+    The loop, its thread and the aiohttp session (a keep-alive pool of at most
+    `pool_maxsize` connections per host) are created lazily in the process that first
+    streams, so gunicorn workers never inherit them across fork. Rate-limited and
+    transient 5xx responses are retried like create_upstream_session does, before any
+    event reaches the client. `upstream_observer(status, seconds, first_token_seconds)`
+    is called when each upstream call ends, for latency metrics; status is the HTTP
+    status, 'error' or 'cancelled', and first_token_seconds is None without any text.
+    """
+
+    def __init__(self, read_timeout: float = 60, connect_timeout: float = 10, keepalive_seconds: float = 15,
+                 pool_maxsize: int = 16, max_retries: int = 2, backoff_factor: float = 0.5, max_retry_after: float = 30,
+                 upstream_observer: Callable[[str, float, Optional[float]], None] = None):
+        self.read_timeout = read_timeout
+        self.connect_timeout = connect_timeout
+        self.keepalive_seconds = keepalive_seconds
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_retry_after = max_retry_after
+        self.upstream_observer = upstream_observer
+        self._lock = threading.Lock()
+        self._loop = None
+        self._pid = None
+        self._session = None
+        atexit.register(self.close)
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='llm-proxy-loop', daemon=True).start()
+                self._loop, self._pid, self._session = loop, os.getpid(), None
+            return self._loop
+
+    def close(self):
+        """Close the pooled upstream connections of this process"""
+        if self._session is not None and self._pid == os.getpid() and not self._session.closed:
+            try:
+                asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result(timeout=5)
+            except Exception as e:
+                logger.warning(f"Failed to close the LLM proxy session: {str(e)}")
+
+    def _client_session(self) -> aiohttp.ClientSession:
+        # Only called on the loop thread, so no lock is needed
+        if self._session is None or self._session.closed:
+            timeout = aiohttp.ClientTimeout(total=None, connect=self.connect_timeout, sock_read=self.read_timeout)
+            connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.pool_maxsize)
+            self._session = aiohttp.ClientSession(timeout=timeout, connector=connector)
+        return self._session
+
+    def stream(self, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+               on_complete: Callable[[Dict[str, Any]], None] = None) -> Iterator[str]:
+        """
+        Start the upstream request and yield SSE-formatted events as they arrive:
+        'delta' with each text chunk, then 'done' with token usage, or 'error'.
+        Closing the generator (the client disconnected) cancels the upstream request.
+        `on_complete` gets the full response ({content, usage, model, provider}) once a
+        stream finishes successfully. It runs in the event loop's default executor, never on
+        the loop thread, so blocking bookkeeping (SQLite usage writes, cache locks) cannot
+        stall the other streams.
+        """
+        events = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self._relay(url, headers, dict(payload, stream=True), events.put, on_complete), self._event_loop()
+        )
+        finished = False
+        try:
+            while True:
+                try:
+                    item = events.get(timeout=self.keepalive_seconds)
+                except queue.Empty:
+                    # A comment line keeps intermediaries from timing out the connection and
+                    # surfaces a dropped client on the write
+                    yield ': keep-alive\n\n'
+                    continue
+                if item is _END:
+                    finished = True
+                    return
+                yield format_sse(*item)
+        finally:
+            if not finished:
+                future.cancel()
+                logger.debug("Client disconnected, cancelled upstream LLM stream")
+
+    async def stream_async(self, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+                           on_complete: Callable[[Dict[str, Any]], None] = None) -> AsyncIterator[str]:
+        """
+        stream() for handlers that run on this proxy's event loop (see serve): yields the
+        same SSE text, but waits on the loop instead of parking a thread. Closing the
+        generator (the client disconnected) cancels the upstream request.
+        """
+        events = asyncio.Queue()
+        relay = asyncio.ensure_future(
+            self._relay(url, headers, dict(payload, stream=True), events.put_nowait, on_complete)
+        )
+        finished = False
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(events.get(), self.keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                if item is _END:
+                    finished = True
+                    return
+                yield format_sse(*item)
+        finally:
+            if not finished:
+                relay.cancel()
+                logger.debug("Client disconnected, cancelled upstream LLM stream")
+
+    async def post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> Tuple[int, str]:
+        """One non-streaming upstream call on the event loop, retried like stream(); returns (status, body)"""
+        response = await self._post_with_retries(url, headers, payload)
+        async with response:
+            return response.status, await response.text()
+
+    def serve(self, app: web.Application, host: str, port: int) -> Future:
+        """
+        Serve an aiohttp application on this proxy's event loop, so its handlers share the
+        upstream connection pool and hold no thread while they wait. The socket is bound
+        with SO_REUSEPORT, so every gunicorn worker can listen on the same port and the
+        kernel spreads connections across them. The returned future resolves once the
+        site is listening.
+        """
+        async def start() -> web.AppRunner:
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, host, port, reuse_port=True).start()
+            return runner
+
+        return asyncio.run_coroutine_threadsafe(start(), self._event_loop())
+
+    async def _relay(self, url: str, headers: Dict[str, str], payload: Dict[str, Any], put: Callable[[Any], None],
+                     on_complete: Callable[[Dict[str, Any]], None] = None):
+        usage = {'promptTokens': 0, 'completionTokens': 0}
+        model, stop_reason = payload.get('model'), None
+        chunks = []
+        start, first_token_seconds, status = time.perf_counter(), None, 'error'
+        try:
+            response = await self._post_with_retries(url, headers, payload)
+            status = str(response.status)
+            async with response:
+                if response.status != 200:
+                    body = await response.text()
+                    logger.error(f"Anthropic API error: {response.status} - {body[:200]}")
+                    put(('error', {
+                        'error': f"Anthropic API error: {upstream_error_message(response.status, body)}",
+                        'status': response.status
+                    }))
+                    return
+
+                async for event, data in iter_sse(response.content):
+                    message = json.loads(data)
+                    if event == 'message_start':
+                        model = message['message'].get('model', model)
+                        usage['promptTokens'] = message['message'].get('usage', {}).get('input_tokens', 0)
+                    elif event == 'content_block_delta' and message['delta'].get('type') == 'text_delta':
+                        if first_token_seconds is None:
+                            first_token_seconds = time.perf_counter() - start
+                        chunks.append(message['delta']['text'])
+                        put(('delta', {'text': message['delta']['text']}))
+                    elif event == 'message_delta':
+                        usage['completionTokens'] = message.get('usage', {}).get('output_tokens', usage['completionTokens'])
+                        stop_reason = message.get('delta', {}).get('stop_reason', stop_reason)
+                    elif event == 'error':
+                        status = 'error'
+                        put(('error', {'error': f"Anthropic API error: {message.get('error', {}).get('message', 'Unknown error')}"}))
+                        return
+
+            usage['totalTokens'] = usage['promptTokens'] + usage['completionTokens']
+            put(('done', {'usage': usage, 'model': model, 'provider': 'anthropic', 'stopReason': stop_reason}))
+            if on_complete is not None:
+                completion = asyncio.get_running_loop().run_in_executor(
+                    None, on_complete, {'content': ''.join(chunks), 'usage': usage, 'model': model, 'provider': 'anthropic'}
+                )
+                completion.add_done_callback(_log_completion_failure)
+        except asyncio.CancelledError:
+            status = 'cancelled'
+            raise
+        except Exception as e:
+            status = 'error'
+            logger.error(f"LLM stream error: {str(e)}")
+            put(('error', {'error': f'Request failed: {str(e)}'}))
+        finally:
+            put(_END)
+            if self.upstream_observer is not None:
+                self.upstream_observer(status, time.perf_counter() - start, first_token_seconds)
+
+    async def _post_with_retries(self, url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> aiohttp.ClientResponse:
+        session = self._client_session()
+        for attempt in range(self.max_retries + 1):
+            response = await session.post(url, json=payload, headers=headers)
+            if response.status not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+            delay = retry_after_seconds(response.headers.get('Retry-After'))
+            if delay is None:
+                delay = self.backoff_factor * (2 ** attempt)
+            response.release()
+            logger.warning(f"Upstream LLM returned {response.status}, retrying in {min(delay, self.max_retry_after):.2f}s")
+            await asyncio.sleep(min(delay, self.max_retry_after))
@@ -0,0 +1,258 @@
+# BloomBuddy metrics
+# Counters and histograms rendered in the Prometheus text exposition format (0.0.4),
+# without a client library dependency. Each process records its own values; with a
+# multiprocess directory every gunicorn worker also writes a snapshot of them there,
+# and /metrics sums the snapshots of all workers (including ones that have exited, so
+# counters never go backwards when a worker is recycled).
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STAGE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+UPSTREAM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames: Iterable[str], labelvalues: Iterable[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape_label(str(value))}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonic counter per label combination"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> List[list]:
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    @staticmethod
+    def merge(values: Dict[tuple, float], snapshot: List[list]) -> None:
+        for key, value in snapshot:
+            key = tuple(key)
+            values[key] = values.get(key, 0.0) + value
+
+    def render(self, values: Dict[tuple, float]) -> List[str]:
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in sorted(values.items())]
+
+
+class Histogram:
+    """Bucketed distribution (with sum and count) per label combination"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket (non-cumulative) counts, the last one for +Inf, then the sum
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def snapshot(self) -> List[list]:
+        with self._lock:
+            return [[list(key), list(counts), total] for key, (counts, total) in self._values.items()]
+
+    @staticmethod
+    def merge(values: Dict[tuple, list], snapshot: List[list]) -> None:
+        for key, counts, total in snapshot:
+            key = tuple(key)
+            entry = values.get(key)
+            if entry is None:
+                values[key] = [list(counts), total]
+            else:
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += total
+
+    def render(self, values: Dict[tuple, list]) -> List[str]:
+        lines = []
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+
+class CallbackGauge:
+    """Gauge read from a callback at render time; reflects only the process that answers the scrape"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...],
+                 callback: Callable[[], Dict[tuple, float]]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        try:
+            values = self.callback()
+        except Exception as e:
+            logger.warning(f"Metrics callback for {self.name} failed: {str(e)}")
+            return []
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in sorted(values.items())]
+
+
+class MetricsRegistry:
+    """
+    Collection of the process's metrics. With `multiprocess_dir`, snapshots of the
+    counters and histograms are written to <dir>/<pid>.json every `flush_interval`
+    seconds (and on every render), and render() sums the snapshots of every process.
+    """
+
+    def __init__(self, multiprocess_dir: Optional[str] = None, flush_interval: float = 5.0):
+        self.multiprocess_dir = multiprocess_dir
+        self.flush_interval = flush_interval
+        self._metrics = []
+        self._gauges = []
+        self._flusher_pid = None
+        self._flusher_lock = threading.Lock()
+        if multiprocess_dir:
+            os.makedirs(multiprocess_dir, exist_ok=True)
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge_callback(self, name: str, documentation: str, labelnames: Tuple[str, ...],
+                       callback: Callable[[], Dict[tuple, float]]) -> CallbackGauge:
+        gauge = CallbackGauge(name, documentation, labelnames, callback)
+        self._gauges.append(gauge)
+        return gauge
+
+    def snapshot(self) -> Dict[str, list]:
+        return {metric.name: metric.snapshot() for metric in self._metrics}
+
+    def flush(self) -> None:
+        """Write this process's snapshot atomically to the multiprocess directory"""
+        if not self.multiprocess_dir:
+            return
+        path = os.path.join(self.multiprocess_dir, f'{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Writing metrics snapshot failed: {str(e)}")
+
+    def start_flusher(self) -> None:
+        """Start the periodic snapshot writer of this process (idempotent, re-started after fork)"""
+        if not self.multiprocess_dir or self._flusher_pid == os.getpid():
+            return
+        with self._flusher_lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+
+        def flush_periodically():
+            while True:
+                time.sleep(self.flush_interval)
+                self.flush()
+
+        threading.Thread(target=flush_periodically, name='metrics-flusher', daemon=True).start()
+
+    def _snapshots(self) -> Iterable[Dict[str, list]]:
+        if not self.multiprocess_dir:
+            yield self.snapshot()
+            return
+        self.flush()
+        for filename in os.listdir(self.multiprocess_dir):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.multiprocess_dir, filename)) as f:
+                    yield json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable metrics snapshot {filename}: {str(e)}")
+
+    def render(self) -> str:
+        merged = {metric.name: {} for metric in self._metrics}
+        for snapshot in self._snapshots():
+            for metric in self._metrics:
+                metric.merge(merged[metric.name], snapshot.get(metric.name, []))
+
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render(merged[metric.name]))
+        for gauge in self._gauges:
+            lines.append(f'# HELP {gauge.name} {gauge.documentation}')
+            lines.append(f'# TYPE {gauge.name} gauge')
+            lines.extend(gauge.render())
+        return '\n'.join(lines) + '\n'
+
+
+def clear_multiprocess_dir(directory: str) -> None:
+    """Remove the snapshots of a previous server run (call before workers start)"""
+    if not directory or not os.path.isdir(directory):
+        return
+    for filename in os.listdir(directory):
+        if filename.endswith('.json') or filename.endswith('.json.tmp'):
+            try:
+                os.remove(os.path.join(directory, filename))
+            except OSError:
+                pass
@@ -1,15 +1,35 @@
 # BloomBuddy ML Models API Server
 # This is a template for connecting your trained ML models
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
+from aiohttp import web
+import aiohttp
+import asyncio
 import numpy as np
 import joblib
+import hashlib
+import hmac
+import json
 import logging
-from typing import Dict, List, Any
+from functools import partial
+from typing import Dict, List, Any, Tuple
 import os
+import threading
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 import requests
 from dotenv import load_dotenv
+from admission import AdmissionController, AdmissionRejected, RouteClassLimiter
+from fast_scoring import (MANIFEST_NAME, compile_model, file_digest, is_logistic_model, is_standard_scaler,
+                          load_compiled_models, save_compiled_models, UnsupportedModelError)
+from llm_budget import USAGE_SORT_KEYS, SessionUsage, SharedSessionUsage, fit_to_budget
+from metrics import STAGE_BUCKETS, UPSTREAM_BUCKETS, MetricsRegistry
+from llm_proxy import (AsyncSingleFlight, SingleFlight, StreamingLLMProxy, create_upstream_session, format_sse,
+                       request_key, upstream_error_message)
+from request_log import RequestLog
+from prediction_cache import PredictionCache, SharedPredictionCache, TieredPredictionCache, feature_key
 
 # Load environment variables from .env file
 load_dotenv()
@@ -34,100 +54,960 @@ scalers = {
     'hypertension': None
 }
 
-def load_models():
-    """Load your trained ML models and scalers"""
+# NumPy-only scorers compiled from the loaded model + scaler pairs (see fast_scoring.py)
+compiled_models = {
+    'diabetes': None,
+    'heart': None,
+    'hypertension': None
+}
+
+# Score through the compiled engine when it reproduces the original pipeline
+FAST_SCORING = os.getenv('FAST_SCORING', 'true').lower() == 'true'
+FAST_SCORING_TOLERANCE = float(os.getenv('FAST_SCORING_TOLERANCE', 1e-6))
+
+# Memory-mapped compiled artifacts (written by export_compiled_models.py); when present
+# and up to date they replace unpickling the models at startup
+USE_COMPILED_ARTIFACTS = os.getenv('USE_COMPILED_ARTIFACTS', 'true').lower() == 'true'
+
+# Per-model serving settings shared by the single, batch and assessment routes.
+# Feature names are listed in the column order each model was trained on;
+# dataset and artifact paths are relative to MODELS_DIR.
+MODEL_SPECS = {
+    'diabetes': {
+        'display_name': 'Diabetes',
+        'n_features': 8,
+        'confidence': 0.85,
+        'features': ['pregnancies', 'glucose', 'blood_pressure', 'skin_thickness', 'insulin', 'bmi', 'diabetes_pedigree_function', 'age'],
+        'dataset': 'Diabetes Model/diabetes.csv',
+        'target': 'Outcome',
+        'model_file': 'diabetes_model.pkl',
+        'scaler_file': 'diabetes_scaler.pkl'
+    },
+    'heart': {
+        'display_name': 'Heart disease',
+        'n_features': 13,
+        'confidence': 0.88,
+        'features': ['age', 'sex', 'chest_pain_type', 'resting_bp', 'cholesterol', 'fasting_bs', 'resting_ecg', 'max_hr', 'exercise_angina', 'oldpeak', 'st_slope', 'ca', 'thal'],
+        'dataset': 'Heart Model/heart.csv',
+        'target': 'target',
+        'model_file': 'heart_disease_model.pkl',
+        'scaler_file': 'heart_scaler.pkl'
+    },
+    'hypertension': {
+        'display_name': 'Hypertension',
+        'n_features': 12,
+        'confidence': 0.82,
+        'features': ['sex', 'age', 'smoking', 'cigs_per_day', 'bp_meds', 'diabetes', 'total_cholesterol', 'systolic_bp', 'diastolic_bp', 'bmi', 'heart_rate', 'glucose'],
+        'dataset': 'Hypertenstion Model/hypertension.csv',
+        'target': 'Risk',
+        'holdout_stratify': True,
+        'model_file': 'hypertension_model.pkl',
+        'scaler_file': 'hyper_scaler.pkl'
+    }
+}
+
+# Loading strategy: 'eager' loads every model before serving, 'background' serves
+# immediately and loads the models in a warmup thread, 'lazy' loads each model on
+# its first request
+MODEL_LOADING = os.getenv('MODEL_LOADING', 'background').lower()
+
+# Models served by this process (comma-separated); the others are never loaded
+ENABLED_MODELS = [
+    model_type.strip() for model_type in os.getenv('ENABLED_MODELS', ','.join(MODEL_SPECS)).split(',')
+    if model_type.strip() in MODEL_SPECS
+]
+if not ENABLED_MODELS:
+    logger.warning(f"ENABLED_MODELS matches none of {', '.join(MODEL_SPECS)}; no models will be served")
+
+# Alternative artifacts per model (comma-separated model=variant, e.g. diabetes=trees25
+# for a compressed forest from models/compress_diabetes.py): that model's pickles are
+# then read from MODELS_DIR/variants/<model>/<variant>/ instead of MODELS_DIR
+MODEL_VARIANTS = {}
+for entry in filter(None, (part.strip() for part in os.getenv('MODEL_VARIANTS', '').split(','))):
+    model_type, _, variant = entry.partition('=')
+    if model_type.strip() in MODEL_SPECS and variant.strip():
+        MODEL_VARIANTS[model_type.strip()] = variant.strip()
+    else:
+        logger.warning(f"Ignoring MODEL_VARIANTS entry '{entry}'")
+
+# API version; each model's model_version is this plus a hash of the artifact it was
+# loaded from (see artifact_version), and is folded into prediction cache keys
+MODEL_VERSION = '1.0'
+
+# Hot reload: poll MODELS_DIR every MODEL_RELOAD_INTERVAL seconds (0 = only via
+# /api/admin/reload); a new model must reach RELOAD_MIN_AUC on the held-out sample
+# and lose at most RELOAD_MAX_AUC_DROP against the live model to be swapped in
+MODEL_RELOAD_INTERVAL = float(os.getenv('MODEL_RELOAD_INTERVAL', 0))
+RELOAD_MIN_AUC = float(os.getenv('RELOAD_MIN_AUC', 0.6))
+RELOAD_MAX_AUC_DROP = float(os.getenv('RELOAD_MAX_AUC_DROP', 0.05))
+
+# Per-model LRU caches for repeated single-patient feature vectors
+PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', 1024))
+PREDICTION_CACHE_TTL = float(os.getenv('PREDICTION_CACHE_TTL', 0))
+prediction_caches = {
+    model_type: PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
+    for model_type in MODEL_SPECS
+}
+
+# Optional SQLite-backed tier shared by all gunicorn workers on the host
+SHARED_PREDICTION_CACHE_PATH = os.getenv('SHARED_PREDICTION_CACHE_PATH')
+shared_prediction_cache = None
+if SHARED_PREDICTION_CACHE_PATH:
     try:
-        models_dir = os.getenv('MODELS_DIR', './models')
-        
-        # Load diabetes model and scaler (from main models directory)
-        diabetes_model_path = os.path.join(models_dir, 'diabetes_model.pkl')
-        diabetes_scaler_path = os.path.join(models_dir, 'diabetes_scaler.pkl')
-        if os.path.exists(diabetes_model_path):
-            model_obj = joblib.load(diabetes_model_path)
-            if hasattr(model_obj, 'predict'):
-                models['diabetes'] = model_obj
-                logger.info("Diabetes model loaded successfully")
+        shared_prediction_cache = SharedPredictionCache(
+            SHARED_PREDICTION_CACHE_PATH,
+            max_entries=int(os.getenv('SHARED_PREDICTION_CACHE_SIZE', 100000)),
+            ttl_seconds=PREDICTION_CACHE_TTL
+        )
+        prediction_caches = {
+            model_type: TieredPredictionCache(cache, shared_prediction_cache)
+            for model_type, cache in prediction_caches.items()
+        }
+    except Exception as e:
+        logger.error(f"Shared prediction cache disabled: {str(e)}")
+        shared_prediction_cache = None
+
+# Upper bound on rows accepted by a single batch request
+MAX_BATCH_ROWS = int(os.getenv('MAX_BATCH_ROWS', 50000))
+
+# Worker threads used by /api/assess to score the disease models concurrently
+assessment_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('ASSESS_WORKERS', len(MODEL_SPECS))),
+    thread_name_prefix='assess'
+)
+
+# Upstream LLM API; point ANTHROPIC_BASE_URL at benchmarks/mock_llm_upstream.py to test locally
+ANTHROPIC_BASE_URL = os.getenv('ANTHROPIC_BASE_URL', 'https://api.anthropic.com').rstrip('/')
+ANTHROPIC_MESSAGES_URL = f'{ANTHROPIC_BASE_URL}/v1/messages'
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 60))
+
+# Upstream connections are pooled and kept alive (LLM_POOL_SIZE per host); 429 and
+# transient 5xx responses are retried up to LLM_MAX_RETRIES times with exponential
+# backoff, honouring Retry-After up to LLM_MAX_RETRY_AFTER seconds
+LLM_POOL_SIZE = int(os.getenv('LLM_POOL_SIZE', 16))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 2))
+LLM_RETRY_BACKOFF = float(os.getenv('LLM_RETRY_BACKOFF', 0.5))
+LLM_MAX_RETRY_AFTER = float(os.getenv('LLM_MAX_RETRY_AFTER', 30))
+llm_session = create_upstream_session(
+    pool_maxsize=LLM_POOL_SIZE, max_retries=LLM_MAX_RETRIES,
+    backoff_factor=LLM_RETRY_BACKOFF, max_retry_after=LLM_MAX_RETRY_AFTER
+)
+
+# Responses to deterministic chat requests (temperature <= LLM_CACHE_MAX_TEMPERATURE)
+# are cached by a hash of the upstream request, and identical ones already in flight
+# share a single upstream call
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv('LLM_CACHE_MAX_TEMPERATURE', 0))
+llm_response_cache = PredictionCache(int(os.getenv('LLM_CACHE_SIZE', 256)), float(os.getenv('LLM_CACHE_TTL', 3600)))
+llm_single_flight = SingleFlight()
+llm_async_single_flight = AsyncSingleFlight()
+
+# With LLM_CHAT_PORT set, every worker also serves /api/llm/chat on that port from an
+# aiohttp app on the LLM proxy's event loop (see start_chat_listener). Chats sent there
+# hold no request thread while the upstream generates; chats sent to the Flask route
+# still hold one each, and admission control is what keeps them from starving predictions
+LLM_CHAT_HOST = os.getenv('LLM_CHAT_HOST', '0.0.0.0')
+LLM_CHAT_PORT = int(os.getenv('LLM_CHAT_PORT', 0))
+
+# Chat histories are trimmed to LLM_CONTEXT_BUDGET estimated prompt tokens (0 disables);
+# with LLM_SUMMARIZE_TRIMMED the dropped turns are condensed into the system prompt
+LLM_CONTEXT_BUDGET = int(os.getenv('LLM_CONTEXT_BUDGET', 12000))
+LLM_SUMMARIZE_TRIMMED = os.getenv('LLM_SUMMARIZE_TRIMMED', 'true').lower() == 'true'
+LLM_SUMMARY_TOKENS = int(os.getenv('LLM_SUMMARY_TOKENS', 300))
+LLM_DEFAULT_MAX_TOKENS = int(os.getenv('LLM_DEFAULT_MAX_TOKENS', 8000))
+LLM_MAX_OUTPUT_TOKENS = int(os.getenv('LLM_MAX_OUTPUT_TOKENS', 8000))
+
+# Token usage per chat session (the request's sessionId); LLM_USAGE_PATH shares the
+# totals between gunicorn workers through a SQLite file
+LLM_USAGE_PATH = os.getenv('LLM_USAGE_PATH')
+llm_usage = SessionUsage(int(os.getenv('LLM_USAGE_MAX_SESSIONS', 10000)))
+if LLM_USAGE_PATH:
+    try:
+        llm_usage = SharedSessionUsage(LLM_USAGE_PATH, int(os.getenv('LLM_USAGE_MAX_SESSIONS', 100000)))
+    except Exception as e:
+        logger.error(f"Shared LLM usage tracking disabled: {str(e)}")
+
+# Admission control: each route class gets its own concurrency limit and a short queue
+# with a maximum wait, and is shed with 503 + Retry-After beyond that, so chat traffic
+# cannot take every request thread of a worker. The LLM and batch limits (plus their
+# queues) should stay below GUNICORN_THREADS to leave threads free for predictions
+ADMISSION_CONTROL = os.getenv('ADMISSION_CONTROL', 'true').lower() == 'true'
+_request_threads = int(os.getenv('GUNICORN_THREADS', 8))
+admission_controller = AdmissionController({
+    'predict': RouteClassLimiter(
+        'predict',
+        max_concurrency=int(os.getenv('ADMISSION_PREDICT_CONCURRENCY', _request_threads)),
+        max_queue=int(os.getenv('ADMISSION_PREDICT_QUEUE', 2 * _request_threads)),
+        max_wait=float(os.getenv('ADMISSION_PREDICT_MAX_WAIT', 1.0))
+    ),
+    'batch': RouteClassLimiter(
+        'batch',
+        max_concurrency=int(os.getenv('ADMISSION_BATCH_CONCURRENCY', 1)),
+        max_queue=int(os.getenv('ADMISSION_BATCH_QUEUE', 1)),
+        max_wait=float(os.getenv('ADMISSION_BATCH_MAX_WAIT', 5.0))
+    ),
+    'llm': RouteClassLimiter(
+        'llm',
+        max_concurrency=int(os.getenv('ADMISSION_LLM_CONCURRENCY', max(1, _request_threads // 2))),
+        max_queue=int(os.getenv('ADMISSION_LLM_QUEUE', 1)),
+        max_wait=float(os.getenv('ADMISSION_LLM_MAX_WAIT', 2.0))
+    )
+}, enabled=ADMISSION_CONTROL)
+
+# Route class of each endpoint; endpoints not listed (health, stats, admin) bypass admission
+ENDPOINT_CLASSES = {
+    'predict_diabetes': 'predict',
+    'predict_heart_disease': 'predict',
+    'predict_hypertension': 'predict',
+    'assess_patient': 'predict',
+    'predict_batch': 'batch',
+    'llm_chat': 'llm'
+}
+
+# Prometheus metrics served at /metrics; with METRICS_DIR every gunicorn worker writes
+# its counters there and /metrics reports the sum over all workers
+METRICS_DIR = os.getenv('METRICS_DIR')
+metrics_registry = MetricsRegistry(METRICS_DIR, flush_interval=float(os.getenv('METRICS_FLUSH_INTERVAL', 5)))
+http_requests_total = metrics_registry.counter(
+    'bloombuddy_http_requests_total', 'HTTP requests by route, method and status', ('route', 'method', 'status'))
+http_request_errors_total = metrics_registry.counter(
+    'bloombuddy_http_request_errors_total', 'HTTP responses with a 4xx or 5xx status', ('route', 'status_class'))
+http_request_duration = metrics_registry.histogram(
+    'bloombuddy_http_request_duration_seconds', 'Time from request start until the response body was sent', ('route',))
+prediction_stage_duration = metrics_registry.histogram(
+    'bloombuddy_prediction_stage_duration_seconds',
+    'Single-prediction time per stage: parse, validation, scaler, inference, serialization',
+    ('model', 'stage'), STAGE_BUCKETS)
+prediction_cache_results_total = metrics_registry.counter(
+    'bloombuddy_prediction_cache_results_total', 'Single-prediction cache lookups by result', ('model', 'result'))
+prediction_fallbacks_total = metrics_registry.counter(
+    'bloombuddy_prediction_fallbacks_total', 'Predictions that took a fallback path, by reason', ('model', 'reason'))
+admission_wait_duration = metrics_registry.histogram(
+    'bloombuddy_admission_wait_seconds', 'Time admitted requests waited in their route class queue',
+    ('route_class',), STAGE_BUCKETS + (0.5, 1.0, 2.5, 5.0))
+admission_rejected_total = metrics_registry.counter(
+    'bloombuddy_admission_rejected_total', 'Requests shed with 503 by admission control', ('route_class', 'reason'))
+llm_upstream_duration = metrics_registry.histogram(
+    'bloombuddy_llm_upstream_duration_seconds', 'Upstream LLM call duration by mode (json or stream) and status',
+    ('mode', 'status'), UPSTREAM_BUCKETS)
+llm_upstream_first_token = metrics_registry.histogram(
+    'bloombuddy_llm_upstream_first_token_seconds', 'Time from the upstream call to the first streamed token',
+    (), UPSTREAM_BUCKETS)
+metrics_registry.gauge_callback(
+    'bloombuddy_admission_in_flight', 'Requests holding an admission slot in the answering worker', ('route_class',),
+    lambda: {(name,): limiter.stats()['in_flight'] for name, limiter in admission_controller.limiters.items()})
+metrics_registry.gauge_callback(
+    'bloombuddy_admission_queue_depth', 'Requests queued for an admission slot in the answering worker', ('route_class',),
+    lambda: {(name,): limiter.stats()['queue_depth'] for name, limiter in admission_controller.limiters.items()})
+metrics_registry.gauge_callback(
+    'bloombuddy_model_loaded', 'Whether the answering worker can score with the model', ('model',),
+    lambda: {(model_type,): float(model_available(model_type)) for model_type in MODEL_SPECS})
+
+# Structured request log: one JSON record per sampled request, written from a background
+# thread; debug detail for REQUEST_LOG_DEBUG_SAMPLE_RATE of requests, or those sending
+# X-Request-Debug: 1 when REQUEST_DEBUG_HEADER is enabled
+request_log = RequestLog(
+    sample_rate=float(os.getenv('REQUEST_LOG_SAMPLE_RATE', 0.01)),
+    debug_sample_rate=float(os.getenv('REQUEST_LOG_DEBUG_SAMPLE_RATE', 0)),
+    slow_ms=float(os.getenv('REQUEST_LOG_SLOW_MS', 0)),
+    debug_header='X-Request-Debug' if os.getenv('REQUEST_DEBUG_HEADER', 'false').lower() == 'true' else None
+)
+
+def observe_stream_upstream(status: str, seconds: float, first_token_seconds):
+    llm_upstream_duration.observe(seconds, mode='stream', status=status)
+    if first_token_seconds is not None:
+        llm_upstream_first_token.observe(first_token_seconds)
+
+# Streaming chats share one asyncio event loop per process (see llm_proxy.py)
+streaming_llm_proxy = StreamingLLMProxy(
+    read_timeout=LLM_TIMEOUT, pool_maxsize=LLM_POOL_SIZE, max_retries=LLM_MAX_RETRIES,
+    backoff_factor=LLM_RETRY_BACKOFF, max_retry_after=LLM_MAX_RETRY_AFTER,
+    upstream_observer=observe_stream_upstream
+)
+
+SERVER_START_TIME = time.time()
+
+class PredictionError(Exception):
+    """Raised when a model cannot produce a prediction for a request"""
+    
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
+class ModelRegistry:
+    """
+    Versioned registry of the enabled disease models.
+    Each model is served from an immutable bundle (model, scaler, compiled scorer,
+    version) that is loaded at most once, either on its first request or from the
+    background warmup thread. Reloads build a new bundle next to the live one,
+    validate it and swap the reference, so a request that already holds the old
+    bundle finishes on it. The live objects are mirrored into the models / scalers /
+    compiled_models dicts.
+    """
+    
+    def __init__(self, model_types: List[str]):
+        self.model_types = list(model_types)
+        self._locks = {model_type: threading.Lock() for model_type in self.model_types}
+        self._bundles = {}
+        self._status = {
+            model_type: {'state': 'not_loaded', 'source': None, 'version': None, 'load_seconds': None,
+                         'error': None, 'reloads': 0, 'reload_error': None}
+            for model_type in self.model_types
+        }
+        self._warmup_thread = None
+        self._watcher_thread = None
+        self._watcher_pid = None
+    
+    def is_enabled(self, model_type: str) -> bool:
+        return model_type in self._status
+    
+    def bundle(self, model_type: str) -> Dict[str, Any]:
+        """The live bundle, or None if the model has not been loaded"""
+        return self._bundles.get(model_type)
+    
+    def version(self, model_type: str) -> str:
+        bundle = self._bundles.get(model_type)
+        return bundle['version'] if bundle is not None else None
+    
+    def ensure_loaded(self, model_type: str) -> bool:
+        """Load the model if nobody has yet (blocking while another thread loads it); True if it can score"""
+        status = self._status[model_type]
+        if status['state'] in ('not_loaded', 'loading'):
+            with self._locks[model_type]:
+                if status['state'] == 'not_loaded':
+                    self._load(model_type, status)
+        return status['state'] == 'ready'
+    
+    def _load(self, model_type: str, status: Dict[str, Any]):
+        status['state'] = 'loading'
+        start = time.perf_counter()
+        try:
+            bundle = load_model(model_type)
+            if bundle_available(bundle):
+                self._install(model_type, bundle)
+                status.update(state='ready', source=bundle['source'], version=bundle['version'])
             else:
-                logger.warning(f"Diabetes model file contains {type(model_obj)}, not a trained model")
-                models['diabetes'] = None
+                status.update(state='unavailable', error='No model artifact found')
+        except Exception as e:
+            logger.error(f"Error loading {model_type} model: {str(e)}")
+            status.update(state='failed', error=str(e))
+        status['load_seconds'] = round(time.perf_counter() - start, 3)
+    
+    def _install(self, model_type: str, bundle: Dict[str, Any]):
+        # A single reference assignment, so readers see either the old or the new bundle
+        self._bundles[model_type] = bundle
+        models[model_type] = bundle['model']
+        scalers[model_type] = bundle['scaler']
+        compiled_models[model_type] = bundle['compiled']
+    
+    def reload(self, model_type: str) -> Dict[str, Any]:
+        """
+        Load the model's current files into a new bundle, validate it against the
+        held-out sample and swap it in if it passes; the live bundle keeps serving
+        while this runs and stays live if anything fails.
+        """
+        status = self._status[model_type]
+        with self._locks[model_type]:
+            live = self._bundles.get(model_type)
+            previous_version = live['version'] if live is not None else None
+            start = time.perf_counter()
+            try:
+                candidate = load_model(model_type)
+                if not bundle_available(candidate):
+                    raise PredictionError('No model artifact found')
+                validation = validate_bundle(model_type, candidate, live)
+            except Exception as e:
+                logger.error(f"Reloading {model_type} model failed, keeping version {previous_version}: {str(e)}")
+                status['reload_error'] = str(e)
+                return {'reloaded': False, 'model_version': previous_version, 'error': str(e)}
             
-            if os.path.exists(diabetes_scaler_path):
-                scaler_obj = joblib.load(diabetes_scaler_path)
-                if hasattr(scaler_obj, 'transform'):
-                    scalers['diabetes'] = scaler_obj
-                    logger.info("Diabetes scaler loaded successfully")
-                else:
-                    logger.warning(f"Diabetes scaler file contains {type(scaler_obj)}, not a scaler object")
-                    scalers['diabetes'] = None
-            else:
-                logger.warning("Diabetes scaler not found")
-        
-        # Load heart disease model and scaler (from main models directory)
-        heart_model_path = os.path.join(models_dir, 'heart_disease_model.pkl')
-        heart_scaler_path = os.path.join(models_dir, 'heart_scaler.pkl')
-        if os.path.exists(heart_model_path):
-            model_obj = joblib.load(heart_model_path)
-            if hasattr(model_obj, 'predict'):
-                models['heart'] = model_obj
-                logger.info("Heart disease model loaded successfully")
-            else:
-                logger.warning(f"Heart model file contains {type(model_obj)}, not a trained model")
-                models['heart'] = None
+            if not validation['passed']:
+                logger.warning(f"Rejected new {model_type} model {candidate['version']}: {validation}")
+                status['reload_error'] = 'Validation failed'
+                return {'reloaded': False, 'model_version': previous_version,
+                        'candidate_version': candidate['version'], 'validation': validation}
             
-            if os.path.exists(heart_scaler_path):
-                scaler_obj = joblib.load(heart_scaler_path)
-                if hasattr(scaler_obj, 'transform'):
-                    scalers['heart'] = scaler_obj
-                    logger.info("Heart disease scaler loaded successfully")
-                else:
-                    logger.warning(f"Heart scaler file contains {type(scaler_obj)} (feature names), not a scaler object")
-                    scalers['heart'] = None
-            else:
-                logger.warning("Heart disease scaler not found")
+            self._install(model_type, candidate)
+            load_seconds = round(time.perf_counter() - start, 3)
+            status.update(state='ready', source=candidate['source'], version=candidate['version'],
+                          load_seconds=load_seconds, error=None, reload_error=None, reloads=status['reloads'] + 1)
+            logger.info(f"{MODEL_SPECS[model_type]['display_name']} model reloaded: {previous_version} -> {candidate['version']}")
+            return {'reloaded': True, 'model_version': candidate['version'], 'previous_version': previous_version,
+                    'validation': validation, 'load_seconds': load_seconds}
+    
+    def start_warmup(self) -> threading.Thread:
+        """Load every enabled model in a daemon thread while the server already takes requests"""
+        def warm():
+            start = time.perf_counter()
+            for model_type in self.model_types:
+                self.ensure_loaded(model_type)
+            logger.info(f"Model warmup finished in {time.perf_counter() - start:.2f}s")
         
-        # Load hypertension model and scaler (from main models directory)
-        hypertension_model_path = os.path.join(models_dir, 'hypertension_model.pkl')
-        hypertension_scaler_path = os.path.join(models_dir, 'hyper_scaler.pkl')
-        if os.path.exists(hypertension_model_path):
-            model_obj = joblib.load(hypertension_model_path)
-            if hasattr(model_obj, 'predict'):
-                models['hypertension'] = model_obj
-                logger.info("Hypertension model loaded successfully")
-            else:
-                logger.warning(f"Hypertension model file contains {type(model_obj)}, not a trained model")
-                models['hypertension'] = None
-            
-            if os.path.exists(hypertension_scaler_path):
-                scaler_obj = joblib.load(hypertension_scaler_path)
-                if hasattr(scaler_obj, 'transform'):
-                    scalers['hypertension'] = scaler_obj
-                    logger.info("Hypertension scaler loaded successfully")
-                else:
-                    logger.warning(f"Hypertension scaler file contains {type(scaler_obj)}, not a scaler object")
-                    scalers['hypertension'] = None
-            else:
-                logger.warning("Hypertension scaler not found")
-            
-    except Exception as e:
-        logger.error(f"Error loading models: {str(e)}")
+        self._warmup_thread = threading.Thread(target=warm, name='model-warmup', daemon=True)
+        self._warmup_thread.start()
+        return self._warmup_thread
+    
+    def warming_up(self) -> bool:
+        return self._warmup_thread is not None and self._warmup_thread.is_alive()
+    
+    def start_watcher(self, interval: float) -> threading.Thread:
+        """
+        Poll the model files every `interval` seconds and reload a model once its
+        files have changed and then stayed unchanged for one more poll (so a pickle
+        that is still being written is not picked up). Runs once per process.
+        """
+        if self._watcher_pid == os.getpid():
+            return self._watcher_thread
+        
+        def watch():
+            seen = {model_type: artifact_signature(model_type) for model_type in self.model_types}
+            pending = {}
+            while True:
+                time.sleep(interval)
+                for model_type in self.model_types:
+                    signature = artifact_signature(model_type)
+                    if signature == seen[model_type]:
+                        pending.pop(model_type, None)
+                        continue
+                    if pending.get(model_type) != signature:
+                        pending[model_type] = signature
+                        continue
+                    seen[model_type] = signature
+                    del pending[model_type]
+                    # Models nobody has asked for yet pick up the new files on first use
+                    if self.bundle(model_type) is not None:
+                        self.reload(model_type)
+        
+        self._watcher_pid = os.getpid()
+        self._watcher_thread = threading.Thread(target=watch, name='model-watcher', daemon=True)
+        self._watcher_thread.start()
+        logger.info(f"Watching model files for changes every {interval:g}s")
+        return self._watcher_thread
+    
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {model_type: dict(status) for model_type, status in self._status.items()}
 
-def preprocess_features(features: List[float], model_type: str) -> np.ndarray:
-    """Preprocess features based on model requirements"""
+model_registry = ModelRegistry(ENABLED_MODELS)
+
+def compiled_artifacts_dir() -> str:
+    models_dir = os.getenv('MODELS_DIR', './models')
+    return os.getenv('COMPILED_MODELS_DIR', os.path.join(models_dir, 'compiled'))
+
+def model_artifact_dir(model_type: str) -> str:
+    """Directory of a model's pickles: MODELS_DIR, or its MODEL_VARIANTS subdirectory"""
+    models_dir = os.getenv('MODELS_DIR', './models')
+    variant = MODEL_VARIANTS.get(model_type)
+    return os.path.join(models_dir, 'variants', model_type, variant) if variant else models_dir
+
+def artifact_sources(model_type: str) -> Dict[str, str]:
+    """sha256 of the pickles a model is built from, recorded in the compiled manifest"""
+    models_dir = model_artifact_dir(model_type)
+    spec = MODEL_SPECS[model_type]
+    sources = {}
+    for role in ('model_file', 'scaler_file'):
+        path = os.path.join(models_dir, spec[role])
+        if os.path.exists(path):
+            sources[spec[role]] = file_digest(path)
+    return sources
+
+def artifact_version(sources: Dict[str, str]) -> str:
+    """
+    model_version of a bundle: the API version plus a short hash of its source
+    pickles, so every worker serving the same files reports the same version
+    """
+    if not sources:
+        return MODEL_VERSION
+    digest = hashlib.sha256(json.dumps(sources, sort_keys=True).encode('utf-8')).hexdigest()
+    return f'{MODEL_VERSION}+{digest[:12]}'
+
+def artifact_signature(model_type: str) -> tuple:
+    """Cheap change detector for a model's files (mtime and size), used by the watcher"""
+    models_dir = model_artifact_dir(model_type)
+    spec = MODEL_SPECS[model_type]
+    paths = [os.path.join(models_dir, spec['model_file']), os.path.join(models_dir, spec['scaler_file']),
+             os.path.join(compiled_artifacts_dir(), MANIFEST_NAME)]
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+def load_compiled_artifact(model_type: str, sources: Dict[str, str]):
+    """
+    Memory-map one compiled scorer instead of unpickling the model.
+    Returns (scorer, sources recorded with it), or (None, None) if the artifact is
+    missing, unreadable or older than the pickles currently in MODELS_DIR.
+    """
+    directory = compiled_artifacts_dir()
+    if not os.path.exists(os.path.join(directory, MANIFEST_NAME)):
+        return None, None
+    # Every export writes new array files, so the candidate maps those and the live
+    # bundle's maps stay untouched. If an export switched the manifest and pruned
+    # the files between our manifest read and np.load, read the new manifest once more.
+    for attempt in range(2):
+        try:
+            compiled, manifest = load_compiled_models(directory, model_types=[model_type])
+            break
+        except FileNotFoundError as e:
+            if attempt == 0:
+                continue
+            logger.warning(f"Ignoring compiled artifacts in {directory}: {str(e)}")
+            return None, None
+        except Exception as e:
+            logger.warning(f"Ignoring compiled artifacts in {directory}: {str(e)}")
+            return None, None
+    
+    entry = manifest['models'].get(model_type)
+    if entry is None:
+        return None, None
+    if sources and sources != entry.get('sources'):
+        logger.warning(f"Compiled {model_type} artifact is stale, loading the pickles instead")
+        return None, None
+    
+    logger.info(f"{MODEL_SPECS[model_type]['display_name']} model memory-mapped from {directory}")
+    return compiled[model_type], entry.get('sources')
+
+def export_compiled_artifacts(out_dir: str = None) -> Dict[str, Any]:
+    """
+    Write the verified compiled scorers of the loaded models to disk (see export_compiled_models.py).
+    Safe while servers map out_dir: new array files are written and the manifest is swapped
+    atomically, so bundles already loaded keep their weights and reloads pick up the new ones.
+    """
+    out_dir = out_dir or compiled_artifacts_dir()
+    sources = {model_type: artifact_sources(model_type) for model_type in MODEL_SPECS}
+    return save_compiled_models(compiled_models, out_dir, sources)
+
+def load_pickled_model(model_type: str):
+    """Unpickle one model + scaler pair from MODELS_DIR; returns (model, scaler), either may be None"""
+    models_dir = model_artifact_dir(model_type)
+    spec = MODEL_SPECS[model_type]
+    display_name = spec['display_name']
+    model_path = os.path.join(models_dir, spec['model_file'])
+    scaler_path = os.path.join(models_dir, spec['scaler_file'])
+    if not os.path.exists(model_path):
+        logger.warning(f"{display_name} model not found at {model_path}")
+        return None, None
+    
+    model, scaler = None, None
+    model_obj = joblib.load(model_path)
+    if hasattr(model_obj, 'predict'):
+        model = model_obj
+        logger.info(f"{display_name} model loaded successfully")
+    else:
+        logger.warning(f"{display_name} model file contains {type(model_obj)}, not a trained model")
+    
+    if os.path.exists(scaler_path):
+        scaler_obj = joblib.load(scaler_path)
+        if hasattr(scaler_obj, 'transform'):
+            scaler = scaler_obj
+            logger.info(f"{display_name} scaler loaded successfully")
+        else:
+            logger.warning(f"{display_name} scaler file contains {type(scaler_obj)}, not a scaler object")
+    else:
+        logger.warning(f"{display_name} scaler not found")
+    return model, scaler
+
+def load_model(model_type: str) -> Dict[str, Any]:
+    """
+    Load one disease model from its current files into a new bundle, preferring
+    the compiled artifact; the live bundle is not touched
+    """
+    sources = artifact_sources(model_type)
+    bundle = {'model': None, 'scaler': None, 'compiled': None, 'source': None, 'version': artifact_version(sources)}
+    
+    if USE_COMPILED_ARTIFACTS:
+        compiled, recorded_sources = load_compiled_artifact(model_type, sources)
+        if compiled is not None:
+            bundle.update(compiled=compiled, source='compiled_artifact',
+                          version=artifact_version(sources or recorded_sources))
+            return bundle
+    
+    model, scaler = load_pickled_model(model_type)
+    bundle.update(model=model, scaler=scaler, source='pickle')
+    if FAST_SCORING and model is not None:
+        bundle['compiled'] = compile_loaded_model(model_type, model, scaler)
+    return bundle
+
+def bundle_available(bundle: Dict[str, Any]) -> bool:
+    return bundle['model'] is not None or bundle['compiled'] is not None
+
+def load_models():
+    """Load every enabled model before returning (MODEL_LOADING=eager and the offline tools)"""
+    for model_type in model_registry.model_types:
+        model_registry.ensure_loaded(model_type)
+
+def verification_rows(model_type: str, scaler: Any = None) -> np.ndarray:
+    """Rows used to check a compiled scorer: the training CSV if present, else samples around the scaler mean"""
+    models_dir = os.getenv('MODELS_DIR', './models')
+    spec = MODEL_SPECS[model_type]
+    dataset_path = os.path.join(models_dir, spec['dataset'])
+    if os.path.exists(dataset_path):
+        import pandas as pd
+        df = pd.read_csv(dataset_path, encoding='utf-8-sig').drop(columns=[spec['target']]).dropna()
+        return df.to_numpy(dtype=float)[:1000]
+    
+    rng = np.random.default_rng(42)
+    mean = getattr(scaler, 'mean_', None)
+    scale = getattr(scaler, 'scale_', None)
+    mean = np.zeros(spec['n_features']) if mean is None else mean
+    scale = np.ones(spec['n_features']) if scale is None else scale
+    return mean + rng.normal(size=(500, spec['n_features'])) * scale
+
+def verify_fused_models(model_types: List[str] = None) -> Dict[str, Any]:
+    """
+    Check each fused linear scorer against its original scaler + model pipeline
+    on the full training CSV (e.g. hypertension.csv)
+    """
+    models_dir = os.getenv('MODELS_DIR', './models')
+    report = {}
+    for model_type in model_types or list(MODEL_SPECS):
+        model, scaler, compiled = models[model_type], scalers[model_type], compiled_models[model_type]
+        if model is None or not is_logistic_model(model):
+            continue
+        if compiled is None:
+            report[model_type] = {'passed': False, 'error': 'No fused scorer was built'}
+            continue
+        
+        spec = MODEL_SPECS[model_type]
+        dataset_path = os.path.join(models_dir, spec['dataset'])
+        if not os.path.exists(dataset_path):
+            report[model_type] = {'passed': False, 'error': f'Dataset not found: {dataset_path}'}
+            continue
+        
+        import pandas as pd
+        df = pd.read_csv(dataset_path, encoding='utf-8-sig').drop(columns=[spec['target']]).dropna()
+        rows = df.to_numpy(dtype=float)
+        
+        processed = scaler.transform(rows) if scaler is not None else rows
+        expected = model.predict_proba(processed)[:, 1]
+        fused = compiled.positive_proba(rows)
+        single = np.array([compiled.score_row(row) for row in rows.tolist()])
+        max_error = float(max(np.max(np.abs(fused - expected)), np.max(np.abs(single - expected))))
+        label_agreement = float(np.mean((fused > 0.5) == (expected > 0.5)))
+        
+        report[model_type] = {
+            'rows': len(rows),
+            'max_abs_error': max_error,
+            'label_agreement': label_agreement,
+            'passed': max_error <= FAST_SCORING_TOLERANCE and label_agreement == 1.0
+        }
+    return report
+
+def compile_loaded_model(model_type: str, model: Any, scaler: Any):
+    """Compile a loaded model into a fast scorer; returns it only if it matches the original pipeline"""
     try:
-        # Convert to numpy array
-        features_array = np.array(features).reshape(1, -1)
+        compiled = compile_model(model, scaler)
         
-        # Apply scaling if scaler is available
-        if scalers[model_type] is not None:
-            logger.info(f"Applying {model_type} scaler to features")
-            features_array = scalers[model_type].transform(features_array)
-        else:
-            logger.warning(f"No scaler found for {model_type} - using raw features")
+        rows = verification_rows(model_type, scaler)
+        processed = scaler.transform(rows) if scaler is not None else rows
+        expected = model.predict_proba(processed)[:, 1]
+        max_error = float(np.max(np.abs(compiled.positive_proba(rows) - expected)))
+        if max_error > FAST_SCORING_TOLERANCE:
+            logger.warning(f"Compiled {model_type} scorer differs by {max_error:.2e}, using the original model")
+            return None
         
-        return features_array
+        if is_logistic_model(model) and is_standard_scaler(scaler):
+            logger.info(f"Fused {model_type} StandardScaler into {type(model).__name__} weights (max deviation {max_error:.1e} on {len(rows)} rows)")
+        else:
+            logger.info(f"Compiled {model_type} model for fast scoring (max deviation {max_error:.1e} on {len(rows)} rows)")
+        return compiled
+    except UnsupportedModelError as e:
+        logger.info(f"No fast scorer for {model_type}: {str(e)}")
     except Exception as e:
-        logger.error(f"Error preprocessing features: {str(e)}")
-        raise
+        logger.warning(f"Failed to compile {model_type} model: {str(e)}")
+    return None
+
+def holdout_sample(model_type: str):
+    """
+    The test split the training scripts hold out (test_size=0.2, random_state=42,
+    stratified for hypertension), as raw feature rows and labels.
+    Missing values are filled with the column median as in the hypertension script.
+    Returns None if the training CSV is not in MODELS_DIR.
+    """
+    models_dir = os.getenv('MODELS_DIR', './models')
+    spec = MODEL_SPECS[model_type]
+    dataset_path = os.path.join(models_dir, spec['dataset'])
+    if not os.path.exists(dataset_path):
+        return None
+    
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+    df = pd.read_csv(dataset_path, encoding='utf-8-sig').dropna(subset=[spec['target']])
+    df = df.fillna(df.median(numeric_only=True))
+    labels = df[spec['target']].to_numpy()
+    rows = df.drop(columns=[spec['target']]).to_numpy(dtype=float)
+    _, test_rows, _, test_labels = train_test_split(
+        rows, labels, test_size=0.2, random_state=42,
+        stratify=labels if spec.get('holdout_stratify') else None
+    )
+    return test_rows, test_labels
+
+def bundle_positive_proba(bundle: Dict[str, Any], rows: np.ndarray) -> np.ndarray:
+    """Positive-class probabilities for a matrix of raw feature rows through one bundle"""
+    if bundle['compiled'] is not None:
+        return bundle['compiled'].positive_proba(rows)
+    processed = bundle['scaler'].transform(rows) if bundle['scaler'] is not None else rows
+    return bundle['model'].predict_proba(processed)[:, 1]
+
+def validate_bundle(model_type: str, candidate: Dict[str, Any], live: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Check a freshly loaded bundle before it replaces the live one: its probabilities
+    on the held-out sample must be valid, its AUC at least RELOAD_MIN_AUC and no more
+    than RELOAD_MAX_AUC_DROP below the live model's
+    """
+    from sklearn.metrics import roc_auc_score
+    
+    sample = holdout_sample(model_type)
+    if sample is None:
+        # No labelled data to score against: only check that the model produces probabilities
+        probabilities = bundle_positive_proba(candidate, verification_rows(model_type, candidate['scaler']))
+        valid = bool(np.all(np.isfinite(probabilities)) and np.all((probabilities >= 0) & (probabilities <= 1)))
+        return {'passed': valid, 'rows': len(probabilities), 'auc': None}
+    
+    rows, labels = sample
+    probabilities = bundle_positive_proba(candidate, rows)
+    if not (np.all(np.isfinite(probabilities)) and np.all((probabilities >= 0) & (probabilities <= 1))):
+        return {'passed': False, 'rows': len(rows), 'error': 'Model returned invalid probabilities'}
+    
+    report = {'rows': len(rows), 'auc': round(float(roc_auc_score(labels, probabilities)), 4)}
+    passed = report['auc'] >= RELOAD_MIN_AUC
+    if live is not None:
+        live_probabilities = bundle_positive_proba(live, rows)
+        report['live_auc'] = round(float(roc_auc_score(labels, live_probabilities)), 4)
+        report['label_agreement'] = round(float(np.mean((probabilities > 0.5) == (live_probabilities > 0.5))), 4)
+        passed = passed and report['auc'] >= report['live_auc'] - RELOAD_MAX_AUC_DROP
+    report['passed'] = bool(passed)
+    return report
+
+def diabetes_fallback_probability(features: List[float]) -> float:
+    """Rule-based diabetes risk used when the trained model cannot score"""
+    glucose, bmi, age = features[1], features[5], features[7]
+    risk_score = 0.1
+    if glucose > 140: risk_score += 0.4  # High glucose
+    if bmi > 30: risk_score += 0.3       # Obesity
+    if age > 45: risk_score += 0.2       # Age factor
+    if features[0] > 5: risk_score += 0.15  # Multiple pregnancies
+    return min(risk_score, 0.95)
+
+def heart_fallback_probability(features: List[float]) -> float:
+    """Rule-based heart disease risk used when the trained model cannot score"""
+    age, sex, chest_pain, cholesterol, max_hr = features[0], features[1], features[2], features[4], features[7]
+    risk_score = 0.1
+    if age > 55: risk_score += 0.3       # Age factor
+    if sex == 1: risk_score += 0.2       # Male gender
+    if chest_pain >= 2: risk_score += 0.25  # Chest pain types
+    if cholesterol > 240: risk_score += 0.3  # High cholesterol
+    if max_hr < 120: risk_score += 0.2   # Low max heart rate
+    if features[8] == 1: risk_score += 0.15  # Exercise induced angina
+    return min(risk_score, 0.95)
+
+def hypertension_fallback_probability(features: List[float]) -> float:
+    """Rule-based hypertension risk used when the trained model cannot score"""
+    male, age, smoking, bmi, sys_bp, dia_bp = features[0], features[1], features[2], features[9], features[7], features[8]
+    risk_score = 0.1
+    if sys_bp > 140: risk_score += 0.4   # High systolic BP
+    if dia_bp > 90: risk_score += 0.3    # High diastolic BP
+    if age > 45: risk_score += 0.2       # Age factor
+    if bmi > 30: risk_score += 0.2       # Obesity
+    if smoking == 1: risk_score += 0.25  # Current smoker
+    if male == 1: risk_score += 0.1      # Male gender
+    if features[5] == 1: risk_score += 0.15  # Diabetes
+    return min(risk_score, 0.95)
+
+FALLBACK_PREDICTORS = {
+    'diabetes': diabetes_fallback_probability,
+    'heart': heart_fallback_probability,
+    'hypertension': hypertension_fallback_probability
+}
+
+def validate_feature_row(row: Any, expected_features: int) -> str:
+    """Return an error message for an invalid feature vector, or None if it can be scored"""
+    if not isinstance(row, (list, tuple)):
+        return 'Features must be a list of numbers'
+    if len(row) != expected_features:
+        return f'Expected {expected_features} features, got {len(row)}'
+    for value in row:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return 'Features must be numeric'
+        if not np.isfinite(value):
+            return 'Features must be finite numbers'
+    return None
+
+def model_available(model_type: str) -> bool:
+    """True if the model can score, either as a loaded estimator or a compiled artifact"""
+    return models[model_type] is not None or compiled_models[model_type] is not None
+
+def require_model(model_type: str) -> Dict[str, Any]:
+    """Live bundle of a model, loading it on first use; raises PredictionError if this process cannot score it"""
+    display_name = MODEL_SPECS[model_type]['display_name']
+    if not model_registry.is_enabled(model_type):
+        raise PredictionError(f'{display_name} model is not enabled on this server', 503)
+    if not model_registry.ensure_loaded(model_type):
+        raise PredictionError(f'{display_name} model not available')
+    return model_registry.bundle(model_type)
+
+def elapsed_ms(start: float) -> float:
+    """Milliseconds since a time.perf_counter() reading"""
+    return round((time.perf_counter() - start) * 1000, 3)
+
+def score_features(model_type: str, rows: List[List[float]], bundle: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Shared inference path for every prediction route.
+    Runs one scaler transform and a single predict_proba pass over the rows, and
+    derives both the risk probability and the label from that one pass, so tree
+    ensembles are only walked once. Everything is scored with one model bundle (the
+    live one unless given), even if a reload swaps it mid-request.
+    Raises PredictionError if the model is unusable.
+    """
+    display_name = MODEL_SPECS[model_type]['display_name']
+    timings = {}
+    
+    bundle = bundle or require_model(model_type)
+    compiled, scaler, model = bundle['compiled'], bundle['scaler'], bundle['model']
+    
+    # Compiled scorer: scaler already folded in, no estimator call
+    if compiled is not None:
+        stage_start = time.perf_counter()
+        try:
+            if len(rows) == 1 and hasattr(compiled, 'score_row'):
+                risk_probabilities = [compiled.score_row(rows[0])]
+            else:
+                risk_probabilities = [float(p) for p in compiled.positive_proba(np.array(rows, dtype=float))]
+            timings['scaler_ms'] = 0.0
+            timings['inference_ms'] = elapsed_ms(stage_start)
+            return {
+                'probabilities': risk_probabilities,
+                'predictions': [int(p > 0.5) for p in risk_probabilities],
+                'fallback': False,
+                'model_version': bundle['version'],
+                'timings': timings
+            }
+        except Exception as compiled_error:
+            logger.error(f"Compiled {model_type} scorer failed, using the original model: {str(compiled_error)}")
+            prediction_fallbacks_total.inc(model=model_type, reason='compiled_scorer_failed')
+    
+    features_matrix = np.array(rows, dtype=float)
+    
+    stage_start = time.perf_counter()
+    processed_features = features_matrix
+    if scaler is None:
+        logger.warning(f"{display_name} scaler not available, using raw features")
+        prediction_fallbacks_total.inc(model=model_type, reason='scaler_missing')
+    else:
+        try:
+            processed_features = scaler.transform(features_matrix)
+        except Exception as scaler_error:
+            logger.error(f"{display_name} scaler preprocessing failed: {str(scaler_error)}")
+            if model_type == 'heart':
+                raise PredictionError('Heart scaler preprocessing failed')
+            # Use raw features as fallback
+            prediction_fallbacks_total.inc(model=model_type, reason='scaler_failed')
+    timings['scaler_ms'] = elapsed_ms(stage_start)
+    
+    stage_start = time.perf_counter()
+    used_fallback = False
+    try:
+        probabilities = model.predict_proba(processed_features)
+        if probabilities.shape[1] > 1:
+            risk_probabilities = probabilities[:, 1]
+        else:
+            # Single-class model: the only class is the label for every row
+            risk_probabilities = np.full(len(rows), float(model.classes_[0]))
+        risk_probabilities = [float(p) for p in risk_probabilities]
+    except Exception as model_error:
+        logger.error(f"{display_name} model prediction failed: {str(model_error)}")
+        # Fallback logic based on medical risk factors
+        fallback = FALLBACK_PREDICTORS[model_type]
+        risk_probabilities = [fallback(row) for row in rows]
+        used_fallback = True
+        prediction_fallbacks_total.inc(model=model_type, reason='rule_based')
+        logger.debug(f"Using fallback prediction for {display_name.lower()}")
+    timings['inference_ms'] = elapsed_ms(stage_start)
+    
+    return {
+        'probabilities': risk_probabilities,
+        'predictions': [int(p > 0.5) for p in risk_probabilities],
+        'fallback': used_fallback,
+        'model_version': bundle['version'],
+        'timings': timings
+    }
+
+def score_single_cached(model_type: str, features: List[float]) -> Dict[str, Any]:
+    """
+    Score one feature vector through the prediction cache.
+    Hits skip the scaler and model entirely; rule-based fallback results are never cached.
+    """
+    bundle = require_model(model_type)
+    cache = prediction_caches[model_type]
+    key = feature_key(model_type, bundle['version'], features)
+    cached = cache.get(key)
+    if cached is not None:
+        prediction_cache_results_total.inc(model=model_type, result='hit')
+        return dict(cached, cached=True, timings={})
+    prediction_cache_results_total.inc(model=model_type, result='miss')
+    
+    scored = score_features(model_type, [features], bundle)
+    for stage in ('scaler', 'inference'):
+        prediction_stage_duration.observe(scored['timings'][f'{stage}_ms'] / 1000, model=model_type, stage=stage)
+    result = {
+        'probability': scored['probabilities'][0],
+        'prediction': scored['predictions'][0],
+        'fallback': scored['fallback'],
+        'model_version': scored['model_version']
+    }
+    if not scored['fallback']:
+        cache.put(key, result)
+    return dict(result, cached=False, timings=scored['timings'])
+
+def predict_single(model_type: str):
+    """Handle a single-patient {"features": [...]} request for one model"""
+    spec = MODEL_SPECS[model_type]
+    
+    annotate_request(model=model_type)
+    stage_start = time.perf_counter()
+    data = request.get_json()
+    stage_seconds = {'parse': time.perf_counter() - stage_start}
+    
+    if not data or 'features' not in data:
+        return jsonify({'error': 'Missing features in request'}), 400
+    
+    features = data['features']
+    
+    stage_start = time.perf_counter()
+    error = validate_feature_row(features, spec['n_features'])
+    stage_seconds['validation'] = time.perf_counter() - stage_start
+    if error:
+        return jsonify({'error': error}), 400
+    
+    try:
+        scored = score_single_cached(model_type, features)
+    except PredictionError as prediction_error:
+        return jsonify({'error': str(prediction_error)}), prediction_error.status_code
+    
+    if request_debug_enabled():
+        bundle = model_registry.bundle(model_type) or {}
+        debug_request(n_features=len(features), scaler=type(bundle.get('scaler')).__name__,
+                      compiled_scorer=type(bundle.get('compiled')).__name__, source=bundle.get('source'))
+    
+    stage_start = time.perf_counter()
+    response = jsonify({
+        'probability': scored['probability'],
+        'prediction': scored['prediction'],
+        'confidence': spec['confidence'],
+        'model_version': scored['model_version'],
+        'cached': scored['cached'],
+        'timings': scored['timings']
+    })
+    stage_seconds['serialization'] = time.perf_counter() - stage_start
+    for stage in ('parse', 'validation', 'serialization'):
+        prediction_stage_duration.observe(stage_seconds[stage], model=model_type, stage=stage)
+    
+    timings = {f'{stage}_ms': round(seconds * 1000, 3) for stage, seconds in stage_seconds.items()}
+    annotate_request(cached=scored['cached'], fallback=scored['fallback'], model_version=scored['model_version'],
+                     timings=dict(timings, **scored['timings']))
+    return response
 
 @app.route('/api/llm/chat', methods=['POST'])
 def llm_chat():
@@ -135,86 +1015,210 @@ def llm_chat():
     try:
         data = request.get_json()
         
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-        
-        # Get the provider from the request (default to anthropic)
-        provider = data.get('provider', 'anthropic')
-        
-        if provider == 'anthropic':
-            return handle_anthropic_request(data)
-        else:
-            return jsonify({'error': f'Unsupported provider: {provider}'}), 400
+        error = chat_request_error(data)
+        if error is not None:
+            body, status = error
+            return jsonify(body), status
+        if data.get('stream'):
+            return handle_anthropic_stream(data)
+        return handle_anthropic_request(data)
             
     except Exception as e:
         logger.error(f"LLM chat error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def chat_request_error(data: Any) -> Tuple[Dict[str, Any], int]:
+    """(error body, HTTP status) for a chat request that cannot be sent upstream, or None"""
+    if not data or not isinstance(data, dict):
+        return {'error': 'No data provided'}, 400
+    
+    # Get the provider from the request (default to anthropic)
+    provider = data.get('provider', 'anthropic')
+    if provider != 'anthropic':
+        return {'error': f'Unsupported provider: {provider}'}, 400
+    options_error = validate_llm_options(data.get('options'))
+    if options_error:
+        return {'error': options_error}, 400
+    if not os.getenv('ANTHROPIC_API_KEY'):
+        return {'error': 'Anthropic API key not configured'}, 500
+    if not data.get('messages'):
+        return {'error': 'No messages provided'}, 400
+    return None
+
+def validate_llm_options(options: Any) -> str:
+    """Return an error message for invalid chat options, or None if they can be sent upstream"""
+    if options is None:
+        return None
+    if not isinstance(options, dict):
+        return 'options must be an object'
+    max_tokens = options.get('maxTokens')
+    if max_tokens is not None and (isinstance(max_tokens, bool) or not isinstance(max_tokens, int) or max_tokens <= 0):
+        return 'options.maxTokens must be a positive integer'
+    return None
+
+def build_anthropic_request(data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """
+    Translate a /api/llm/chat body into an Anthropic Messages API request
+    The history is trimmed to LLM_CONTEXT_BUDGET and max_tokens is capped at
+    LLM_MAX_OUTPUT_TOKENS; returns (request, context report)
+    """
+    options = data.get('options') or {}
+    system, messages, context = fit_to_budget(
+        data.get('system'), data.get('messages', []), LLM_CONTEXT_BUDGET,
+        summarize=LLM_SUMMARIZE_TRIMMED, summary_tokens=LLM_SUMMARY_TOKENS
+    )
+    if context['trimmedMessages']:
+        logger.debug(f"Trimmed {context['trimmedMessages']} chat messages to fit the context budget")
+    anthropic_request = {
+        'model': data.get('model', 'claude-3-5-sonnet-20241022'),
+        'messages': messages,
+        'max_tokens': min(options.get('maxTokens') or LLM_DEFAULT_MAX_TOKENS, LLM_MAX_OUTPUT_TOKENS),
+        'temperature': options.get('temperature', 0.7)
+    }
+    
+    # Add system message if provided
+    if system:
+        anthropic_request['system'] = system
+    return anthropic_request, context
+
+def chat_session_id(data: Dict[str, Any]) -> str:
+    """Session that a chat request's token usage is recorded against"""
+    session_id = data.get('sessionId')
+    if isinstance(session_id, str) and 0 < len(session_id) <= 128:
+        return session_id
+    return 'anonymous'
+
+def anthropic_headers(api_key: str) -> Dict[str, str]:
+    return {
+        'Content-Type': 'application/json',
+        'x-api-key': api_key,
+        'anthropic-version': '2023-06-01'
+    }
+
+def llm_cacheable(anthropic_request: Dict[str, Any]) -> bool:
+    """Only (near-)deterministic requests may be answered from the response cache or coalesced"""
+    temperature = anthropic_request.get('temperature')
+    return (llm_response_cache.enabled and isinstance(temperature, (int, float))
+            and temperature <= LLM_CACHE_MAX_TEMPERATURE)
+
+def sse_response(events) -> Response:
+    return Response(events, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def replay_cached_stream(cached: Dict[str, Any]):
+    """Send a cached response in the same event format as a live stream"""
+    yield format_sse('delta', {'text': cached['content']})
+    yield format_sse('done', {'usage': cached['usage'], 'model': cached['model'],
+                              'provider': cached['provider'], 'cached': True})
+
+def handle_anthropic_stream(data):
+    """
+    Stream an Anthropic response to the client as server-sent events
+    Emits 'delta' events with text chunks as they arrive, then a 'done' event with
+    token usage (or an 'error' event); disconnecting cancels the upstream request.
+    Cacheable requests are replayed from the response cache and populate it when they finish;
+    token usage is recorded against the session once the stream completes
+    """
+    api_key = os.getenv('ANTHROPIC_API_KEY')
+    anthropic_request, context = build_anthropic_request(data)
+    session_id = chat_session_id(data)
+    annotate_request(session_id=session_id, stream=True, trimmed_messages=context['trimmedMessages'])
+    cacheable = llm_cacheable(anthropic_request)
+    key = request_key(anthropic_request) if cacheable else None
+    if cacheable:
+        cached = llm_response_cache.get(key)
+        if cached is not None:
+            llm_usage.record(session_id, None, cached=True, trimmed_messages=context['trimmedMessages'])
+            return sse_response(replay_cached_stream(cached))
+    
+    def on_complete(body):
+        llm_usage.record(session_id, body['usage'], trimmed_messages=context['trimmedMessages'])
+        if cacheable:
+            llm_response_cache.put(key, body)
+    
+    return sse_response(streaming_llm_proxy.stream(
+        ANTHROPIC_MESSAGES_URL, anthropic_headers(api_key), anthropic_request, on_complete=on_complete
+    ))
+
+def format_anthropic_response(anthropic_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Format a Messages API response to match our frontend expectations"""
+    return {
+        'content': anthropic_data.get('content', [{}])[0].get('text', ''),
+        'usage': {
+            'promptTokens': anthropic_data.get('usage', {}).get('input_tokens', 0),
+            'completionTokens': anthropic_data.get('usage', {}).get('output_tokens', 0),
+            'totalTokens': (
+                anthropic_data.get('usage', {}).get('input_tokens', 0) + 
+                anthropic_data.get('usage', {}).get('output_tokens', 0)
+            )
+        },
+        'model': anthropic_data.get('model', 'claude-3-5-sonnet-20241022'),
+        'provider': 'anthropic'
+    }
+
+def call_anthropic(api_key: str, anthropic_request: Dict[str, Any]):
+    """One upstream Messages API call; returns (response body in the frontend's format, HTTP status)"""
+    start = time.perf_counter()
+    try:
+        response = llm_session.post(
+            ANTHROPIC_MESSAGES_URL,
+            headers=anthropic_headers(api_key),
+            json=anthropic_request,
+            timeout=LLM_TIMEOUT
+        )
+    except requests.exceptions.RequestException:
+        llm_upstream_duration.observe(time.perf_counter() - start, mode='json', status='error')
+        raise
+    llm_upstream_duration.observe(time.perf_counter() - start, mode='json', status=str(response.status_code))
+    
+    if response.status_code == 200:
+        return format_anthropic_response(response.json()), 200
+    
+    error_data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {'error': response.text}
+    logger.error(f"Anthropic API error: {response.status_code} - {error_data}")
+    return {
+        'error': f"Anthropic API error: {error_data.get('error', {}).get('message', 'Unknown error')}"
+    }, response.status_code
+
 def handle_anthropic_request(data):
-    """Handle Anthropic API requests"""
+    """
+    Handle Anthropic API requests
+    Cacheable requests (see llm_cacheable) are served from the response cache, and
+    identical ones arriving while the first is still upstream share its call. Upstream
+    token usage is recorded against the request's sessionId
+    """
     try:
-        # Get API key from environment variable
+        # Get API key from environment variable (chat_request_error checked it is set)
         api_key = os.getenv('ANTHROPIC_API_KEY')
-        if not api_key:
-            return jsonify({'error': 'Anthropic API key not configured'}), 500
+        anthropic_request, context = build_anthropic_request(data)
+        session_id = chat_session_id(data)
+        annotate_request(session_id=session_id, stream=False, trimmed_messages=context['trimmedMessages'])
+        if not llm_cacheable(anthropic_request):
+            body, status = call_anthropic(api_key, anthropic_request)
+            if status == 200:
+                llm_usage.record(session_id, body['usage'], trimmed_messages=context['trimmedMessages'])
+            return jsonify(dict(body, cached=False, context=context) if status == 200 else body), status
         
-        # Extract request data
-        messages = data.get('messages', [])
-        options = data.get('options', {})
-        
-        if not messages:
-            return jsonify({'error': 'No messages provided'}), 400
-        
-        # Prepare the request for Anthropic API
-        anthropic_request = {
-            'model': data.get('model', 'claude-3-5-sonnet-20241022'),
-            'messages': messages,
-            'max_tokens': options.get('maxTokens', 8000),
-            'temperature': options.get('temperature', 0.7)
-        }
+        key = request_key(anthropic_request)
+        cached = llm_response_cache.get(key)
+        if cached is not None:
+            llm_usage.record(session_id, None, cached=True, trimmed_messages=context['trimmedMessages'])
+            return jsonify(dict(cached, cached=True, context=context))
         
-        # Add system message if provided
-        system_message = data.get('system')
-        if system_message:
-            anthropic_request['system'] = system_message
+        def fetch():
+            body, status = call_anthropic(api_key, anthropic_request)
+            if status == 200:
+                llm_response_cache.put(key, body)
+            return body, status
         
-        # Make request to Anthropic API
-        headers = {
-            'Content-Type': 'application/json',
-            'x-api-key': api_key,
-            'anthropic-version': '2023-06-01'
-        }
-        
-        response = requests.post(
-            'https://api.anthropic.com/v1/messages',
-            headers=headers,
-            json=anthropic_request,
-            timeout=60
-        )
-        
-        if response.status_code == 200:
-            anthropic_data = response.json()
-            
-            # Format response to match our frontend expectations
-            return jsonify({
-                'content': anthropic_data.get('content', [{}])[0].get('text', ''),
-                'usage': {
-                    'promptTokens': anthropic_data.get('usage', {}).get('input_tokens', 0),
-                    'completionTokens': anthropic_data.get('usage', {}).get('output_tokens', 0),
-                    'totalTokens': (
-                        anthropic_data.get('usage', {}).get('input_tokens', 0) + 
-                        anthropic_data.get('usage', {}).get('output_tokens', 0)
-                    )
-                },
-                'model': anthropic_data.get('model', 'claude-3-5-sonnet-20241022'),
-                'provider': 'anthropic'
-            })
-        else:
-            error_data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {'error': response.text}
-            logger.error(f"Anthropic API error: {response.status_code} - {error_data}")
-            return jsonify({
-                'error': f"Anthropic API error: {error_data.get('error', {}).get('message', 'Unknown error')}"
-            }), response.status_code
+        (body, status), coalesced = llm_single_flight.do(key, fetch)
+        if status == 200:
+            # Only the caller that made the upstream call is charged for its tokens
+            llm_usage.record(session_id, None if coalesced else body['usage'],
+                             trimmed_messages=context['trimmedMessages'])
+        return jsonify(dict(body, cached=False, coalesced=coalesced, context=context) if status == 200 else body), status
             
     except requests.exceptions.RequestException as e:
         logger.error(f"Request error: {str(e)}")
@@ -223,17 +1227,172 @@ def handle_anthropic_request(data):
         logger.error(f"Anthropic request error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+async def call_anthropic_async(api_key: str, anthropic_request: Dict[str, Any]):
+    """call_anthropic on the LLM proxy's event loop, for the chat listener"""
+    start = time.perf_counter()
+    try:
+        status, text = await streaming_llm_proxy.post(ANTHROPIC_MESSAGES_URL, anthropic_headers(api_key), anthropic_request)
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        llm_upstream_duration.observe(time.perf_counter() - start, mode='json', status='error')
+        raise
+    llm_upstream_duration.observe(time.perf_counter() - start, mode='json', status=str(status))
+    
+    if status == 200:
+        return format_anthropic_response(json.loads(text)), 200
+    
+    logger.error(f"Anthropic API error: {status} - {text[:200]}")
+    return {'error': f"Anthropic API error: {upstream_error_message(status, text)}"}, status
+
+async def replay_cached_stream_async(cached: Dict[str, Any]):
+    for event in replay_cached_stream(cached):
+        yield event
+
+async def write_sse(request: web.Request, events) -> web.StreamResponse:
+    """Send an async iterator of SSE text as a text/event-stream response"""
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    await response.prepare(request)
+    try:
+        async for event in events:
+            await response.write(event.encode('utf-8'))
+        await response.write_eof()
+    except ConnectionResetError:
+        logger.debug("Chat client disconnected")
+    finally:
+        # Cancels the upstream request if the client went away mid-stream
+        await events.aclose()
+    return response
+
+async def llm_chat_async(request: web.Request) -> web.StreamResponse:
+    """
+    /api/llm/chat on the chat listener: same requests, responses, caching and usage
+    accounting as llm_chat, but upstream calls are awaited on the event loop, so a
+    chat holds no thread however long the upstream takes. Usage is recorded in the
+    loop's executor, since SharedSessionUsage writes to SQLite
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        error = chat_request_error(data)
+        if error is not None:
+            body, status = error
+            return web.json_response(body, status=status)
+        
+        api_key = os.getenv('ANTHROPIC_API_KEY')
+        anthropic_request, context = build_anthropic_request(data)
+        session_id = chat_session_id(data)
+        stream = bool(data.get('stream'))
+        request['request_fields'] = {'session_id': session_id, 'stream': stream,
+                                     'trimmed_messages': context['trimmedMessages']}
+        cacheable = llm_cacheable(anthropic_request)
+        key = request_key(anthropic_request) if cacheable else None
+        cached = llm_response_cache.get(key) if cacheable else None
+        if cached is not None:
+            await loop.run_in_executor(None, partial(
+                llm_usage.record, session_id, None, cached=True, trimmed_messages=context['trimmedMessages']
+            ))
+            if stream:
+                return await write_sse(request, replay_cached_stream_async(cached))
+            return web.json_response(dict(cached, cached=True, context=context))
+        
+        if stream:
+            def on_complete(body):
+                llm_usage.record(session_id, body['usage'], trimmed_messages=context['trimmedMessages'])
+                if cacheable:
+                    llm_response_cache.put(key, body)
+            
+            return await write_sse(request, streaming_llm_proxy.stream_async(
+                ANTHROPIC_MESSAGES_URL, anthropic_headers(api_key), anthropic_request, on_complete=on_complete
+            ))
+        
+        if not cacheable:
+            (body, status), coalesced = await call_anthropic_async(api_key, anthropic_request), None
+        else:
+            async def fetch():
+                body, status = await call_anthropic_async(api_key, anthropic_request)
+                if status == 200:
+                    llm_response_cache.put(key, body)
+                return body, status
+            
+            (body, status), coalesced = await llm_async_single_flight.do(key, fetch)
+        if status != 200:
+            return web.json_response(body, status=status)
+        # Only the caller that made the upstream call is charged for its tokens
+        await loop.run_in_executor(None, partial(
+            llm_usage.record, session_id, None if coalesced else body['usage'],
+            trimmed_messages=context['trimmedMessages']
+        ))
+        body = dict(body, cached=False, context=context)
+        if coalesced is not None:
+            body['coalesced'] = coalesced
+        return web.json_response(body)
+    
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error(f"Request error: {str(e)}")
+        return web.json_response({'error': f'Request failed: {str(e) or type(e).__name__}'}, status=500)
+    except Exception as e:
+        logger.error(f"LLM chat error: {str(e)}")
+        return web.json_response({'error': str(e)}, status=500)
+
+async def chat_preflight(request: web.Request) -> web.Response:
+    return web.Response(status=200, headers={
+        'Access-Control-Allow-Methods': 'POST, OPTIONS',
+        'Access-Control-Allow-Headers': request.headers.get('Access-Control-Request-Headers', 'Content-Type')
+    })
+
+async def add_cors_headers(request: web.Request, response: web.StreamResponse):
+    # The chat listener is called cross-origin by the frontend, like the Flask app (CORS(app))
+    response.headers.setdefault('Access-Control-Allow-Origin', '*')
+
+@web.middleware
+async def chat_request_metrics(request: web.Request, handler):
+    """Request metrics and the structured request log, as the Flask hooks record them"""
+    start = time.perf_counter()
+    try:
+        response = await handler(request)
+    except web.HTTPException as e:
+        response = e
+    route = request.match_info.route.resource.canonical if request.match_info.route.resource else 'unmatched'
+    status = response.status
+    http_requests_total.inc(route=route, method=request.method, status=status)
+    if status >= 400:
+        http_request_errors_total.inc(route=route, status_class=f'{status // 100}xx')
+    duration = time.perf_counter() - start
+    http_request_duration.observe(duration, route=route)
+    if request_log.should_record(status, duration * 1000, False):
+        record = {'method': request.method, 'route': route, 'status': status, 'pid': os.getpid(), 'listener': 'chat'}
+        request_id = request.headers.get('X-Request-ID')
+        if request_id:
+            record['request_id'] = request_id[:64]
+        record.update(request.get('request_fields') or {})
+        request_log.record(dict(record, duration_ms=round(duration * 1000, 3)))
+    if isinstance(response, web.HTTPException):
+        raise response
+    return response
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Simple health check endpoint"""
+    """
+    Health check with per-model readiness
+    Answers as soon as the process is up; while the background warmup is still
+    loading models, status is 'warming_up' and each model reports its own state
+    """
+    warming_up = model_registry.warming_up()
     return jsonify({
-        'status': 'healthy',
-        'timestamp': '2024-01-20T10:00:00Z',
-        'models_loaded': {
-            'diabetes': models['diabetes'] is not None,
-            'heart': models['heart'] is not None,
-            'hypertension': models['hypertension'] is not None
-        }
+        'status': 'warming_up' if warming_up else 'healthy',
+        'ready': not warming_up,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'uptime_seconds': round(time.time() - SERVER_START_TIME, 1),
+        'worker_pid': os.getpid(),
+        'model_loading': MODEL_LOADING,
+        'models_loaded': {model_type: model_available(model_type) for model_type in MODEL_SPECS},
+        'models': model_registry.status()
     })
 
 @app.route('/debug/models', methods=['GET'])
@@ -244,16 +1403,18 @@ def debug_models():
     
     debug_info = {
         'models_dir': models_dir,
-        'models_loaded': {
-            'diabetes': models['diabetes'] is not None,
-            'heart': models['heart'] is not None,
-            'hypertension': models['hypertension'] is not None,
-        },
+        'models_loaded': {model_type: model_available(model_type) for model_type in MODEL_SPECS},
+        'enabled_models': model_registry.model_types,
+        'compiled_artifacts_dir': compiled_artifacts_dir(),
         'scalers_loaded': {
             'diabetes': scalers['diabetes'] is not None,
             'heart': scalers['heart'] is not None,
             'hypertension': scalers['hypertension'] is not None,
         },
+        'fast_scoring': {
+            model_type: type(compiled).__name__ if compiled is not None else 'None'
+            for model_type, compiled in compiled_models.items()
+        },
         'scaler_types': {
             'diabetes': str(type(scalers['diabetes'])) if scalers['diabetes'] is not None else 'None',
             'heart': str(type(scalers['heart'])) if scalers['heart'] is not None else 'None',
@@ -278,60 +1439,7 @@ def predict_diabetes():
     Based on your Diabetes Model - Expected 8 features
     """
     try:
-        data = request.get_json()
-        
-        if not data or 'features' not in data:
-            return jsonify({'error': 'Missing features in request'}), 400
-        
-        features = data['features']
-        
-        # Your diabetes model expects 8 features
-        expected_features = 8
-        if len(features) != expected_features:
-            return jsonify({'error': f'Expected {expected_features} features, got {len(features)}'}), 400
-        
-        # Preprocess features using trained scaler
-        try:
-            if scalers['diabetes'] is None:
-                logger.warning("Diabetes scaler not available, using raw features")
-                features_array = np.array(features).reshape(1, -1)
-                processed_features = features_array
-            else:
-                features_array = np.array(features).reshape(1, -1)
-                processed_features = scalers['diabetes'].transform(features_array)
-        except Exception as scaler_error:
-            logger.error(f"Diabetes scaler preprocessing failed: {str(scaler_error)}")
-            # Use raw features as fallback
-            features_array = np.array(features).reshape(1, -1)
-            processed_features = features_array
-        
-        # Make prediction using trained model
-        if models['diabetes'] is None:
-            return jsonify({'error': 'Diabetes model not available'}), 500
-        
-        try:
-            prediction = models['diabetes'].predict(processed_features)[0]
-            probability = models['diabetes'].predict_proba(processed_features)[0]
-            diabetes_probability = probability[1] if len(probability) > 1 else prediction
-        except Exception as model_error:
-            logger.error(f"Diabetes model prediction failed: {str(model_error)}")
-            # Fallback logic based on medical risk factors
-            glucose, bmi, age = features[1], features[5], features[7]
-            risk_score = 0.1
-            if glucose > 140: risk_score += 0.4  # High glucose
-            if bmi > 30: risk_score += 0.3       # Obesity
-            if age > 45: risk_score += 0.2       # Age factor
-            if features[0] > 5: risk_score += 0.15  # Multiple pregnancies
-            diabetes_probability = min(risk_score, 0.95)
-            logger.info(f"Using fallback prediction for diabetes: {diabetes_probability}")
-        
-        return jsonify({
-            'probability': float(diabetes_probability),
-            'prediction': int(diabetes_probability > 0.5),
-            'confidence': 0.85,
-            'model_version': '1.0'
-        })
-        
+        return predict_single('diabetes')
     except Exception as e:
         logger.error(f"Error in diabetes prediction: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -342,167 +1450,455 @@ def predict_heart_disease():
     Predict heart disease risk
     Based on your Heart Model - Expected 13 features
     """
+    try:
+        return predict_single('heart')
+    except Exception as e:
+        logger.error(f"Error in heart disease prediction: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/predict/hypertension', methods=['POST'])
+def predict_hypertension():
+    """
+    Predict hypertension risk
+    Based on your Hypertension Model - Expected 12 features
+    """
+    try:
+        return predict_single('hypertension')
+    except Exception as e:
+        logger.error(f"Error in hypertension prediction: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/predict/<model_type>/batch', methods=['POST'])
+def predict_batch(model_type):
+    """
+    Score many patients with one model in a single request
+    Expects {"features": [[...], [...], ...]}; invalid rows are reported
+    individually and do not fail the rest of the batch
+    """
+    if model_type not in MODEL_SPECS:
+        return jsonify({'error': f'Unknown model: {model_type}'}), 404
+    
+    spec = MODEL_SPECS[model_type]
+    
     try:
         data = request.get_json()
         
         if not data or 'features' not in data:
             return jsonify({'error': 'Missing features in request'}), 400
         
-        features = data['features']
-        
-        # Your heart model expects 13 features
-        expected_features = 13
-        if len(features) != expected_features:
-            return jsonify({'error': f'Expected {expected_features} features, got {len(features)}'}), 400
+        rows = data['features']
+        annotate_request(model=model_type, rows=len(rows) if isinstance(rows, list) else None)
+        if not isinstance(rows, list):
+            return jsonify({'error': 'Batch features must be a list of feature vectors'}), 400
+        if len(rows) > MAX_BATCH_ROWS:
+            return jsonify({'error': f'Batch too large: {len(rows)} rows (max {MAX_BATCH_ROWS})'}), 413
         
-        # Preprocess features with scaler (heart model uses raw features if no scaler)
-        features_array = np.array(features).reshape(1, -1)
-        logger.info(f"Heart prediction - Features array shape: {features_array.shape}")
-        logger.info(f"Heart scaler available: {scalers['heart'] is not None}")
+        # Validate each row on its own so a bad record only fails itself
+        results = [None] * len(rows)
+        valid_indices = []
+        for index, row in enumerate(rows):
+            error = validate_feature_row(row, spec['n_features'])
+            if error:
+                results[index] = {'index': index, 'error': error}
+            else:
+                valid_indices.append(index)
         
-        if scalers['heart'] is not None:
+        if valid_indices:
             try:
-                logger.info(f"Heart scaler type: {type(scalers['heart'])}")
-                processed_features = scalers['heart'].transform(features_array)
-                logger.info(f"Features successfully scaled. Shape: {processed_features.shape}")
-            except Exception as scaler_error:
-                logger.error(f"Error applying heart scaler: {str(scaler_error)}")
-                return jsonify({'error': 'Heart scaler preprocessing failed'}), 500
+                scored = score_features(model_type, [rows[i] for i in valid_indices])
+            except PredictionError as prediction_error:
+                return jsonify({'error': str(prediction_error)}), prediction_error.status_code
+            
+            for index, probability, prediction in zip(valid_indices, scored['probabilities'], scored['predictions']):
+                results[index] = {
+                    'index': index,
+                    'probability': probability,
+                    'prediction': prediction,
+                    'fallback': scored['fallback']
+                }
+            timings = scored['timings']
+            model_version = scored['model_version']
         else:
-            # Heart model was trained without scaling
-            processed_features = features_array
-            logger.info("Using raw features for heart disease prediction")
-        
-        # Make prediction using trained model
-        if models['heart'] is None:
-            return jsonify({'error': 'Heart disease model not available'}), 500
-        
-        try:
-            prediction = models['heart'].predict(processed_features)[0]
-            probability = models['heart'].predict_proba(processed_features)[0]
-            heart_probability = probability[1] if len(probability) > 1 else prediction
-        except Exception as model_error:
-            logger.error(f"Heart disease model prediction failed: {str(model_error)}")
-            # Fallback logic based on medical risk factors
-            age, sex, chest_pain, cholesterol, max_hr = features[0], features[1], features[2], features[4], features[7]
-            risk_score = 0.1
-            if age > 55: risk_score += 0.3       # Age factor
-            if sex == 1: risk_score += 0.2       # Male gender
-            if chest_pain >= 2: risk_score += 0.25  # Chest pain types
-            if cholesterol > 240: risk_score += 0.3  # High cholesterol
-            if max_hr < 120: risk_score += 0.2   # Low max heart rate
-            if features[8] == 1: risk_score += 0.15  # Exercise induced angina
-            heart_probability = min(risk_score, 0.95)
-            logger.info(f"Using fallback prediction for heart disease: {heart_probability}")
+            timings = {}
+            model_version = model_registry.version(model_type)
         
         return jsonify({
-            'probability': float(heart_probability),
-            'prediction': int(heart_probability > 0.5),
-            'confidence': 0.88,
-            'model_version': '1.0'
+            'results': results,
+            'count': len(rows),
+            'succeeded': len(valid_indices),
+            'failed': len(rows) - len(valid_indices),
+            'confidence': spec['confidence'],
+            'model_version': model_version,
+            'timings': timings
         })
         
     except Exception as e:
-        logger.error(f"Error in heart disease prediction: {str(e)}")
+        logger.error(f"Error in {model_type} batch prediction: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
-@app.route('/api/predict/hypertension', methods=['POST'])
-def predict_hypertension():
+@app.route('/api/assess', methods=['POST'])
+def assess_patient():
     """
-    Predict hypertension risk
-    Based on your Hypertension Model - Expected 12 features
+    Score one patient against every disease model in a single request
+    Expects {"patient": {"age": 52, "bmi": 31.2, ...}}, keyed by the feature
+    names from /api/models/info; an optional "models" list limits the assessment
     """
     try:
         data = request.get_json()
         
-        if not data or 'features' not in data:
-            return jsonify({'error': 'Missing features in request'}), 400
+        if not data or not isinstance(data.get('patient'), dict):
+            return jsonify({'error': 'Missing patient record in request'}), 400
         
-        features = data['features']
+        patient = data['patient']
+        requested_models = data.get('models', list(MODEL_SPECS))
+        if not isinstance(requested_models, list):
+            return jsonify({'error': 'models must be a list of model names'}), 400
+        unknown_models = [m for m in requested_models if m not in MODEL_SPECS]
+        if unknown_models:
+            return jsonify({'error': f"Unknown models: {', '.join(map(str, unknown_models))}"}), 400
         
-        # Your hypertension model expects 12 features
-        expected_features = 12
-        if len(features) != expected_features:
-            return jsonify({'error': f'Expected {expected_features} features, got {len(features)}'}), 400
+        # Map the named record onto each model's feature order
+        results = {}
+        pending = {}
+        for model_type in requested_models:
+            spec = MODEL_SPECS[model_type]
+            missing = [name for name in spec['features'] if name not in patient]
+            if missing:
+                results[model_type] = {'error': f"Missing features: {', '.join(missing)}"}
+                continue
+            
+            features = [patient[name] for name in spec['features']]
+            error = validate_feature_row(features, spec['n_features'])
+            if error:
+                results[model_type] = {'error': error}
+                continue
+            
+            pending[model_type] = assessment_executor.submit(score_single_cached, model_type, features)
         
-        # Preprocess features using trained scaler
-        try:
-            if scalers['hypertension'] is None:
-                logger.warning("Hypertension scaler not available, using raw features")
-                features_array = np.array(features).reshape(1, -1)
-                processed_features = features_array
-            else:
-                features_array = np.array(features).reshape(1, -1)
-                processed_features = scalers['hypertension'].transform(features_array)
-        except Exception as scaler_error:
-            logger.error(f"Hypertension scaler preprocessing failed: {str(scaler_error)}")
-            # Use raw features as fallback
-            features_array = np.array(features).reshape(1, -1)
-            processed_features = features_array
+        for model_type, future in pending.items():
+            spec = MODEL_SPECS[model_type]
+            try:
+                scored = future.result()
+            except PredictionError as prediction_error:
+                results[model_type] = {'error': str(prediction_error)}
+                continue
+            
+            results[model_type] = {
+                'probability': scored['probability'],
+                'prediction': scored['prediction'],
+                'confidence': spec['confidence'],
+                'fallback': scored['fallback'],
+                'model_version': scored['model_version'],
+                'cached': scored['cached'],
+                'timings': scored['timings']
+            }
         
-        # Make prediction using trained model
-        if models['hypertension'] is None:
-            return jsonify({'error': 'Hypertension model not available'}), 500
+        return jsonify({
+            'results': {model_type: results[model_type] for model_type in requested_models}
+        })
         
-        try:
-            prediction = models['hypertension'].predict(processed_features)[0]
-            probability = models['hypertension'].predict_proba(processed_features)[0]
-            hypertension_probability = probability[1] if len(probability) > 1 else prediction
-        except Exception as model_error:
-            logger.error(f"Hypertension model prediction failed: {str(model_error)}")
-            # Fallback logic based on medical risk factors
-            male, age, smoking, bmi, sys_bp, dia_bp = features[0], features[1], features[2], features[9], features[7], features[8]
-            risk_score = 0.1
-            if sys_bp > 140: risk_score += 0.4   # High systolic BP
-            if dia_bp > 90: risk_score += 0.3    # High diastolic BP
-            if age > 45: risk_score += 0.2       # Age factor
-            if bmi > 30: risk_score += 0.2       # Obesity
-            if smoking == 1: risk_score += 0.25  # Current smoker
-            if male == 1: risk_score += 0.1      # Male gender
-            if features[5] == 1: risk_score += 0.15  # Diabetes
-            hypertension_probability = min(risk_score, 0.95)
-            logger.info(f"Using fallback prediction for hypertension: {hypertension_probability}")
+    except Exception as e:
+        logger.error(f"Error in combined assessment: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit, miss and eviction counters of the per-model prediction caches and the LLM response cache"""
+    return jsonify({
+        'model_versions': {model_type: model_registry.version(model_type) for model_type in MODEL_SPECS},
+        'caches': {model_type: cache.stats() for model_type, cache in prediction_caches.items()},
+        'shared': shared_prediction_cache.stats() if shared_prediction_cache is not None else None,
+        'llm': dict(llm_response_cache.stats(),
+                    coalesced=llm_single_flight.coalesced + llm_async_single_flight.coalesced,
+                    in_flight=llm_single_flight.in_flight() + llm_async_single_flight.in_flight())
+    })
+
+def require_admin():
+    """Error response unless the X-Admin-Token header matches ADMIN_TOKEN (admin endpoints are disabled without it)"""
+    admin_token = os.getenv('ADMIN_TOKEN')
+    if not admin_token:
+        return jsonify({'error': 'Admin endpoints are disabled (ADMIN_TOKEN not set)'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), admin_token):
+        return jsonify({'error': 'Invalid admin token'}), 401
+    return None
+
+@app.route('/api/llm/usage', methods=['GET'])
+def llm_usage_top():
+    """
+    Chat sessions with the highest token usage (admin only)
+    ?limit= (default 20) and ?sort= one of total_tokens, prompt_tokens,
+    completion_tokens, requests, last_seen
+    """
+    denied = require_admin()
+    if denied is not None:
+        return denied
+    
+    sort = request.args.get('sort', 'total_tokens')
+    if sort not in USAGE_SORT_KEYS:
+        return jsonify({'error': f"sort must be one of: {', '.join(USAGE_SORT_KEYS)}"}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 1000)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    return jsonify({'sessions': llm_usage.top(limit, sort), 'totals': llm_usage.stats()})
+
+@app.route('/api/llm/usage/<session_id>', methods=['GET'])
+def llm_usage_session(session_id):
+    """Token usage of one chat session (admin only, like the session listing)"""
+    denied = require_admin()
+    if denied is not None:
+        return denied
+    
+    usage = llm_usage.get(session_id)
+    if usage is None:
+        return jsonify({'error': f'No usage recorded for session {session_id}'}), 404
+    return jsonify(usage)
+
+@app.route('/api/admin/reload', methods=['POST'])
+def reload_models():
+    """
+    Reload model artifacts from MODELS_DIR without restarting the server
+    Requires an X-Admin-Token header matching ADMIN_TOKEN (the endpoint is disabled
+    when it is unset); an optional {"models": [...]} list limits the reload. Only the
+    worker that receives the call reloads, so multi-worker deployments should set
+    MODEL_RELOAD_INTERVAL to have every worker watch the files instead
+    """
+    denied = require_admin()
+    if denied is not None:
+        return denied
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        requested_models = data.get('models', model_registry.model_types)
+        if not isinstance(requested_models, list):
+            return jsonify({'error': 'models must be a list of model names'}), 400
+        unknown_models = [m for m in requested_models if not model_registry.is_enabled(m)]
+        if unknown_models:
+            return jsonify({'error': f"Unknown or disabled models: {', '.join(map(str, unknown_models))}"}), 400
         
         return jsonify({
-            'probability': float(hypertension_probability),
-            'prediction': int(hypertension_probability > 0.5),
-            'confidence': 0.82,
-            'model_version': '1.0'
+            'results': {model_type: model_registry.reload(model_type) for model_type in requested_models},
+            'worker_pid': os.getpid()
         })
         
     except Exception as e:
-        logger.error(f"Error in hypertension prediction: {str(e)}")
+        logger.error(f"Error reloading models: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/models/info', methods=['GET'])
 def get_models_info():
     """Get information about loaded models"""
-    return jsonify({
-        'models': {
-            'diabetes': {
-                'model_loaded': models['diabetes'] is not None,
-                'scaler_loaded': scalers['diabetes'] is not None,
-                'features': ['pregnancies', 'glucose', 'blood_pressure', 'skin_thickness', 'insulin', 'bmi', 'diabetes_pedigree_function', 'age']
-            },
-            'heart': {
-                'model_loaded': models['heart'] is not None,
-                'scaler_loaded': scalers['heart'] is not None,
-                'features': ['age', 'sex', 'chest_pain_type', 'resting_bp', 'cholesterol', 'fasting_bs', 'resting_ecg', 'max_hr', 'exercise_angina', 'oldpeak', 'st_slope']
-            },
-            'hypertension': {
-                'model_loaded': models['hypertension'] is not None,
-                'scaler_loaded': scalers['hypertension'] is not None,
-                'features': ['age', 'systolic_bp', 'diastolic_bp', 'bmi', 'smoking', 'alcohol', 'exercise', 'family_history', 'stress']
-            }
+    def info(model_type: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+        bundle = model_registry.bundle(model_type) or {}
+        # Compiled artifacts carry no scaler object: it is folded into the scorer's weights
+        scaler_folded = bundle.get('source') == 'compiled_artifact'
+        return {
+            'enabled': model_registry.is_enabled(model_type),
+            'model_loaded': model_available(model_type),
+            'model_version': model_registry.version(model_type),
+            'variant': MODEL_VARIANTS.get(model_type),
+            'compiled': bundle.get('compiled') is not None,
+            'scaler_folded': scaler_folded,
+            'scaler_loaded': scalers[model_type] is not None or scaler_folded,
+            'features': spec['features']
         }
-    })
+    
+    return jsonify({'models': {model_type: info(model_type, spec) for model_type, spec in MODEL_SPECS.items()}})
+
+@app.route('/api/admission/stats', methods=['GET'])
+def admission_stats():
+    """Concurrency, queue depth, queue wait percentiles and shed requests per route class (this worker)"""
+    return jsonify(dict(admission_controller.stats(), worker_pid=os.getpid()))
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request, prediction stage, fallback, admission and upstream LLM metrics in the Prometheus text format"""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+def metrics_route() -> str:
+    """Route template of the request (e.g. /api/predict/<model_type>/batch), keeping label cardinality bounded"""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+@app.before_request
+def start_request_timer():
+    # Registered before admit_request so time spent queued for admission is included
+    g.request_start = time.perf_counter()
+    metrics_registry.start_flusher()
+
+def annotate_request(**fields):
+    """Add fields to this request's structured log record"""
+    g.setdefault('request_fields', {}).update(fields)
+
+def request_debug_enabled() -> bool:
+    return g.get('request_debug') is not None
+
+def debug_request(**fields):
+    """Add debug detail to this request's log record, if debugging was enabled for it"""
+    if g.get('request_debug') is not None:
+        g.request_debug.update(fields)
+
+@app.before_request
+def begin_request_log():
+    header = request.headers.get(request_log.debug_header) if request_log.debug_header else None
+    g.request_debug = {} if request_log.wants_debug(header) else None
+
+@app.after_request
+def finish_request_log(response):
+    start = g.get('request_start')
+    if start is None:
+        return response
+    record = {
+        'method': request.method,
+        'route': metrics_route(),
+        'status': response.status_code,
+        'pid': os.getpid()
+    }
+    request_id = request.headers.get('X-Request-ID')
+    if request_id:
+        record['request_id'] = request_id[:64]
+    record.update(g.get('request_fields') or {})
+    debug = g.get('request_debug')
+    if debug is not None:
+        record['debug'] = dict(debug, path=request.path, content_length=request.content_length)
+    
+    def write_record():
+        duration_ms = (time.perf_counter() - start) * 1000
+        if request_log.should_record(record['status'], duration_ms, debug is not None):
+            request_log.record(dict(record, duration_ms=round(duration_ms, 3)))
+    
+    response.call_on_close(write_record)
+    return response
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.get('request_start')
+    if start is None:
+        return response
+    route, status = metrics_route(), response.status_code
+    http_requests_total.inc(route=route, method=request.method, status=status)
+    if status >= 400:
+        http_request_errors_total.inc(route=route, status_class=f'{status // 100}xx')
+    # Observed once the body has been sent, so streamed chats count their full duration
+    response.call_on_close(lambda: http_request_duration.observe(time.perf_counter() - start, route=route))
+    return response
+
+@app.before_request
+def admit_request():
+    """
+    Hold a slot of the endpoint's route class for the whole request, waiting in its
+    queue if needed; saturated classes answer 503 with Retry-After right away
+    """
+    if request.method == 'OPTIONS':
+        return None
+    limiter = admission_controller.limiter(ENDPOINT_CLASSES.get(request.endpoint))
+    if limiter is None:
+        return None
+    try:
+        admission_wait_duration.observe(limiter.acquire(), route_class=limiter.name)
+    except AdmissionRejected as e:
+        admission_rejected_total.inc(route_class=e.route_class, reason=e.reason)
+        response = jsonify({'error': 'Server busy, please retry', 'route_class': e.route_class, 'reason': e.reason})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    g.admission = {'limiter': limiter, 'start': time.perf_counter(), 'released': False}
+    return None
+
+def release_admission(admission):
+    if not admission['released']:
+        admission['released'] = True
+        admission['limiter'].release(time.perf_counter() - admission['start'])
+
+@app.after_request
+def hand_off_admission(response):
+    # Streamed responses keep their slot until the body has been sent
+    admission = g.pop('admission', None)
+    if admission is not None:
+        response.call_on_close(lambda: release_admission(admission))
+    return response
+
+@app.teardown_request
+def release_unsent_admission(exc):
+    # Safety net for requests that never produced a response object
+    admission = g.pop('admission', None)
+    if admission is not None:
+        release_admission(admission)
+
+@app.before_request
+def ensure_model_watcher():
+    # Started from the first request rather than create_app() so that under gunicorn
+    # preloading it runs in each worker, not in the master before fork
+    if MODEL_RELOAD_INTERVAL > 0:
+        model_registry.start_watcher(MODEL_RELOAD_INTERVAL)
+
+_chat_listener_pid = None
+
+def start_chat_listener():
+    """
+    Serve /api/llm/chat on LLM_CHAT_PORT from this process's LLM proxy event loop (see
+    llm_chat_async), once per process; gunicorn.conf.py calls this in every worker,
+    which all bind the port with SO_REUSEPORT. Does nothing without LLM_CHAT_PORT
+    """
+    global _chat_listener_pid
+    if not LLM_CHAT_PORT or _chat_listener_pid == os.getpid():
+        return
+    _chat_listener_pid = os.getpid()
+    chat_app = web.Application(middlewares=[chat_request_metrics])
+    chat_app.router.add_post('/api/llm/chat', llm_chat_async)
+    chat_app.router.add_route('OPTIONS', '/api/llm/chat', chat_preflight)
+    chat_app.on_response_prepare.append(add_cors_headers)
+    streaming_llm_proxy.serve(chat_app, LLM_CHAT_HOST, LLM_CHAT_PORT).result(timeout=10)
+    metrics_registry.start_flusher()
+    logger.info(f"Chat listener serving /api/llm/chat on {LLM_CHAT_HOST}:{LLM_CHAT_PORT} (pid: {os.getpid()})")
+
+_models_initialized = False
+
+def create_app():
+    """
+    Application factory: starts model loading once per process (per MODEL_LOADING)
+    and returns the Flask app. gunicorn.conf.py calls this in the master (preload_app)
+    with eager loading, so workers inherit the loaded models copy-on-write instead of
+    unpickling them again after fork.
+    """
+    global _models_initialized
+    if not _models_initialized:
+        if MODEL_LOADING == 'eager':
+            load_models()
+        elif MODEL_LOADING == 'background':
+            model_registry.start_warmup()
+        elif MODEL_LOADING != 'lazy':
+            logger.warning(f"Unknown MODEL_LOADING '{MODEL_LOADING}', loading models on first request")
+        _models_initialized = True
+    return app
 
 if __name__ == '__main__':
-    # Load models on startup
-    load_models()
+    import argparse
+    import sys
+    
+    parser = argparse.ArgumentParser(description='BloomBuddy ML API server')
+    parser.add_argument('--verify-fused', action='store_true',
+                        help='Check fused scaler + linear scorers against the original pipeline and exit')
+    args = parser.parse_args()
+    
+    if args.verify_fused:
+        # Verification needs the original estimators, not the compiled artifacts
+        USE_COMPILED_ARTIFACTS = False
+        load_models()
+        verification = verify_fused_models()
+        for model_type, result in verification.items():
+            print(f"{model_type}: {result}")
+        sys.exit(0 if verification and all(r['passed'] for r in verification.values()) else 1)
+    
+    # Start loading models (see MODEL_LOADING)
+    create_app()
     
     # Get configuration from environment variables
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('DEBUG', 'False').lower() == 'true'
     
+    # With the reloader, only the child process that actually serves requests listens
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_chat_listener()
+    
     app.run(host='0.0.0.0', port=port, debug=debug)
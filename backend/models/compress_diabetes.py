@@ -0,0 +1,141 @@
+"""
+Build smaller, faster variants of the diabetes RandomForest and compare them.
+
+Starting from the installed diabetes_model.pkl + diabetes_scaler.pkl (the teacher),
+builds:
+  trees<k>            the teacher's first k trees (--trees, default 10,25,50)
+  depth<d>            a forest retrained on the training split with max_depth=d (--max-depth)
+  distilled_xgboost   a small XGBoost fitted to the teacher's probabilities
+  distilled_logistic  a logistic regression fitted to the teacher's probabilities
+The distilled models learn from soft labels: every row is given as a positive with
+weight p and a negative with weight 1 - p, where p is the teacher's probability,
+on the training split plus jittered copies of it (--augment).
+
+Each variant is scored against the teacher on the held-out 20% of diabetes.csv
+(the split ml-api-server.py validates reloads on): AUC, Brier score, pickle size on
+disk and single-row latency through the server's compiled scorer. Every variant
+is written to MODELS_DIR/variants/diabetes/<name>/ with a report.json next to
+them; serve one with MODEL_VARIANTS=diabetes=<name>.
+
+Usage (from the backend directory):
+    python models/compress_diabetes.py [--trees 10,25,50] [--max-depth 6]
+"""
+
+import argparse
+import json
+import os
+import sys
+import warnings
+
+import numpy as np
+
+from train_all import MODELS_DIR, RECIPES, build_estimator, load_server_module, load_training_data, split_training_data
+from tuning import serving_latency_us
+
+MODEL_TYPE = 'diabetes'
+
+
+def soft_label_fit(model, rows: np.ndarray, probabilities: np.ndarray):
+    """Fit a classifier to teacher probabilities as two weighted copies of every row"""
+    doubled = np.vstack([rows, rows])
+    labels = np.concatenate([np.ones(len(rows), dtype=int), np.zeros(len(rows), dtype=int)])
+    model.fit(doubled, labels, sample_weight=np.concatenate([probabilities, 1 - probabilities]))
+    return model
+
+
+def build_variants(teacher, scaled_train: np.ndarray, train_labels: np.ndarray, args) -> dict:
+    """name -> (model, description); every model scores rows scaled with the teacher's scaler"""
+    from sklearn.base import clone
+    from sklearn.linear_model import LogisticRegression
+    from xgboost import XGBClassifier
+
+    variants = {'original': (teacher, f'{len(teacher.estimators_)}-tree teacher')}
+    for k in sorted({int(k) for k in args.trees.split(',')}):
+        if k >= len(teacher.estimators_):
+            continue
+        subset = clone(teacher).set_params(n_estimators=k)
+        subset.__dict__.update({key: value for key, value in teacher.__dict__.items() if key.endswith('_')})
+        subset.estimators_ = teacher.estimators_[:k]
+        variants[f'trees{k}'] = (subset, f'first {k} trees of the teacher')
+
+    shallow = build_estimator(RECIPES[MODEL_TYPE], args.n_jobs, {'max_depth': args.max_depth})
+    variants[f'depth{args.max_depth}'] = (shallow.fit(scaled_train, train_labels),
+                                          f'{shallow.n_estimators} trees retrained with max_depth={args.max_depth}')
+
+    rng = np.random.default_rng(42)
+    picks = rng.integers(len(scaled_train), size=args.augment * len(scaled_train))
+    jittered = scaled_train[picks] + rng.normal(scale=args.jitter, size=(len(picks), scaled_train.shape[1]))
+    transfer_rows = np.vstack([scaled_train, jittered])
+    soft_labels = teacher.predict_proba(transfer_rows)[:, 1]
+
+    student = XGBClassifier(n_estimators=60, max_depth=3, learning_rate=0.1, eval_metric='logloss',
+                            random_state=42, n_jobs=args.n_jobs)
+    variants['distilled_xgboost'] = (soft_label_fit(student, transfer_rows, soft_labels),
+                                     '60 depth-3 boosted trees on teacher probabilities')
+    student = LogisticRegression(C=1.0, max_iter=1000)
+    variants['distilled_logistic'] = (soft_label_fit(student, transfer_rows, soft_labels),
+                                      'logistic regression on teacher probabilities')
+    return variants
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compress the diabetes RandomForest and compare the variants')
+    parser.add_argument('--trees', default='10,25,50', help='Tree counts of the truncated-forest variants')
+    parser.add_argument('--max-depth', type=int, default=6, help='Depth limit of the retrained shallow forest')
+    parser.add_argument('--augment', type=int, default=4, help='Jittered copies per training row for distillation')
+    parser.add_argument('--jitter', type=float, default=0.3, help='Jitter standard deviation, in scaled units')
+    parser.add_argument('--n-jobs', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    import joblib
+    from sklearn.metrics import brier_score_loss, roc_auc_score
+
+    warnings.filterwarnings('ignore')
+    # The teacher is always the installed model, never a previously built variant
+    os.environ.pop('MODEL_VARIANTS', None)
+    server = load_server_module()
+    server.logger.disabled = True
+    spec = server.MODEL_SPECS[MODEL_TYPE]
+    teacher, scaler = server.load_pickled_model(MODEL_TYPE)
+    if teacher is None or scaler is None or not hasattr(teacher, 'estimators_'):
+        print(f"Installed {spec['model_file']} is not a fitted forest with a scaler")
+        return 1
+
+    rows, labels, _ = load_training_data(spec, RECIPES[MODEL_TYPE], MODELS_DIR)
+    train_rows, _, train_labels, _ = split_training_data(rows, labels, RECIPES[MODEL_TYPE])
+    test_rows, test_labels = server.holdout_sample(MODEL_TYPE)
+    variants = build_variants(teacher, scaler.transform(train_rows), train_labels, args)
+
+    out_root = os.path.join(MODELS_DIR, 'variants', MODEL_TYPE)
+    report = {'teacher': spec['model_file'], 'holdout_rows': len(test_rows), 'variants': {}}
+    scaled_test = scaler.transform(test_rows)
+    for name, (model, description) in variants.items():
+        out_dir = os.path.join(out_root, name)
+        os.makedirs(out_dir, exist_ok=True)
+        model_path = os.path.join(out_dir, spec['model_file'])
+        joblib.dump(model, model_path)
+        joblib.dump(scaler, os.path.join(out_dir, spec['scaler_file']))
+
+        probabilities = model.predict_proba(scaled_test)[:, 1]
+        report['variants'][name] = {
+            'description': description,
+            'auc': round(float(roc_auc_score(test_labels, probabilities)), 4),
+            'brier': round(float(brier_score_loss(test_labels, probabilities)), 4),
+            'size_kb': round(os.path.getsize(model_path) / 1024, 1),
+            'latency_us_per_row': round(serving_latency_us(model, scaler, test_rows, repeats=5), 2)
+        }
+    with open(os.path.join(out_root, 'report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+
+    original = report['variants']['original']
+    print(f"{'variant':<20}{'auc':>8}{'brier':>8}{'size KB':>10}{'us/row':>9}{'speedup':>9}  description")
+    for name, result in report['variants'].items():
+        speedup = original['latency_us_per_row'] / result['latency_us_per_row']
+        print(f"{name:<20}{result['auc']:>8.4f}{result['brier']:>8.4f}{result['size_kb']:>10.1f}"
+              f"{result['latency_us_per_row']:>9.1f}{speedup:>8.1f}x  {result['description']}")
+    print(f"\nVariants written to {out_root}; serve one with MODEL_VARIANTS={MODEL_TYPE}=<variant>")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
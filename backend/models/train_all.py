@@ -0,0 +1,315 @@
+"""
+Train the diabetes, heart disease and hypertension models in one run.
+
+Replaces the standalone training scripts (Diabetes Model/app2.py, Heart Model/app4.py
+and Hypertenstion Model/app.py, plus the stale copies of the last two under the
+top-level models/ directory) with the same preprocessing, estimators and
+80/20 split (random_state=42). The models are trained in parallel, one process
+each, and --n-jobs is passed through to RandomForest and XGBoost.
+
+Every run writes its model + scaler pickles and a manifest.json (artifact hashes,
+model_version, holdout accuracy/AUC, parameters and per-stage timings) to
+MODELS_DIR/versions/<run id>/. Unless --no-install is given, the pickles are then
+copied to the file names in ml-api-server.py's MODEL_SPECS, where load_models (and
+the hot-reload watcher) pick them up, and MODELS_DIR/training_manifest.json records
+which run each installed model came from. --export-compiled also rebuilds the
+compiled artifacts, which would otherwise be ignored as stale until
+export_compiled_models.py is run: they are exported to MODELS_DIR/versions/<run id>/compiled/
+and then installed into the compiled directory without touching the files running
+servers have memory-mapped.
+
+With --tune, each model's hyperparameters are first searched by successive halving
+over all cores (see tuning.py) for the best cross-validated AUC within
+--max-latency-us of single-row scoring time, and the winner is trained as above.
+The search only sees the training split; the holdout stays untouched for the
+reported metrics.
+
+Usage (from the backend directory):
+    python models/train_all.py [--models diabetes,heart] [--n-jobs 4] [--export-compiled]
+    python models/train_all.py --tune --max-latency-us 50 --no-install
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from tuning import serving_latency_us, successive_halving
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.abspath(os.getenv('MODELS_DIR', os.path.dirname(os.path.abspath(__file__))))
+
+# Preprocessing and estimator of each model, as in its original training script
+RECIPES = {
+    'diabetes': {
+        'estimator': 'random_forest',
+        'params': {'n_estimators': 100, 'random_state': 42},
+        # Zeros in these columns are missing measurements; replaced by the column median
+        'zero_as_missing': ['Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'BMI'],
+        'missing': 'drop_target',
+        'stratify': False
+    },
+    'heart': {
+        'estimator': 'xgboost',
+        'params': {'eval_metric': 'logloss', 'random_state': 42},
+        'zero_as_missing': [],
+        'missing': 'drop',
+        'stratify': False
+    },
+    'hypertension': {
+        'estimator': 'logistic_regression',
+        'params': {'random_state': 42},
+        'zero_as_missing': [],
+        'missing': 'median',
+        'stratify': True
+    }
+}
+
+
+def load_server_module():
+    os.environ['MODELS_DIR'] = MODELS_DIR
+    os.environ.setdefault('MODEL_LOADING', 'lazy')
+    # ml-api-server.py imports its sibling modules (fast_scoring, metrics, ...)
+    sys.path.insert(0, BACKEND_DIR)
+    spec = importlib.util.spec_from_file_location('ml_api_server', os.path.join(BACKEND_DIR, 'ml-api-server.py'))
+    server = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(server)
+    return server
+
+
+def build_estimator(recipe: dict, n_jobs: int, params: dict = None):
+    params = dict(recipe['params'], **(params or {}))
+    if recipe['estimator'] == 'random_forest':
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(n_jobs=n_jobs, **params)
+    if recipe['estimator'] == 'xgboost':
+        from xgboost import XGBClassifier
+        return XGBClassifier(n_jobs=n_jobs, **params)
+    if recipe['estimator'] == 'logistic_regression':
+        from sklearn.linear_model import LogisticRegression
+        return LogisticRegression(**params)
+    raise ValueError(f"Unknown estimator {recipe['estimator']}")
+
+
+def load_training_data(spec: dict, recipe: dict, models_dir: str, timings: dict = None):
+    """Feature matrix, labels and feature column names of one model's training CSV, preprocessed as in its recipe"""
+    import pandas as pd
+
+    timings = {} if timings is None else timings
+    stage_start = time.perf_counter()
+    df = pd.read_csv(os.path.join(models_dir, spec['dataset']), encoding='utf-8-sig')
+    timings['read_csv'] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    if recipe['missing'] == 'drop':
+        df = df.dropna()
+    else:
+        df = df.dropna(subset=[spec['target']])
+        if recipe['missing'] == 'median':
+            df = df.fillna(df.median(numeric_only=True))
+    features = df.drop(columns=[spec['target']])
+    for column in recipe['zero_as_missing']:
+        features[column] = features[column].replace(0, features[column].median())
+    if features.shape[1] != spec['n_features']:
+        raise ValueError(f"{spec['dataset']} has {features.shape[1]} feature columns, expected {spec['n_features']}")
+    rows = features.to_numpy(dtype=float)
+    labels = df[spec['target']].to_numpy()
+    timings['preprocess'] = time.perf_counter() - stage_start
+    return rows, labels, list(features.columns)
+
+
+def split_training_data(rows, labels, recipe: dict):
+    """The 80/20 split every script used; (train_rows, test_rows, train_labels, test_labels)"""
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(rows, labels, test_size=0.2, random_state=42,
+                            stratify=labels if recipe['stratify'] else None)
+
+
+def train_model(model_type: str, spec: dict, recipe: dict, models_dir: str, out_dir: str, n_jobs: int,
+                params: dict = None) -> dict:
+    """Train one model and write its pickles to out_dir; returns its manifest entry (run in a pool process)"""
+    import joblib
+    from sklearn.metrics import accuracy_score, roc_auc_score
+    from sklearn.preprocessing import StandardScaler
+
+    warnings.filterwarnings('ignore')
+    timings = {}
+    rows, labels, columns = load_training_data(spec, recipe, models_dir, timings)
+
+    # As in the original scripts, the scaler is fitted on every row before the split
+    stage_start = time.perf_counter()
+    scaler = StandardScaler()
+    scaled = scaler.fit_transform(rows)
+    train_rows, test_rows, train_labels, test_labels = split_training_data(scaled, labels, recipe)
+    timings['scale_split'] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    model = build_estimator(recipe, n_jobs, params)
+    model.fit(train_rows, train_labels)
+    timings['fit'] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    probabilities = model.predict_proba(test_rows)[:, 1]
+    metrics = {
+        'accuracy': round(float(accuracy_score(test_labels, probabilities > 0.5)), 4),
+        'roc_auc': round(float(roc_auc_score(test_labels, probabilities)), 4),
+        'latency_us_per_row': round(serving_latency_us(model, scaler, scaler.inverse_transform(test_rows[:200])), 2)
+    }
+    timings['evaluate'] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    joblib.dump(model, os.path.join(out_dir, spec['model_file']))
+    joblib.dump(scaler, os.path.join(out_dir, spec['scaler_file']))
+    timings['save'] = time.perf_counter() - stage_start
+
+    return {
+        'estimator': type(model).__name__,
+        'params': {key: value for key, value in model.get_params().items()
+                   if key in recipe['params'] or key in (params or {}) or key == 'n_jobs'},
+        'columns': columns,
+        'train_rows': len(train_rows),
+        'test_rows': len(test_rows),
+        'metrics': metrics,
+        'timings': {stage: round(seconds, 3) for stage, seconds in timings.items()}
+    }
+
+
+def install_artifacts(run_dir: str, manifest: dict):
+    """Copy a run's pickles over the ones load_models reads, each replaced atomically, and record the run"""
+    for entry in manifest['models'].values():
+        for filename in entry['sources']:
+            tmp_path = os.path.join(MODELS_DIR, f'.{filename}.tmp')
+            shutil.copyfile(os.path.join(run_dir, filename), tmp_path)
+            os.replace(tmp_path, os.path.join(MODELS_DIR, filename))
+
+    installed_path = os.path.join(MODELS_DIR, 'training_manifest.json')
+    installed = {'models': {}}
+    if os.path.exists(installed_path):
+        with open(installed_path) as f:
+            installed = json.load(f)
+    for model_type, entry in manifest['models'].items():
+        installed['models'][model_type] = dict(entry, run_id=manifest['run_id'],
+                                               installed_at=datetime.now(timezone.utc).isoformat())
+    with open(installed_path + '.tmp', 'w') as f:
+        json.dump(installed, f, indent=2)
+    os.replace(installed_path + '.tmp', installed_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train every disease model in parallel into a versioned artifact set')
+    parser.add_argument('--models', help='Comma-separated models to train (default: all)')
+    parser.add_argument('--workers', type=int, help='Training processes (default: one per model, at most one per core)')
+    parser.add_argument('--n-jobs', type=int, help='Threads per RandomForest/XGBoost fit (default: cores / workers)')
+    parser.add_argument('--no-install', action='store_true', help='Only write the versioned run, leave the served pickles alone')
+    parser.add_argument('--export-compiled', action='store_true', help='Rebuild the compiled artifacts from the installed pickles')
+    parser.add_argument('--tune', action='store_true', help='Search hyperparameters by successive halving before training')
+    parser.add_argument('--max-latency-us', type=float, default=50.0, help='Tuning budget: single-row scoring time (default: 50)')
+    parser.add_argument('--candidates', type=int, default=27, help='Tuning: sampled parameter combinations per model')
+    parser.add_argument('--halving-factor', type=int, default=3, help='Tuning: candidates kept per round = 1 / factor')
+    parser.add_argument('--cv-folds', type=int, default=5)
+    args = parser.parse_args()
+
+    total_start = time.perf_counter()
+    warnings.filterwarnings('ignore')
+    # Compiled artifacts are rebuilt from the new pickles, never loaded from the old ones
+    os.environ['USE_COMPILED_ARTIFACTS'] = 'false'
+    os.environ['FAST_SCORING'] = 'true'
+    server = load_server_module()
+    model_types = args.models.split(',') if args.models else list(RECIPES)
+    unknown = [m for m in model_types if m not in RECIPES]
+    if unknown:
+        print(f"Unknown models: {', '.join(unknown)}")
+        return 1
+
+    cores = os.cpu_count() or 1
+    workers = args.workers or max(1, min(len(model_types), cores))
+    n_jobs = args.n_jobs or max(1, cores // workers)
+    run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    run_dir = os.path.join(MODELS_DIR, 'versions', run_id)
+    os.makedirs(run_dir)
+    stages, tuning = {}, {}
+    if args.tune:
+        # One model at a time, each search spreading its candidates over every core
+        stage_start = time.perf_counter()
+        for model_type in model_types:
+            print(f"Tuning {model_type} ({args.candidates} candidates, {args.cv_folds}-fold CV, "
+                  f"<= {args.max_latency_us:g} us/row)")
+            rows, labels, _ = load_training_data(server.MODEL_SPECS[model_type], RECIPES[model_type], MODELS_DIR)
+            train_rows, _, train_labels, _ = split_training_data(rows, labels, RECIPES[model_type])
+            tuning[model_type] = successive_halving(
+                build_estimator, RECIPES[model_type], train_rows, train_labels, args.max_latency_us,
+                n_candidates=args.candidates, factor=args.halving_factor, n_folds=args.cv_folds, workers=cores
+            )
+            if not tuning[model_type]['within_budget']:
+                print(f"  No {model_type} candidate met the latency budget; using the fastest one")
+        stages['tune'] = time.perf_counter() - stage_start
+
+    print(f"Training {', '.join(model_types)} in {workers} processes with n_jobs={n_jobs} -> {run_dir}")
+    stage_start = time.perf_counter()
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {
+            model_type: pool.submit(train_model, model_type, server.MODEL_SPECS[model_type], RECIPES[model_type],
+                                    MODELS_DIR, run_dir, n_jobs, tuning.get(model_type, {}).get('params'))
+            for model_type in model_types
+        }
+        entries = {model_type: future.result() for model_type, future in futures.items()}
+    stages['train'] = time.perf_counter() - stage_start
+    for model_type, result in tuning.items():
+        entries[model_type]['tuning'] = result
+
+    for model_type, entry in entries.items():
+        spec = server.MODEL_SPECS[model_type]
+        sources = {filename: server.file_digest(os.path.join(run_dir, filename))
+                   for filename in (spec['model_file'], spec['scaler_file'])}
+        entry.update(sources=sources, model_version=server.artifact_version(sources))
+    manifest = {
+        'run_id': run_id,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'workers': workers,
+        'n_jobs': n_jobs,
+        'models': entries
+    }
+
+    if not args.no_install:
+        stage_start = time.perf_counter()
+        install_artifacts(run_dir, manifest)
+        stages['install'] = time.perf_counter() - stage_start
+    if args.export_compiled and not args.no_install:
+        from fast_scoring import install_compiled_models
+
+        stage_start = time.perf_counter()
+        server.load_models()
+        # Exported into the run first and installed atomically, never written over the live artifacts
+        compiled_dir = os.path.join(run_dir, 'compiled')
+        server.export_compiled_artifacts(compiled_dir)
+        install_compiled_models(compiled_dir, server.compiled_artifacts_dir())
+        stages['export_compiled'] = time.perf_counter() - stage_start
+    stages['total'] = time.perf_counter() - total_start
+    manifest['timings'] = {stage: round(seconds, 3) for stage, seconds in stages.items()}
+    with open(os.path.join(run_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    stage_names = list(next(iter(entries.values()))['timings'])
+    print(f"\n{'model':<14}{'version':<20}{'accuracy':>9}{'auc':>8}{'us/row':>9}"
+          + ''.join(f'{name:>13}' for name in stage_names))
+    for model_type, entry in entries.items():
+        metrics = entry['metrics']
+        print(f"{model_type:<14}{entry['model_version']:<20}{metrics['accuracy']:>9.4f}{metrics['roc_auc']:>8.4f}"
+              f"{metrics['latency_us_per_row']:>9.1f}" + ''.join(f"{entry['timings'][name]:>12.3f}s" for name in stage_names))
+    print('\n' + ', '.join(f'{stage} {seconds:.2f}s' for stage, seconds in stages.items()))
+    if args.no_install:
+        print(f"Not installed; served pickles in {MODELS_DIR} are unchanged")
+    elif not args.export_compiled:
+        print("Compiled artifacts are now stale; run export_compiled_models.py (or pass --export-compiled)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
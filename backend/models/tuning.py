@@ -0,0 +1,205 @@
+"""
+Successive-halving hyperparameter search used by train_all.py --tune.
+
+Randomly sampled candidates are scored by stratified k-fold AUC on a growing
+number of training rows: each round keeps the best 1/factor of the candidates and
+gives the survivors factor times more rows, so most of the compute goes to the
+promising ones. The folds are split, scaled and subsampled once up front and
+shared with every pool process, so candidates never recompute them.
+
+Candidates are ranked by a latency-constrained objective: the best AUC among the
+candidates whose single-row scoring time (through the same compiled scorer
+ml-api-server.py serves them with) is within the budget. Candidates over budget
+rank below every candidate within it, slowest last. Latency is measured after
+each round in the parent process while the pool is idle, on each candidate's
+fold-0 model, so the budget cut does not depend on how busy the other workers were.
+"""
+
+import math
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+SEARCH_SPACES = {
+    'random_forest': {
+        'n_estimators': [25, 50, 100, 200, 400],
+        'max_depth': [4, 6, 8, 12, None],
+        'min_samples_leaf': [1, 2, 4, 8],
+        'max_features': ['sqrt', 'log2', 0.5]
+    },
+    'xgboost': {
+        'n_estimators': [50, 100, 200, 400],
+        'max_depth': [2, 3, 4, 6],
+        'learning_rate': [0.03, 0.1, 0.3],
+        'subsample': [0.7, 1.0],
+        'colsample_bytree': [0.7, 1.0],
+        'min_child_weight': [1, 5]
+    },
+    'logistic_regression': {
+        'C': [0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0, 30.0, 100.0],
+        'class_weight': [None, 'balanced']
+    }
+}
+
+# Fold matrices of the model being tuned, set in each pool process by _init_worker
+_fold_cache = None
+
+
+def serving_latency_us(model: Any, scaler: Any, rows: np.ndarray, repeats: int = 3) -> float:
+    """
+    Microseconds to score one row the way ml-api-server.py does: through the compiled
+    scorer if the model compiles, else scaler + predict_proba. Median of `repeats` passes.
+    """
+    from fast_scoring import UnsupportedModelError, compile_model
+
+    try:
+        compiled = compile_model(model, scaler)
+        if hasattr(compiled, 'score_row'):
+            score = lambda row: compiled.score_row(row.tolist())
+        else:
+            score = lambda row: compiled.positive_proba(row[None, :])
+    except UnsupportedModelError:
+        score = lambda row: model.predict_proba(scaler.transform(row[None, :]))
+    passes = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for row in rows:
+            score(row)
+        passes.append((time.perf_counter() - start) / len(rows))
+    return float(np.median(passes)) * 1e6
+
+
+def resource_schedule(n_rows: int, n_candidates: int, factor: int, min_rows: int) -> List[int]:
+    """Training rows per round: n_rows in the last round, divided by factor for each earlier one"""
+    rounds = 1
+    while factor ** (rounds - 1) < n_candidates:
+        rounds += 1
+    schedule = [max(min_rows, n_rows // factor ** (rounds - 1 - i)) for i in range(rounds)]
+    return sorted(set(min(n_rows, rows) for rows in schedule))
+
+
+def build_fold_cache(rows: np.ndarray, labels: np.ndarray, resources: List[int], n_folds: int,
+                     latency_rows: int, seed: int) -> Dict[str, Any]:
+    """Scaled training subsets per (rows, fold) and scaled validation sets per fold, computed once"""
+    from sklearn.model_selection import StratifiedKFold
+    from sklearn.preprocessing import StandardScaler
+
+    rng = np.random.default_rng(seed)
+    folds, subsets = [], {}
+    for fold, (train_index, val_index) in enumerate(
+            StratifiedKFold(n_folds, shuffle=True, random_state=seed).split(rows, labels)):
+        scaler = StandardScaler().fit(rows[train_index])
+        train_scaled, train_labels = scaler.transform(rows[train_index]), labels[train_index]
+        folds.append({
+            'scaler': scaler,
+            'val': scaler.transform(rows[val_index]),
+            'val_labels': labels[val_index],
+            'raw_val': rows[val_index][:latency_rows]
+        })
+        order = rng.permutation(len(train_index))
+        for n_rows in resources:
+            # Fold training rows scale with the resource: n_rows is the share of all training rows
+            subset = order[:max(2, n_rows * len(train_index) // len(rows))]
+            subsets[(n_rows, fold)] = (train_scaled[subset], train_labels[subset])
+    return {'folds': folds, 'subsets': subsets}
+
+
+def _init_worker(fold_cache: Dict[str, Any]):
+    global _fold_cache
+    _fold_cache = fold_cache
+    warnings.filterwarnings('ignore')
+
+
+def _evaluate(build_estimator: Callable, recipe: Dict[str, Any], params: Dict[str, Any], n_rows: int, fold: int):
+    """Validation AUC of one candidate on one fold; fold 0 also returns the fitted model for timing"""
+    from sklearn.metrics import roc_auc_score
+
+    train_rows, train_labels = _fold_cache['subsets'][(n_rows, fold)]
+    entry = _fold_cache['folds'][fold]
+    if len(np.unique(train_labels)) < 2:
+        return 0.5, None
+    model = build_estimator(recipe, 1, params)
+    model.fit(train_rows, train_labels)
+    auc = float(roc_auc_score(entry['val_labels'], model.predict_proba(entry['val'])[:, 1]))
+    return auc, model if fold == 0 else None
+
+
+def sample_candidates(space: Dict[str, list], n_candidates: int, seed: int) -> List[Dict[str, Any]]:
+    """Distinct random parameter combinations (all of them if the space is smaller than n_candidates)"""
+    rng = np.random.default_rng(seed)
+    combinations = math.prod(len(values) for values in space.values())
+    candidates, seen = [], set()
+    while len(candidates) < min(n_candidates, combinations):
+        params = {name: values[rng.integers(len(values))] for name, values in space.items()}
+        key = tuple(sorted((name, repr(value)) for name, value in params.items()))
+        if key not in seen:
+            seen.add(key)
+            candidates.append(params)
+    return candidates
+
+
+def objective_key(result: Dict[str, Any], max_latency_us: float):
+    """Sort key, best first: within the latency budget, then higher AUC, then lower latency"""
+    within_budget = result['latency_us'] <= max_latency_us
+    return (not within_budget, -result['cv_auc'] if within_budget else result['latency_us'], result['latency_us'])
+
+
+def successive_halving(build_estimator: Callable, recipe: Dict[str, Any], rows: np.ndarray, labels: np.ndarray,
+                       max_latency_us: float, n_candidates: int = 27, factor: int = 3, n_folds: int = 5, min_rows: int = 100,
+                       workers: int = 1, seed: int = 42, latency_repeats: int = 5, log=print) -> Dict[str, Any]:
+    """
+    Search the recipe's estimator (built by build_estimator(recipe, n_jobs, params)) for
+    the best CV AUC within max_latency_us per row; returns the winner and a per-round trace
+    """
+    candidates = [dict(recipe['params'], **params)
+                  for params in sample_candidates(SEARCH_SPACES[recipe['estimator']], n_candidates, seed)]
+    schedule = resource_schedule(len(rows), len(candidates), factor, min_rows)
+
+    stage_start = time.perf_counter()
+    fold_cache = build_fold_cache(rows, labels, schedule, n_folds, latency_rows=200, seed=seed)
+    timings = {'fold_cache': time.perf_counter() - stage_start}
+
+    rounds, results = [], []
+    survivors = list(range(len(candidates)))
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(fold_cache,)) as pool:
+        for round_index, n_rows in enumerate(schedule):
+            stage_start = time.perf_counter()
+            futures = {(i, fold): pool.submit(_evaluate, build_estimator, recipe, candidates[i], n_rows, fold)
+                       for i in survivors for fold in range(n_folds)}
+            scores = {i: [futures[(i, fold)].result() for fold in range(n_folds)] for i in survivors}
+            # Every future has finished, so the timings run on an otherwise idle machine
+            results = []
+            latency_fold = fold_cache['folds'][0]
+            for i in survivors:
+                model = scores[i][0][1]
+                latency = (serving_latency_us(model, latency_fold['scaler'], latency_fold['raw_val'], repeats=latency_repeats)
+                           if model is not None else math.inf)
+                results.append({'index': i, 'params': candidates[i],
+                                'cv_auc': float(np.mean([auc for auc, _ in scores[i]])), 'latency_us': latency})
+            results.sort(key=lambda result: objective_key(result, max_latency_us))
+            best = results[0]
+            rounds.append({'rows': n_rows, 'candidates': len(survivors), 'best_cv_auc': round(best['cv_auc'], 4),
+                           'best_latency_us': round(best['latency_us'], 2),
+                           'within_budget': sum(r['latency_us'] <= max_latency_us for r in results),
+                           'seconds': round(time.perf_counter() - stage_start, 3)})
+            log(f"  round {round_index + 1}: {len(survivors)} candidates on {n_rows} rows, "
+                f"best AUC {best['cv_auc']:.4f} at {best['latency_us']:.1f} us/row")
+            timings[f'round_{round_index + 1}'] = time.perf_counter() - stage_start
+            survivors = [result['index'] for result in results[:max(1, math.ceil(len(results) / factor))]]
+
+    best = results[0]
+    return {
+        'params': best['params'],
+        'cv_auc': round(best['cv_auc'], 4),
+        'latency_us': round(best['latency_us'], 2),
+        'within_budget': best['latency_us'] <= max_latency_us,
+        'max_latency_us': max_latency_us,
+        'candidates': len(candidates),
+        'folds': n_folds,
+        'factor': factor,
+        'rounds': rounds,
+        'timings': {stage: round(seconds, 3) for stage, seconds in timings.items()}
+    }
@@ -0,0 +1,243 @@
+# BloomBuddy prediction cache
+# Bounded in-process LRU cache (with optional TTL) for prediction results, keyed on
+# the model version plus a canonical hash of the feature vector, and an optional
+# SQLite-backed tier shared by every gunicorn worker on the host.
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def feature_key(model_type: str, model_version: str, features: List[float]) -> str:
+    """
+    Canonical cache key for a feature vector.
+    Values are normalised to floats so 1, 1.0 and -0.0/0.0 hash the same.
+    """
+    canonical = json.dumps([model_type, model_version, [float(v) + 0.0 for v in features]], separators=(',', ':'))
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with an optional per-entry time-to-live"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class SharedPredictionCache:
+    """
+    Cross-process result cache in a local SQLite file (WAL mode), so a prediction
+    computed by one gunicorn worker serves repeats in all the others.
+    Size is bounded by trimming the least recently used rows every few inserts.
+    Any SQLite error is treated as a miss so the cache can never fail a request.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100000, ttl_seconds: float = 0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # Allow the table to overshoot by a small slack between trims
+        self.trim_interval = max(1, max_entries // 16)
+        self._local = threading.local()
+        self._counter_lock = threading.Lock()
+        self._puts_since_trim = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, re-opened after fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=0.5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS predictions ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, last_access REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS predictions_last_access ON predictions (last_access)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _count(self, name: str) -> None:
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        try:
+            connection = self._connection()
+            row = connection.execute(
+                'SELECT value, expires_at FROM predictions WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self._count('misses')
+                return None
+            connection.execute('UPDATE predictions SET last_access = ? WHERE key = ?', (now, key))
+        except sqlite3.Error as e:
+            logger.warning(f"Shared prediction cache read failed: {str(e)}")
+            self._count('errors')
+            self._count('misses')
+            return None
+        self._count('hits')
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any) -> None:
+        now = time.time()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds > 0 else None
+        try:
+            connection = self._connection()
+            connection.execute(
+                'INSERT OR REPLACE INTO predictions (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), expires_at, now)
+            )
+            with self._counter_lock:
+                self._puts_since_trim += 1
+                trim = self._puts_since_trim >= self.trim_interval
+                if trim:
+                    self._puts_since_trim = 0
+            if trim:
+                self._trim(connection, now)
+        except sqlite3.Error as e:
+            logger.warning(f"Shared prediction cache write failed: {str(e)}")
+            self._count('errors')
+
+    def _trim(self, connection: sqlite3.Connection, now: float) -> None:
+        """Drop expired rows, then the least recently used rows beyond max_entries"""
+        removed = connection.execute(
+            'DELETE FROM predictions WHERE expires_at IS NOT NULL AND expires_at <= ?', (now,)
+        ).rowcount
+        overflow = connection.execute('SELECT COUNT(*) FROM predictions').fetchone()[0] - self.max_entries
+        if overflow > 0:
+            removed += connection.execute(
+                'DELETE FROM predictions WHERE key IN '
+                '(SELECT key FROM predictions ORDER BY last_access LIMIT ?)', (overflow,)
+            ).rowcount
+        with self._counter_lock:
+            self.evictions += removed
+
+    def clear(self) -> None:
+        try:
+            self._connection().execute('DELETE FROM predictions')
+        except sqlite3.Error as e:
+            logger.warning(f"Shared prediction cache clear failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            size = self._connection().execute('SELECT COUNT(*) FROM predictions').fetchone()[0]
+        except sqlite3.Error:
+            size = None
+        with self._counter_lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'sqlite',
+                'path': self.path,
+                'size': size,
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'errors': self.errors,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'pid': os.getpid()
+            }
+
+
+class TieredPredictionCache:
+    """Per-process LRU in front of a shared cache; shared hits are promoted into the local tier"""
+
+    def __init__(self, local: PredictionCache, shared: SharedPredictionCache):
+        self.local = local
+        self.shared = shared
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        value = self.shared.get(key)
+        if value is not None:
+            self.local.put(key, value)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        self.local.put(key, value)
+        self.shared.put(key, value)
+
+    def clear(self) -> None:
+        self.local.clear()
+        self.shared.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.local.stats()
@@ -0,0 +1,108 @@
+# BloomBuddy request log
+# One compact JSON record per request (route, status, duration, model, cache and stage
+# timings), written by a background QueueListener so request threads never block on
+# log I/O. Successful requests are sampled; server errors are always kept. Debug
+# detail is collected only for requests chosen by a separate sampling rate or that ask
+# for it with a header, so the hot path pays nothing for it otherwise.
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queues the record untouched, leaving JSON encoding to the listener thread, and drops records when full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.msg, default=str, separators=(',', ':'))
+
+
+class RequestLog:
+    """
+    Sampled structured request log. `sample_rate` is the fraction of successful
+    requests recorded, `debug_sample_rate` the fraction that also collect debug detail,
+    and with `debug_header` set, a request sending that header with value 1 gets debug
+    detail too. Requests slower than `slow_ms` (0 disables) are always recorded.
+    """
+
+    def __init__(self, sample_rate: float = 0.01, debug_sample_rate: float = 0.0, slow_ms: float = 0,
+                 debug_header: Optional[str] = None, max_queue: int = 10000, stream=None):
+        self.sample_rate = sample_rate
+        self.debug_sample_rate = debug_sample_rate
+        self.slow_ms = slow_ms
+        self.debug_header = debug_header
+        self.max_queue = max_queue
+        self.stream = stream or sys.stderr
+        self.logger = logging.getLogger('bloombuddy.requests')
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self._lock = threading.Lock()
+        self._pid = None
+        self._handler = None
+        self._listener = None
+        atexit.register(self.stop)
+
+    def start(self) -> None:
+        """Start this process's listener thread (idempotent, re-started after fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._handler is not None:
+                # Inherited from the parent process, whose listener thread did not survive fork
+                self.logger.removeHandler(self._handler)
+            log_queue = queue.Queue(self.max_queue)
+            output = logging.StreamHandler(self.stream)
+            output.setFormatter(_JsonFormatter())
+            self._handler = _DeferredQueueHandler(log_queue)
+            self._listener = QueueListener(log_queue, output)
+            self._listener.start()
+            self.logger.addHandler(self._handler)
+            self._pid = os.getpid()
+
+    def stop(self) -> None:
+        """Flush queued records and stop the listener of this process"""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._pid = None
+
+    def wants_debug(self, header_value: Optional[str]) -> bool:
+        if self.debug_header and header_value == '1':
+            return True
+        return self.debug_sample_rate > 0 and random.random() < self.debug_sample_rate
+
+    def should_record(self, status: int, duration_ms: float, debug: bool) -> bool:
+        # Server errors are always kept, except 503s from load shedding, which come in bursts
+        if debug or (status >= 500 and status != 503):
+            return True
+        if self.slow_ms and duration_ms >= self.slow_ms:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def record(self, fields: Dict[str, Any]) -> None:
+        self.start()
+        self.logger.info(dict(fields, ts=round(time.time(), 3)))
@@ -0,0 +1,286 @@
+"""
+Score a large CSV or Parquet export offline with the API's disease models.
+
+Reads the input in chunks of --chunk-size rows, maps columns to each model's
+features by the names /api/models/info reports (case, camelCase and spaces/hyphens
+ignored, so BloodPressure and DiabetesPedigreeFunction match; --column-map renames
+others), scores every chunk in one vectorized pass per model
+through ml-api-server.py's model registry and score_features, and appends
+<model>_probability and <model>_prediction columns to the output as chunks finish.
+Chunks are scored by a pool of --workers processes, at most two per worker in
+flight, so memory stays bounded however large the input is. Rows with a missing or
+non-numeric feature get empty results for that model.
+
+Parquet input or output needs pyarrow.
+
+The bundled training CSVs need these --column-map aliases (diabetes.csv needs none):
+    heart.csv         chest_pain_type=cp resting_bp=trestbps cholesterol=chol
+                      fasting_bs=fbs resting_ecg=restecg max_hr=thalach
+                      exercise_angina=exang st_slope=slope
+    hypertension.csv  sex=male smoking=currentSmoker total_cholesterol=totChol
+                      systolic_bp=sysBP diastolic_bp=diaBP
+
+Usage (from the backend directory):
+    python score_bulk.py registry_export.csv scored.csv --workers 8
+    python score_bulk.py export.parquet scored.parquet --models heart,hypertension \\
+        --column-map resting_bp=trestbps --keep-columns patient_id
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import re
+import sys
+import time
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The server module in this process; inherited by forked pool workers, imported by spawned ones
+_server = None
+
+
+def load_server_module():
+    os.environ.setdefault('MODEL_LOADING', 'lazy')
+    os.environ.setdefault('REQUEST_LOG_SAMPLE_RATE', '0')
+    warnings.filterwarnings('ignore')
+    spec = importlib.util.spec_from_file_location('ml_api_server', os.path.join(BACKEND_DIR, 'ml-api-server.py'))
+    server = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(server)
+    server.logger.disabled = True
+    return server
+
+
+def init_worker(model_types):
+    global _server
+    if _server is None:
+        _server = load_server_module()
+    for model_type in model_types:
+        _server.model_registry.ensure_loaded(model_type)
+
+
+def score_chunk(task):
+    """Score one chunk: {model: feature matrix of its valid rows} -> {model: (probabilities, fallback)}"""
+    index, matrices = task
+    results = {}
+    for model_type, matrix in matrices.items():
+        if len(matrix) == 0:
+            results[model_type] = (np.empty(0), False)
+            continue
+        scored = _server.score_features(model_type, matrix, _server.model_registry.bundle(model_type))
+        results[model_type] = (np.asarray(scored['probabilities'], dtype=float), scored['fallback'])
+    return index, results
+
+
+def normalize_name(name: str) -> str:
+    """snake_case form of a column or feature name: BloodPressure, BPMeds, cigsPerDay -> blood_pressure, bp_meds, cigs_per_day"""
+    name = str(name).strip('\ufeff \t')
+    name = re.sub(r'(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])', '_', name)
+    return re.sub(r'[\s\-_]+', '_', name.lower())
+
+
+def resolve_columns(columns, model_types, model_specs, column_map):
+    """Per model, the input column for each feature in model order, or the names of the missing features"""
+    by_normalized = {normalize_name(column): column for column in columns}
+    resolved, missing = {}, {}
+    for model_type in model_types:
+        mapping, absent = [], []
+        for feature in model_specs[model_type]['features']:
+            column = column_map.get(feature) or by_normalized.get(normalize_name(feature))
+            if column is None or column not in columns:
+                absent.append(feature)
+            mapping.append(column)
+        if absent:
+            missing[model_type] = absent
+        else:
+            resolved[model_type] = mapping
+    return resolved, missing
+
+
+def read_columns(path: str):
+    if path.endswith('.parquet'):
+        return list(require_pyarrow().parquet.ParquetFile(path).schema_arrow.names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def iter_chunks(path: str, chunk_size: int, columns):
+    if path.endswith('.parquet'):
+        parquet_file = require_pyarrow().parquet.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns)
+
+
+def require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        sys.exit('Parquet input/output needs pyarrow (pip install pyarrow)')
+    return pyarrow
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parquet = path.endswith('.parquet')
+        self._writer = None
+        self._first = True
+
+    def write(self, frame: pd.DataFrame):
+        if self.parquet:
+            pyarrow = require_pyarrow()
+            if self._writer is None:
+                table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+                self._writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+            else:
+                table = pyarrow.Table.from_pandas(frame, schema=self._writer.schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def prepare_chunk(frame: pd.DataFrame, resolved):
+    """Valid-row masks and feature matrices per model for one input chunk"""
+    masks, matrices = {}, {}
+    for model_type, columns in resolved.items():
+        matrix = frame[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        mask = np.isfinite(matrix).all(axis=1)
+        masks[model_type] = mask
+        matrices[model_type] = np.ascontiguousarray(matrix[mask])
+    return masks, matrices
+
+
+def attach_results(frame: pd.DataFrame, keep_columns, masks, results, stats):
+    output = frame[keep_columns].reset_index(drop=True) if keep_columns is not None else frame.reset_index(drop=True)
+    for model_type, (probabilities, fallback) in results.items():
+        mask = masks[model_type]
+        column = np.full(len(frame), np.nan)
+        column[mask] = probabilities
+        prediction = pd.array(np.where(column > 0.5, 1, 0), dtype='Int64')
+        prediction[~mask] = pd.NA
+        output[f'{model_type}_probability'] = column
+        output[f'{model_type}_prediction'] = prediction
+        stats[model_type]['scored'] += int(mask.sum())
+        stats[model_type]['invalid'] += int((~mask).sum())
+        stats[model_type]['fallback_chunks'] += int(fallback)
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chunked, multi-process offline scoring of CSV/Parquet files')
+    parser.add_argument('input', help='Input .csv or .parquet file')
+    parser.add_argument('output', help='Output .csv or .parquet file')
+    parser.add_argument('--models', help='Comma-separated models (default: every enabled model whose features are present)')
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Scoring processes (1 scores in this process)')
+    parser.add_argument('--column-map', action='append', default=[], metavar='FEATURE=COLUMN',
+                        help='Input column for a model feature (repeatable)')
+    parser.add_argument('--keep-columns', help='Comma-separated input columns copied to the output (default: all)')
+    parser.add_argument('--report', help='Write a JSON summary (rows, rows/sec, model versions) to this file')
+    args = parser.parse_args()
+
+    global _server
+    _server = load_server_module()
+    column_map = dict(item.split('=', 1) for item in args.column_map)
+    columns = read_columns(args.input)
+
+    requested = args.models.split(',') if args.models else _server.model_registry.model_types
+    unknown = [m for m in requested if not _server.model_registry.is_enabled(m)]
+    if unknown:
+        sys.exit(f"Unknown or disabled models: {', '.join(unknown)}")
+    resolved, missing = resolve_columns(columns, requested, _server.MODEL_SPECS, column_map)
+    for model_type, absent in missing.items():
+        message = f"{model_type}: input has no column for {', '.join(absent)}"
+        if args.models:
+            sys.exit(message)
+        print(f"Skipping {message}", file=sys.stderr)
+    if not resolved:
+        sys.exit('No model can be scored from the input columns')
+
+    keep_columns = None
+    if args.keep_columns is not None:
+        keep_columns = [c for c in args.keep_columns.split(',') if c]
+        absent = [c for c in keep_columns if c not in columns]
+        if absent:
+            sys.exit(f"--keep-columns not in the input: {', '.join(absent)}")
+    read = None
+    if keep_columns is not None:
+        read = list(dict.fromkeys(keep_columns + [c for mapping in resolved.values() for c in mapping]))
+
+    for model_type in resolved:
+        if not _server.model_registry.ensure_loaded(model_type):
+            sys.exit(f'{model_type} model could not be loaded')
+    versions = {model_type: _server.model_registry.version(model_type) for model_type in resolved}
+    stats = {model_type: {'scored': 0, 'invalid': 0, 'fallback_chunks': 0} for model_type in resolved}
+
+    writer = ChunkWriter(args.output)
+    pool = ProcessPoolExecutor(args.workers, initializer=init_worker, initargs=(list(resolved),)) if args.workers > 1 else None
+    pending = deque()
+    rows, next_report = 0, time.time() + 5
+    start = time.perf_counter()
+
+    def write_oldest():
+        nonlocal rows
+        frame, masks, future = pending.popleft()
+        _, results = future.result() if pool is not None else future
+        writer.write(attach_results(frame, keep_columns, masks, results, stats))
+        rows += len(frame)
+
+    try:
+        for index, frame in enumerate(iter_chunks(args.input, args.chunk_size, read)):
+            masks, matrices = prepare_chunk(frame, resolved)
+            task = (index, matrices)
+            pending.append((frame, masks, pool.submit(score_chunk, task) if pool is not None else score_chunk(task)))
+            # Bounded memory: at most two chunks per worker are read ahead of the writer
+            while len(pending) >= 2 * args.workers:
+                write_oldest()
+            if time.time() >= next_report:
+                print(f"{rows} rows, {rows / (time.perf_counter() - start):.0f} rows/s", file=sys.stderr)
+                next_report = time.time() + 5
+        while pending:
+            write_oldest()
+    finally:
+        writer.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    seconds = time.perf_counter() - start
+    summary = {
+        'input': args.input,
+        'output': args.output,
+        'rows': rows,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(rows / seconds, 1) if seconds else None,
+        'workers': args.workers,
+        'chunk_size': args.chunk_size,
+        'model_versions': versions,
+        'models': stats
+    }
+    print(f"Scored {rows} rows with {', '.join(resolved)} in {seconds:.2f}s ({summary['rows_per_second']} rows/s)")
+    for model_type, model_stats in stats.items():
+        if model_stats['invalid'] or model_stats['fallback_chunks']:
+            print(f"  {model_type}: {model_stats['invalid']} rows with missing/non-numeric features, "
+                  f"{model_stats['fallback_chunks']} chunks scored by the rule-based fallback", file=sys.stderr)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -154,7 +154,8 @@ export const useChat = (options?: UseChatOptions) => {
       // Generate LLM response
       const response = await llmService.current.generateResponse(messagesForLLM, {
         temperature: 0.7,
-        maxTokens: 1000
+        maxTokens: 1000,
+        sessionId: memoryManager.current.getSessionId()
       });
 
       // Add bot response
@@ -133,6 +133,10 @@ Remember: You are an AI assistant for informational purposes only and should not
     ) || [];
   }
 
+  getSessionId(): string | undefined {
+    return this.memory?.sessionId;
+  }
+
   getReportContext(): ConversationMemory['reportContext'] | undefined {
     return this.memory?.reportContext;
   }
@@ -31,6 +31,7 @@ class LLMService {
       temperature?: number;
       maxTokens?: number;
       stream?: boolean;
+      sessionId?: string;
     }
   ): Promise<LLMResponse> {
     if (!validateLLMConfig()) {
@@ -74,7 +75,7 @@ class LLMService {
           content: msg.content
         })),
         max_tokens: options?.maxTokens || provider.maxTokens,
-        temperature: options?.temperature || 0.7,
+        temperature: options?.temperature ?? 0.7,
         stream: false
       })
     });
@@ -104,8 +105,9 @@ class LLMService {
     options?: any
   ): Promise<LLMResponse> {
     try {
-      // Use local proxy instead of direct API call to avoid CORS
-      const mlApiUrl = import.meta.env.VITE_ML_API_URL || 'http://localhost:5000/api';
+      // Use local proxy instead of direct API call to avoid CORS; VITE_LLM_API_URL points
+      // chat at the backend's chat listener (LLM_CHAT_PORT) when it runs one
+      const mlApiUrl = import.meta.env.VITE_LLM_API_URL || import.meta.env.VITE_ML_API_URL || 'http://localhost:5000/api';
       
       // Extract system message and user/assistant messages
       const systemMessage = messages.find(msg => msg.role === 'system')?.content || '';
@@ -117,13 +119,14 @@ class LLMService {
         provider: 'anthropic',
         model: provider.model,
         system: systemMessage,
+        sessionId: options?.sessionId,
         messages: conversationMessages.map(msg => ({
           role: msg.role === 'assistant' ? 'assistant' : 'user',
           content: msg.content
         })),
         options: {
           maxTokens: options?.maxTokens || provider.maxTokens,
-          temperature: options?.temperature || 0.7
+          temperature: options?.temperature ?? 0.7
         }
       };
 
@@ -197,7 +200,7 @@ class LLMService {
           contents,
           generationConfig: {
             maxOutputTokens: options?.maxTokens || provider.maxTokens,
-            temperature: options?.temperature || 0.7
+            temperature: options?.temperature ?? 0.7
           }
         })
       }
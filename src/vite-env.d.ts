@@ -2,6 +2,7 @@
 
 interface ImportMetaEnv {
   readonly VITE_ML_API_URL: string
+  readonly VITE_LLM_API_URL?: string
   readonly VITE_OPENAI_API_KEY: string
   readonly VITE_ANTHROPIC_API_KEY: string
   readonly VITE_GOOGLE_API_KEY: string